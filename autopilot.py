@@ -0,0 +1,320 @@
+from array import array
+from time import perf_counter
+
+from snake_engine import CELL_APPLE, DOWN, LEFT, RIGHT, UP
+
+
+# Время, которое автопилот может потратить на один ход, в секундах:
+AUTOPILOT_BUDGET = 0.001
+
+# Доля бюджета хода, которая отдается на поиск в ширину от яблок;
+# остальное время уходит на проверку безопасности ходов:
+SEARCH_SHARE = 0.5
+
+# Раз во сколько ячеек проверяется, не истек ли бюджет хода:
+DEADLINE_CHECK_INTERVAL = 64
+
+# Расстояние до яблока для ячеек, до которых поиск еще не дошел:
+UNKNOWN_DISTANCE = 1 << 30
+
+
+def neighbours(cell, width, size):
+    """Возвращает четыре соседние ячейки с учетом замкнутости поля."""
+    x_pos = cell % width
+    return (cell - 1 if x_pos else cell + width - 1,
+            cell + 1 if x_pos < width - 1 else cell - width + 1,
+            (cell - width) % size,
+            (cell + width) % size)
+
+
+class Autopilot:
+    """Автопилот: ведет змейку к ближайшему яблоку в обход препятствий.
+
+    Автопилот хранит поле расстояний до яблок - поиск в ширину от всех
+    яблок сразу по ячейкам без преград и мусора. Тело змейки в поле
+    не учитывается, поэтому оно не устаревает от хода змейки. Поле
+    обновляется по частям: новое яблоко добавляется в очередь поиска
+    к уже найденным расстояниям, а стираются только расстояния,
+    найденные от съеденного яблока, и их ячейки заполняются заново
+    от соседних. Поиск начинается заново, только если ячейку заняло
+    препятствие - мусор или преграда, - или съедены все прежние яблоки.
+    Поиск продолжается с того же места на следующих тиках, если
+    не уложился в бюджет хода: пока он не закончен, для еще
+    не найденных ячеек расстояние оценивается по прямой до яблока,
+    как в A*.
+
+    Из ходов к яблоку выбирается первый безопасный: после него
+    из новой головы должен быть достижим хвост или хватать свободного
+    места для всей змейки. Если безопасных ходов нет, змейка идет
+    туда, где свободного места больше всего.
+
+    Буферы поиска выделяются один раз на размер поля, а отметки
+    посещенных ячеек сбрасываются сменой номера поколения, без
+    очистки массивов.
+
+    Автопилот вызывается как бот: autopilot(game, snake) возвращает
+    новое направление змейки или None.
+
+    Аргументы:
+    - budget: время на один ход в секундах. Поиск и проверки
+    безопасности прерываются по его истечении, чтобы высокая скорость
+    змейки не приводила к пропуску кадров.
+    """
+
+    def __init__(self, budget=AUTOPILOT_BUDGET):
+        self.budget = budget
+        self.size = 0
+        self.obstacles = None
+        # Поле расстояний и очередь поиска в ширину от яблок. Очередь
+        # кольцевая: queue_start и queue_end растут, а ячейка очереди -
+        # номер по модулю размера поля. Ячейка стоит в очереди не больше
+        # одного раза - это отмечает queued.
+        self.distances = array('i')
+        self.marks = array('I')
+        self.queue = array('i')
+        self.queued = array('I')
+        self.generation = 0
+        self.queue_start = self.queue_end = 0
+        # Метки яблок, от которых найдены расстояния: яблоко -> метка,
+        # метка яблока по ячейкам и метки съеденных яблок.
+        self.sources = {}
+        self.owners = array('I')
+        self.stamp = 0
+        self.dead = set()
+        # Ячейки, расстояния которых найдены от съеденных яблок и еще
+        # не стерты.
+        self.stale = []
+        # Отметки и очередь для заливки при проверке безопасности.
+        self.flood_marks = array('I')
+        self.flood_queue = array('i')
+        self.flood_generation = 0
+
+    def __call__(self, game, snake):
+        """Возвращает новое направление змейки или None."""
+        start = perf_counter()
+        self.refresh(game)
+        self.search(game.free_cells, start + self.budget * SEARCH_SHARE)
+        return self.choose(game, snake, start + self.budget)
+
+    def allocate(self, size):
+        """Выделяет буферы поиска под поле из size ячеек."""
+        self.size = size
+        self.distances = array('i', bytes(4 * size))
+        self.marks = array('I', bytes(4 * size))
+        self.queue = array('i', bytes(4 * size))
+        self.queued = array('I', bytes(4 * size))
+        self.owners = array('I', bytes(4 * size))
+        self.flood_marks = array('I', bytes(4 * size))
+        self.flood_queue = array('i', bytes(4 * size))
+        self.generation = self.flood_generation = 0
+
+    def refresh(self, game):
+        """Обновляет поиск после перестановки яблок, мусора и преград."""
+        free_cells = game.free_cells
+        size = free_cells.width * free_cells.height
+        if size != self.size:
+            self.allocate(size)
+            self.obstacles = None
+        apples = {item.position for item in game.apples}
+        obstacles = ([item.position for item in game.garbage_items],
+                     len(game.barriers.positions))
+        if obstacles != self.obstacles or apples.isdisjoint(self.sources):
+            self.obstacles = obstacles
+            self.restart(apples)
+            return
+        for cell in self.sources.keys() - apples:
+            self.dead.add(self.sources.pop(cell))
+            self.stale.append(cell)
+        for cell in apples - self.sources.keys():
+            self.add_source(cell)
+
+    def restart(self, apples):
+        """Начинает поиск заново от яблок в ячейках apples."""
+        self.generation += 1
+        self.queue_start = self.queue_end = 0
+        self.sources.clear()
+        self.dead.clear()
+        self.stale.clear()
+        for cell in apples:
+            self.add_source(cell)
+
+    def add_source(self, cell):
+        """Добавляет яблоко в ячейке cell в очередь поиска."""
+        self.stamp += 1
+        self.sources[cell] = self.stamp
+        self.owners[cell] = self.stamp
+        self.marks[cell] = self.generation
+        self.distances[cell] = 0
+        self.enqueue(cell)
+
+    def enqueue(self, cell):
+        """Ставит ячейку в очередь поиска, если ее там еще нет."""
+        if self.queued[cell] != self.generation:
+            self.queued[cell] = self.generation
+            self.queue[self.queue_end % self.size] = cell
+            self.queue_end += 1
+
+    def search(self, free_cells, deadline):
+        """Продолжает поиск в ширину от яблок до срока deadline.
+
+        Сначала стираются расстояния от съеденных яблок (см. erase),
+        затем ячейки из очереди обновляют соседей, если путь через них
+        короче найденного. Добавленное яблоко нарушает порядок очереди
+        по расстоянию, поэтому ячейка может обработаться несколько раз,
+        но каждый раз - с меньшим расстоянием.
+
+        Возвращает True, если поле расстояний построено полностью.
+        """
+        if not self.erase(free_cells, deadline):
+            return False
+        width, kinds, size = free_cells.width, free_cells.kinds, self.size
+        marks, distances, queue = self.marks, self.distances, self.queue
+        owners, queued, dead = self.owners, self.queued, self.dead
+        generation, end = self.generation, self.queue_end
+        for index in range(self.queue_start, end + size):
+            if index >= end:
+                self.queue_start = self.queue_end = end
+                return True
+            if (index % DEADLINE_CHECK_INTERVAL == 0
+                    and perf_counter() > deadline):
+                self.queue_start, self.queue_end = index, end
+                return False
+            cell = queue[index % size]
+            queued[cell] = 0
+            owner = owners[cell]
+            if marks[cell] != generation or owner in dead:
+                continue
+            distance = distances[cell] + 1
+            for neighbour in neighbours(cell, width, size):
+                # Через преграды и мусор путь не прокладывается.
+                if kinds[neighbour] <= CELL_APPLE and (
+                        marks[neighbour] != generation
+                        or distance < distances[neighbour]):
+                    marks[neighbour] = generation
+                    distances[neighbour] = distance
+                    owners[neighbour] = owner
+                    if queued[neighbour] != generation:
+                        queued[neighbour] = generation
+                        queue[end % size] = neighbour
+                        end += 1
+        return True
+
+    def erase(self, free_cells, deadline):
+        """Стирает расстояния, найденные от съеденных яблок.
+
+        Заливка идет от ячеек съеденных яблок по ячейкам с их метками,
+        а соседние ячейки с расстояниями от других яблок ставятся
+        в очередь поиска, чтобы заполнить стертые ячейки заново.
+
+        Возвращает True, если стерто все до срока deadline.
+        """
+        width, size, stale = free_cells.width, self.size, self.stale
+        marks, owners, dead = self.marks, self.owners, self.dead
+        generation = self.generation
+        for step in range(size + len(stale)):
+            if not stale:
+                return True
+            if (step % DEADLINE_CHECK_INTERVAL == 0
+                    and perf_counter() > deadline):
+                return False
+            cell = stale.pop()
+            if marks[cell] != generation or owners[cell] not in dead:
+                continue
+            marks[cell] = 0
+            for neighbour in neighbours(cell, width, size):
+                if marks[neighbour] != generation:
+                    continue
+                if owners[neighbour] in dead:
+                    stale.append(neighbour)
+                else:
+                    self.enqueue(neighbour)
+        return not stale
+
+    def distance(self, game, cell):
+        """Возвращает расстояние от ячейки до ближайшего яблока.
+
+        Если поиск до ячейки еще не дошел, расстояние оценивается
+        по прямой до ближайшего яблока с учетом замкнутости поля.
+        """
+        if (self.marks[cell] == self.generation
+                and self.owners[cell] not in self.dead):
+            return self.distances[cell]
+        free_cells = game.free_cells
+        width, height = free_cells.width, free_cells.height
+        x_pos, y_pos = free_cells.coordinates(cell)
+        nearest = width + height
+        for apple in game.apples:
+            apple_x, apple_y = free_cells.coordinates(apple.position)
+            dx = abs(x_pos - apple_x)
+            dy = abs(y_pos - apple_y)
+            nearest = min(nearest,
+                          min(dx, width - dx) + min(dy, height - dy))
+        return UNKNOWN_DISTANCE + nearest
+
+    def choose(self, game, snake, deadline):
+        """Выбирает ход змейки: ближе к яблоку, но без ловушек."""
+        free_cells = game.free_cells
+        head = snake.get_head_position()
+        tail = snake.positions[-1]
+        # Хвост уходит из своей ячейки на этом же тике, если змейка
+        # не растет после съеденного яблока.
+        tail_moves = len(snake.positions) >= snake.length
+        dx, dy = snake.direction
+        candidates = []
+        for direction in (UP, DOWN, LEFT, RIGHT):
+            if direction == (-dx, -dy):
+                continue
+            cell = free_cells.shift(head, direction)
+            if self.is_passable(free_cells, cell) or (
+                    tail_moves and cell == tail):
+                candidates.append(
+                    (self.distance(game, cell), direction, cell))
+        candidates.sort()
+        best_direction, best_area = None, -1
+        for _, direction, cell in candidates:
+            area = self.free_area(free_cells, snake, cell, deadline)
+            if area >= snake.length:
+                return direction
+            if area > best_area:
+                best_direction, best_area = direction, area
+        return best_direction
+
+    @staticmethod
+    def is_passable(free_cells, cell):
+        """Проверяет, что в ячейке нет змеек, преград и мусора."""
+        kind = free_cells.kinds[cell]
+        # Пустая ячейка или ячейка, где лежит только яблоко.
+        return kind <= CELL_APPLE and free_cells.counts[cell] == kind
+
+    def free_area(self, free_cells, snake, start, deadline):
+        """Считает свободное место, доступное из ячейки start.
+
+        Заливка останавливается, как только найдено место для всей
+        змейки или достигнут ее хвост - тогда змейка не запрет себя,
+        следуя за хвостом. Если истек срок deadline, ход считается
+        безопасным: проверить его уже некогда.
+        """
+        enough = snake.length
+        width, size = free_cells.width, self.size
+        tail = snake.positions[-1]
+        marks, queue = self.flood_marks, self.flood_queue
+        self.flood_generation += 1
+        generation = self.flood_generation
+        marks[start] = generation
+        queue[0] = start
+        end = 1
+        for index in range(size):
+            if index >= end or end >= enough:
+                return end
+            if (index % DEADLINE_CHECK_INTERVAL == 0
+                    and perf_counter() > deadline):
+                return enough
+            for neighbour in neighbours(queue[index], width, size):
+                if neighbour == tail and neighbour != start:
+                    return enough
+                if (marks[neighbour] != generation
+                        and self.is_passable(free_cells, neighbour)):
+                    marks[neighbour] = generation
+                    queue[end] = neighbour
+                    end += 1
+        return end
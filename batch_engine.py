@@ -0,0 +1,409 @@
+from snake_engine import (
+    APPLE_EATEN, BARRIER_ATTEMPTS, BARRIER_DELAY, BARRIER_FIGURES,
+    BARRIER_SCAN_LIMIT, BOARD_FULL, CELL_APPLE, CELL_BARRIER, CELL_EMPTY,
+    CELL_GARBAGE, DIRECTIONS, GARBAGE_DELAY, GARBAGE_EATEN, GRID_HEIGHT,
+    GRID_WIDTH, HIT_BARRIER, HIT_ITSELF, MAX_BOARD_SIZE, RIGHT, STARVED
+)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy нужен только этому модулю.
+    np = None
+
+
+# Номер хода в step() - индекс направления в DIRECTIONS движка.
+# Противоположное направление к номеру d имеет номер d ^ 1.
+
+# Номер хода "не поворачивать":
+NO_TURN = -1
+
+# Коды событий тика по играм; EVENTS[код] - событие, как у GameState.step:
+NO_EVENT = 0
+APPLE_CODE = 1
+GARBAGE_CODE = 2
+HIT_ITSELF_CODE = 3
+HIT_BARRIER_CODE = 4
+STARVED_CODE = 5
+BOARD_FULL_CODE = 6
+EVENTS = (None, APPLE_EATEN, GARBAGE_EATEN, HIT_ITSELF, HIT_BARRIER,
+          STARVED, BOARD_FULL)
+
+# Сколько раз случайная ячейка выбирается заново, прежде чем свободная
+# ячейка ищется перебором поля:
+RANDOM_CELL_ATTEMPTS = 16
+
+
+class BatchGame:
+    """Много игр, которые идут одновременно тик в тик.
+
+    Состояние K игр хранится в массивах NumPy, и один вызов step()
+    выполняет тик всех игр сразу векторными операциями: поворот,
+    движение с переходом через край поля, поедание яблок и мусора,
+    таймеры мусора и преград, столкновения и начало игры заново.
+    Правила те же, что у GameState с одной змейкой, яблоком и мусором;
+    случайные решения принимаются генератором NumPy, поэтому отдельные
+    партии не совпадают с GameState с тем же зерном, но распределения
+    совпадают.
+
+    Состояние:
+    - snake_grid, kind_grid: сетки (K, высота, ширина) - число сегментов
+    змейки и вид объекта (CELL_*) в каждой ячейке;
+    - bodies: кольцевые буферы ячеек тела, голова - в head_index,
+    сегментов в теле - sizes, длина змейки - lengths;
+    - heads, directions: ячейка головы и номер направления;
+    - apples, garbage: ячейки яблока и мусора;
+    - garbage_due, barrier_due: тики срабатывания таймеров мусора
+    и преград.
+
+    Аргументы:
+    - games: число игр K.
+    - width, height: размер поля в ячейках.
+    - barrier_count: сколько преград ставится на поле в начале игры.
+    - seed: зерно генератора случайных чисел NumPy.
+    """
+
+    def __init__(self, games, width=GRID_WIDTH, height=GRID_HEIGHT,
+                 barrier_count=0, seed=None):
+        if np is None:
+            raise ImportError('Для пакетного движка нужен NumPy.')
+        if not (0 < width <= MAX_BOARD_SIZE and 0 < height <= MAX_BOARD_SIZE):
+            raise ValueError(f'Размер поля должен быть от 1 до '
+                             f'{MAX_BOARD_SIZE} ячеек.')
+        self.games = games
+        self.width = width
+        self.height = height
+        self.cell_count = width * height
+        self.center = height // 2 * width + width // 2
+        self.barrier_count = barrier_count
+        self.rng = np.random.default_rng(seed)
+        self.ticks = 0
+        self.rows = np.arange(games)
+        self.offsets = self.rows * self.cell_count
+        self.snake_cells = np.zeros((games, self.cell_count), np.uint8)
+        self.kinds = np.zeros((games, self.cell_count), np.uint8)
+        # В теле не больше сегментов, чем ячеек на поле, и еще одна
+        # голова на время тика, пока не убран хвост.
+        self.capacity = self.cell_count + 1
+        self.bodies = np.zeros((games, self.capacity), np.int32)
+        self.head_index = np.zeros(games, np.int64)
+        self.sizes = np.zeros(games, np.int64)
+        self.lengths = np.zeros(games, np.int64)
+        self.heads = np.zeros(games, np.int64)
+        self.directions = np.zeros(games, np.int8)
+        self.apples = np.zeros(games, np.int64)
+        self.garbage = np.zeros(games, np.int64)
+        self.garbage_due = np.zeros(games, np.int64)
+        self.barrier_due = np.zeros(games, np.int64)
+        self.dx = np.array([direction[0] for direction in DIRECTIONS])
+        self.dy = np.array([direction[1] for direction in DIRECTIONS])
+        # Сдвиги ячеек фигур преград от первой ячейки фигуры: массивы
+        # (число фигур, 3). Фигуры меньше трех ячеек дополнены повтором
+        # первой ячейки, чтобы все фигуры проверялись одной операцией.
+        offsets = [[(dx - figure[0][0], dy - figure[0][1])
+                    for dx, dy in figure + figure[:1] * (3 - len(figure))]
+                   for figure in BARRIER_FIGURES]
+        self.figure_dx = np.array(offsets)[:, :, 0]
+        self.figure_dy = np.array(offsets)[:, :, 1]
+        self.start_over(self.rows, base_tick=0)
+        self.directions[:] = DIRECTIONS.index(RIGHT)
+
+    @property
+    def snake_grid(self):
+        """Число сегментов змейки по ячейкам: массив (K, высота, ширина)."""
+        return self.snake_cells.reshape(self.games, self.height, self.width)
+
+    @property
+    def kind_grid(self):
+        """Вид объекта по ячейкам: массив (K, высота, ширина)."""
+        return self.kinds.reshape(self.games, self.height, self.width)
+
+    def load_game(self, index, game):
+        """Переносит в игру index состояние игры GameState.
+
+        Поддерживаются игры с одной змейкой, яблоком и мусором. Таймеры
+        переносятся с тем же числом тиков до срабатывания.
+        """
+        snake = game.snake
+        free_cells = game.free_cells
+        if free_cells.width != self.width or (
+                free_cells.height != self.height):
+            raise ValueError('Размер поля игры не совпадает с пакетом.')
+        self.snake_cells[index] = np.frombuffer(
+            free_cells.counts, np.uint8) - (np.frombuffer(
+                free_cells.kinds, np.uint8) != CELL_EMPTY)
+        self.kinds[index] = np.frombuffer(free_cells.kinds, np.uint8)
+        size = len(snake.positions)
+        # Голова - в последней ячейке буфера, хвост - перед ней.
+        self.bodies[index, :size] = list(reversed(snake.positions))
+        self.head_index[index] = size - 1
+        self.sizes[index] = size
+        self.lengths[index] = snake.length
+        self.heads[index] = snake.get_head_position()
+        self.directions[index] = DIRECTIONS.index(
+            snake.next_direction or snake.direction)
+        self.apples[index] = game.apple.position
+        self.garbage[index] = game.garbage.position
+        for due, timer in ((self.garbage_due, game.garbage.timer),
+                           (self.barrier_due, game.barriers.timer)):
+            due[index] = self.ticks + timer[0] - game.scheduler.tick
+
+    def step(self, actions=None):
+        """Выполняет один тик всех игр.
+
+        Аргументы:
+        - actions: номера направлений из DIRECTIONS по играм или NO_TURN.
+        None - ни одна змейка не поворачивает.
+
+        Возвращает массив кодов событий тика по играм (см. EVENTS).
+        """
+        if actions is not None:
+            self.turn(np.asarray(actions))
+        self.ticks += 1
+        events = np.zeros(self.games, np.int8)
+        self.move()
+        self.check_items(events)
+        self.advance_timers(events)
+        self.check_collisions(events)
+        return events
+
+    def turn(self, actions):
+        """Поворачивает змейки, если поворот не разворот."""
+        turning = (actions >= 0) & (actions != self.directions ^ 1)
+        self.directions[turning] = actions[turning]
+
+    def move(self):
+        """Двигает все змейки на одну ячейку и убирает лишние хвосты."""
+        x_pos = self.heads % self.width + self.dx[self.directions]
+        y_pos = self.heads // self.width + self.dy[self.directions]
+        self.heads = (y_pos % self.height * self.width
+                      + x_pos % self.width)
+        self.head_index = (self.head_index + 1) % self.capacity
+        self.bodies[self.rows, self.head_index] = self.heads
+        self.snake_cells.reshape(-1)[self.offsets + self.heads] += 1
+        self.sizes += 1
+        # Хвост убирается один раз за тик, а после съеденного мусора -
+        # два раза: змейка стала на сегмент короче.
+        growing = np.flatnonzero(self.sizes > self.lengths)
+        while len(growing):
+            tails = self.bodies[growing, (self.head_index[growing]
+                                          - self.sizes[growing] + 1)
+                                % self.capacity]
+            self.snake_cells.reshape(-1)[self.offsets[growing] + tails] -= 1
+            self.sizes[growing] -= 1
+            growing = growing[self.sizes[growing] > self.lengths[growing]]
+
+    def check_items(self, events):
+        """Обрабатывает яблоки и мусор, съеденные змейками."""
+        kinds = self.kinds.reshape(-1)[self.offsets + self.heads]
+        apple_games = np.flatnonzero(kinds == CELL_APPLE)
+        garbage_games = np.flatnonzero(kinds == CELL_GARBAGE)
+        starved = garbage_games[self.lengths[garbage_games] == 1]
+        garbage_games = garbage_games[self.lengths[garbage_games] > 1]
+        events[apple_games] = APPLE_CODE
+        events[garbage_games] = GARBAGE_CODE
+        events[starved] = STARVED_CODE
+        self.lengths[apple_games] += 1
+        self.lengths[garbage_games] -= 1
+        full = self.move_items(self.apples, apple_games, CELL_APPLE)
+        full = np.union1d(full, self.move_items(
+            self.garbage, garbage_games, CELL_GARBAGE))
+        # Таймер мусора отсчитывается от прошлого тика планировщика.
+        self.set_garbage_timers(np.setdiff1d(garbage_games, full),
+                                self.ticks - 1)
+        if len(full):
+            events[full] = BOARD_FULL_CODE
+            self.start_over(full, self.ticks - 1)
+
+    def move_items(self, positions, games, kind):
+        """Переставляет предмет вида kind в играх games на новое место.
+
+        Возвращает игры, в которых не нашлось свободной ячейки.
+        """
+        self.kinds.reshape(-1)[self.offsets[games] + positions[games]] = (
+            CELL_EMPTY)
+        cells, full = self.random_free_cells(games)
+        placed = cells >= 0
+        positions[games[placed]] = cells[placed]
+        self.kinds.reshape(-1)[self.offsets[games[placed]]
+                               + cells[placed]] = kind
+        return full
+
+    def random_free_cells(self, games):
+        """Выбирает по случайной свободной ячейке в играх games.
+
+        Возвращает массив ячеек (-1 там, где свободных ячеек нет)
+        и игры без свободных ячеек.
+        """
+        cells = np.full(len(games), -1, np.int64)
+        pending = np.arange(len(games))
+        for _ in range(RANDOM_CELL_ATTEMPTS):
+            if not len(pending):
+                return cells, games[:0]
+            guesses = self.rng.integers(0, self.cell_count, len(pending))
+            free = self.is_free(games[pending], guesses)
+            cells[pending[free]] = guesses[free]
+            pending = pending[~free]
+        for index in pending:
+            row = games[index]
+            free_cells = np.flatnonzero(
+                (self.snake_cells[row] == 0) & (self.kinds[row] == 0))
+            if len(free_cells):
+                cells[index] = self.rng.choice(free_cells)
+        return cells, games[cells < 0]
+
+    def is_free(self, games, cells):
+        """Проверяет, свободны ли ячейки cells в играх games."""
+        flat = self.offsets[games] + cells
+        return ((self.snake_cells.reshape(-1)[flat] == 0)
+                & (self.kinds.reshape(-1)[flat] == CELL_EMPTY))
+
+    def set_garbage_timers(self, games, base_tick):
+        """Заводит таймеры мусора на GARBAGE_DELAY тиков от base_tick."""
+        low, high = GARBAGE_DELAY
+        self.garbage_due[games] = base_tick + self.rng.integers(
+            low, high + 1, len(games))
+
+    def set_barrier_timers(self, games, base_tick):
+        """Заводит таймеры преград на BARRIER_DELAY тиков от base_tick."""
+        low, high = BARRIER_DELAY
+        self.barrier_due[games] = base_tick + self.rng.integers(
+            low, high + 1, len(games))
+
+    def advance_timers(self, events):
+        """Переставляет мусор и ставит преграды по наступившим таймерам.
+
+        Игры, начатые заново из-за заполненного поля, пропускают таймеры
+        этого тика, как GameState.step.
+        """
+        active = events != BOARD_FULL_CODE
+        garbage_games = np.flatnonzero(
+            active & (self.garbage_due <= self.ticks))
+        full = self.move_items(self.garbage, garbage_games, CELL_GARBAGE)
+        self.set_garbage_timers(np.setdiff1d(garbage_games, full),
+                                self.ticks)
+        barrier_games = np.flatnonzero(
+            active & (self.barrier_due <= self.ticks))
+        barrier_games = np.setdiff1d(barrier_games, full)
+        self.place_barriers(barrier_games)
+        self.set_barrier_timers(barrier_games, self.ticks)
+        if len(full):
+            # Мусору не нашлось места - поле заполнено.
+            events[full] = BOARD_FULL_CODE
+            self.start_over(full, self.ticks)
+
+    def place_barriers(self, games):
+        """Ставит по случайной фигуре преграды в играх games.
+
+        Как Barrier.randomize_position: фигуре дается BARRIER_ATTEMPTS
+        случайных мест, затем место ищется по всему полю, а если
+        не нашлось и там, пробуются остальные фигуры.
+        """
+        figures = self.rng.integers(0, len(BARRIER_FIGURES), len(games))
+        for _ in range(BARRIER_ATTEMPTS):
+            if not len(games):
+                return
+            anchors, _ = self.random_free_cells(games)
+            cells = self.figure_cells(anchors, figures)
+            placed = (anchors >= 0) & self.is_free(games[:, None],
+                                                   cells).all(axis=1)
+            self.kinds.reshape(-1)[(self.offsets[games[placed], None]
+                                    + cells[placed]).ravel()] = (
+                CELL_BARRIER)
+            games, figures = games[~placed], figures[~placed]
+        for game, figure in zip(games, figures):
+            self.place_barrier_exhaustively(game, figure)
+
+    def figure_cells(self, anchors, figures):
+        """Возвращает ячейки фигур: массив (число мест, 3).
+
+        Аргументы:
+        - anchors: места первых ячеек фигур, как у случайных попыток
+        Barrier.find_place.
+        - figures: номера фигур в BARRIER_FIGURES.
+        """
+        x_pos = anchors[:, None] % self.width + self.figure_dx[figures]
+        y_pos = anchors[:, None] // self.width + self.figure_dy[figures]
+        return y_pos % self.height * self.width + x_pos % self.width
+
+    def place_barrier_exhaustively(self, game, figure):
+        """Ставит преграду в игре, где случайные места не подошли.
+
+        Для выбранной фигуры остается перебор всего поля, затем все
+        фигуры в случайном порядке пробуются целиком, как в
+        Barrier.find_place.
+        """
+        free_count = int(self.is_free(np.full(self.cell_count, game),
+                                      np.arange(self.cell_count)).sum())
+        if not free_count:
+            return
+        attempts = [(figure, False)] + [
+            (index, True)
+            for index in self.rng.permutation(len(BARRIER_FIGURES))]
+        for index, random_attempts in attempts:
+            cells = self.find_place(game, index, free_count,
+                                    random_attempts)
+            if cells is not None:
+                self.kinds[game, cells] = CELL_BARRIER
+                return
+
+    def find_place(self, game, figure, free_count, random_attempts=True):
+        """Выбирает место для фигуры в одной игре или возвращает None."""
+        if random_attempts:
+            anchors, _ = self.random_free_cells(
+                np.full(BARRIER_ATTEMPTS, game))
+            cells = self.figure_cells(anchors, figure)
+            fits = np.flatnonzero(self.is_free(
+                np.full((BARRIER_ATTEMPTS, 1), game), cells).all(axis=1))
+            if len(fits):
+                return cells[fits[0]]
+        if free_count > BARRIER_SCAN_LIMIT:
+            return None
+        cells = self.figure_cells(np.arange(self.cell_count), figure)
+        fits = np.flatnonzero(self.is_free(
+            np.full((self.cell_count, 1), game), cells).all(axis=1))
+        if not len(fits):
+            return None
+        return cells[self.rng.choice(fits)]
+
+    def check_collisions(self, events):
+        """Находит разбившиеся змейки и начинает их игры заново."""
+        flat = self.offsets + self.heads
+        alive = events < HIT_ITSELF_CODE
+        hit_itself = alive & (self.snake_cells.reshape(-1)[flat] > 1)
+        hit_barrier = (alive & ~hit_itself
+                       & (self.kinds.reshape(-1)[flat] == CELL_BARRIER))
+        events[hit_itself] = HIT_ITSELF_CODE
+        events[hit_barrier] = HIT_BARRIER_CODE
+        dead = np.flatnonzero(hit_itself | hit_barrier
+                              | (events == STARVED_CODE))
+        if len(dead):
+            self.start_over(dead, self.ticks)
+
+    def start_over(self, games, base_tick):
+        """Начинает игры games заново, как GameState.start_over.
+
+        Аргументы:
+        - base_tick: тик планировщика, от которого отсчитываются новые
+        таймеры.
+        """
+        self.snake_cells[games] = 0
+        self.kinds[games] = CELL_EMPTY
+        self.snake_cells[games, self.center] = 1
+        self.head_index[games] = 0
+        self.bodies[games, 0] = self.center
+        self.heads[games] = self.center
+        self.sizes[games] = self.lengths[games] = 1
+        self.directions[games] = self.rng.integers(0, len(DIRECTIONS),
+                                                   len(games))
+        self.set_barrier_timers(games, base_tick)
+        for positions, kind in ((self.apples, CELL_APPLE),
+                                (self.garbage, CELL_GARBAGE)):
+            # Старые ячейки уже очищены, поэтому move_items ничего
+            # не освобождает, а только выбирает новое место.
+            positions[games] = self.center
+            self.move_items(positions, games, kind)
+        self.set_garbage_timers(games, base_tick)
+        for _ in range(self.barrier_count):
+            self.place_barriers(games)
+        if self.barrier_count:
+            self.set_barrier_timers(games, base_tick)
@@ -0,0 +1,337 @@
+import argparse
+import json
+import os
+import platform
+import signal
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import batch_engine
+import snake_engine as engine
+
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# Длины змейки, на которых измеряется скорость тиков игры:
+SNAKE_LENGTHS = (1, 10, 100, 500)
+
+# Заполненность поля (доля занятых ячеек) для замеров появления объектов:
+FILL_LEVELS = (0.0, 0.25, 0.5, 0.75, 0.9, 0.99)
+
+# Поле и число яблок и мусора для замера режима с множеством предметов:
+FEAST_BOARD = (200, 200)
+FEAST_ITEMS = 1000
+
+# Число змеек для замера режима арены (на поле FEAST_BOARD):
+ARENA_SNAKES = 500
+
+# Число игр для замера пакетного движка:
+BATCH_GAMES = 10000
+
+# Предел времени на один замер появления объекта, в секундах:
+SPAWN_TIME_LIMIT = 2.0
+
+
+class SpawnTimeout(Exception):
+    """Объект не удалось поставить на поле за отведенное время."""
+
+
+@contextmanager
+def time_limit(seconds):
+    """Прерывает блок кода через seconds секунд (где есть SIGALRM)."""
+    if not hasattr(signal, 'setitimer'):
+        yield
+        return
+
+    def on_alarm(signum, frame):
+        raise SpawnTimeout
+
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def cycle_directions(width=engine.GRID_WIDTH, height=engine.GRID_HEIGHT):
+    """Строит гамильтонов цикл по полю: ячейка -> направление хода.
+
+    Змейка идет змейкой по строкам, не заходя в нулевой столбец,
+    а по нему возвращается наверх. Высота поля должна быть четной.
+    """
+    directions = {}
+    for y_pos in range(height):
+        row = range(1, width) if y_pos % 2 == 0 else range(width - 1, 0, -1)
+        for x_pos in row:
+            directions[(x_pos, y_pos)] = (
+                engine.RIGHT if y_pos % 2 == 0 else engine.LEFT)
+        directions[(width - 1, y_pos) if y_pos % 2 == 0
+                   else (1, y_pos)] = engine.DOWN
+    directions[(1, height - 1)] = engine.LEFT
+    for y_pos in range(1, height):
+        directions[(0, y_pos)] = engine.UP
+    directions[(0, 0)] = engine.RIGHT
+    return directions
+
+
+def cycle_action(game, directions):
+    """Возвращает ход змейки по гамильтонову циклу."""
+    return directions[
+        game.free_cells.coordinates(game.snake.get_head_position())]
+
+
+def prepare_game(length, directions, seed=0):
+    """Создает игру со змейкой заданной длины, уложенной вдоль цикла.
+
+    Преграды отключены, чтобы змейка не разбивалась о них во время
+    замера, а яблоки и мусор убраны с поля, чтобы длина змейки
+    оставалась той, что указана в названии результата.
+    """
+    game = engine.GameState(seed=seed)
+    snake = game.snake
+    snake.length = length
+    for _ in range(length - 1):
+        snake.direction = cycle_action(game, directions)
+        snake.move()
+    for item in game.apples + game.garbage_items:
+        item.remove()
+    for garbage in game.garbage_items:
+        game.scheduler.cancel(garbage.timer)
+    game.scheduler.cancel(game.barriers.timer)
+    return game
+
+
+def bench_steps(ticks):
+    """Измеряет число тиков игры в секунду при разной длине змейки."""
+    directions = cycle_directions()
+    results = {}
+    for length in SNAKE_LENGTHS:
+        game = prepare_game(length, directions)
+        start = time.perf_counter()
+        for _ in range(ticks):
+            game.step(cycle_action(game, directions))
+        elapsed = time.perf_counter() - start
+        results[f'step.ticks_per_s.length_{length}'] = ticks / elapsed
+    return results
+
+
+def bench_feast(ticks):
+    """Измеряет число тиков в секунду с тысячами предметов на поле."""
+    width, height = FEAST_BOARD
+    directions = cycle_directions(width, height)
+    game = engine.GameState(seed=3, width=width, height=height,
+                            apple_count=FEAST_ITEMS,
+                            garbage_count=FEAST_ITEMS,
+                            barrier_count=FEAST_ITEMS // 10)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        game.step(cycle_action(game, directions))
+    elapsed = time.perf_counter() - start
+    return {'step.ticks_per_s.feast': ticks / elapsed}
+
+
+def bench_arena(ticks):
+    """Измеряет число тиков в секунду на арене с сотнями змеек."""
+    width, height = FEAST_BOARD
+    game = engine.GameState(seed=4, width=width, height=height,
+                            apple_count=FEAST_ITEMS // 10,
+                            garbage_count=FEAST_ITEMS // 10,
+                            snake_count=ARENA_SNAKES)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        game.step(game.bot(game, game.snake))
+    elapsed = time.perf_counter() - start
+    return {'step.ticks_per_s.arena': ticks / elapsed}
+
+
+def bench_batch(ticks):
+    """Измеряет число игровых тиков в секунду в пакетном движке.
+
+    Змейки поворачивают наугад на каждом десятом тике. Если NumPy
+    не установлен, результат - None.
+    """
+    if batch_engine.np is None:
+        return {'batch.game_ticks_per_s': None}
+    np = batch_engine.np
+    batch = batch_engine.BatchGame(BATCH_GAMES, seed=5)
+    rng = np.random.default_rng(5)
+    actions = [np.where(rng.random(BATCH_GAMES) < 0.1,
+                        rng.integers(0, 4, BATCH_GAMES),
+                        batch_engine.NO_TURN) for _ in range(ticks)]
+    start = time.perf_counter()
+    for tick_actions in actions:
+        batch.step(tick_actions)
+    elapsed = time.perf_counter() - start
+    return {'batch.game_ticks_per_s': BATCH_GAMES * ticks / elapsed}
+
+
+def fill_board(game, fill_level):
+    """Занимает долю fill_level ячеек поля, не трогая объекты игры."""
+    free_cells = game.free_cells
+    total = engine.GRID_WIDTH * engine.GRID_HEIGHT
+    while total - len(free_cells) < fill_level * total:
+        free_cells.occupy(free_cells.random_cell(game.rng))
+
+
+def time_spawn(spawn, repeats):
+    """Возвращает среднее время вызова spawn в микросекундах.
+
+    Если все вызовы не уложились в SPAWN_TIME_LIMIT, возвращает None.
+    """
+    start = time.perf_counter()
+    try:
+        with time_limit(SPAWN_TIME_LIMIT):
+            for _ in range(repeats):
+                spawn()
+    except (SpawnTimeout, engine.BoardFullError):
+        return None
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def bench_spawn(repeats):
+    """Измеряет время появления яблока, мусора и преграды."""
+    results = {}
+    for fill_level in FILL_LEVELS:
+        game = engine.GameState(seed=1)
+        fill_board(game, fill_level)
+        suffix = f'fill_{round(fill_level * 100)}'
+        results[f'spawn.apple_us.{suffix}'] = time_spawn(
+            game.apple.randomize_position, repeats)
+        results[f'spawn.garbage_us.{suffix}'] = time_spawn(
+            game.garbage.randomize_position, repeats)
+
+        def spawn_barrier():
+            game.barriers.randomize_position()
+            game.barriers.reset()
+
+        results[f'spawn.barrier_us.{suffix}'] = time_spawn(
+            spawn_barrier, repeats)
+    return results
+
+
+def bench_draw(frames):
+    """Измеряет время отрисовки каждого объекта за кадр."""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame as pg
+
+    import the_snake
+
+    the_snake.init_display()
+    game = the_snake.SnakeGame(seed=2)
+    info_panel = the_snake.InfoPanel()
+    directions = cycle_directions()
+    game.scheduler.cancel(game.barriers.timer)
+    for _ in range(20):
+        game.barriers.randomize_position()
+    timings = dict.fromkeys(
+        ('snake', 'apple', 'garbage', 'barrier', 'panel', 'display'), 0.0)
+    for frame in range(frames):
+        game.step(cycle_action(game, directions))
+        rects = []
+        for name, draw in (('snake', game.snake.draw),
+                           ('apple', game.apple.draw),
+                           ('garbage', game.garbage.draw),
+                           ('barrier', game.barriers.draw)):
+            start = time.perf_counter()
+            rects += draw()
+            timings[name] += time.perf_counter() - start
+        start = time.perf_counter()
+        rects += info_panel.update_panel(game.snake.length, frame // 100)
+        timings['panel'] += time.perf_counter() - start
+        start = time.perf_counter()
+        pg.display.update(rects)
+        timings['display'] += time.perf_counter() - start
+    return {f'draw.{name}_us': total / frames * 1e6
+            for name, total in timings.items()}
+
+
+def bench_startup():
+    """Измеряет время импорта модулей игры в новом интерпретаторе."""
+    results = {}
+    for module in ('snake_engine', 'the_snake'):
+        code = ('import time; start = time.perf_counter(); '
+                f'import {module}; print(time.perf_counter() - start)')
+        output = subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, text=True,
+            cwd=BASE_DIR, check=True).stdout
+        results[f'startup.{module}_ms'] = float(output.split()[-1]) * 1000
+    return results
+
+
+def git_commit():
+    """Возвращает хэш текущего коммита или None вне git."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            cwd=BASE_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(quick=False):
+    """Запускает все замеры и возвращает отчет."""
+    scale = 10 if quick else 1
+    results = {}
+    results.update(bench_steps(ticks=50000 // scale))
+    results.update(bench_feast(ticks=50000 // scale))
+    results.update(bench_arena(ticks=2000 // scale))
+    results.update(bench_batch(ticks=1000 // scale))
+    results.update(bench_spawn(repeats=2000 // scale))
+    results.update(bench_draw(frames=2000 // scale))
+    results.update(bench_startup())
+    return {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+
+def compare(report, baseline):
+    """Печатает отношение новых результатов к предыдущим."""
+    old_results = baseline['results']
+    for name, value in report['results'].items():
+        old_value = old_results.get(name)
+        if value is None or not old_value:
+            ratio = '-'
+        else:
+            ratio = f'{value / old_value:.2f}x'
+        print(f'{name:40} {format_value(old_value):>12} '
+              f'{format_value(value):>12} {ratio:>8}')
+
+
+def format_value(value):
+    """Форматирует результат замера для печати."""
+    return 'нет' if value is None else f'{value:.1f}'
+
+
+def main():
+    """Запускает замеры из командной строки."""
+    parser = argparse.ArgumentParser(
+        description='Замеры производительности игры "Змейка".')
+    parser.add_argument('-o', '--output', default='benchmark.json',
+                        help='файл для результатов в формате JSON')
+    parser.add_argument('--compare', metavar='PATH',
+                        help='сравнить с результатами из файла')
+    parser.add_argument('--quick', action='store_true',
+                        help='быстрый прогон с меньшим числом повторов')
+    args = parser.parse_args()
+
+    report = run(args.quick)
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            compare(report, json.load(file))
+    else:
+        for name, value in report['results'].items():
+            print(f'{name:40} {format_value(value):>12}')
+
+
+if __name__ == '__main__':
+    main()
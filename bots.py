@@ -0,0 +1,10 @@
+from autopilot import Autopilot
+from hamilton import HamiltonSolver
+from snake_engine import WanderBot
+
+
+# Боты, которые могут управлять змейкой, по именам для командной строки.
+# Бот - вызываемый объект bot(game, snake), который возвращает новое
+# направление змейки или None:
+BOTS = {'wander': WanderBot, 'autopilot': Autopilot,
+        'hamilton': HamiltonSolver}
@@ -0,0 +1,469 @@
+import os
+import struct
+from array import array
+from itertools import count
+from math import inf
+from pathlib import Path
+from time import perf_counter
+
+from autopilot import DEADLINE_CHECK_INTERVAL, Autopilot
+from snake_engine import (
+    CELL_BARRIER, DIRECTIONS, DOWN, LEFT, RIGHT, UP, step_codes
+)
+
+
+# Каталог, в котором хранятся рассчитанные циклы:
+CYCLE_CACHE_DIR = Path.home() / '.cache' / 'the_snake' / 'cycles'
+
+# Сколько циклов (по одному на размер поля) хранится в кэше. При
+# переполнении удаляются циклы, которые дольше всех не загружались.
+CYCLE_CACHE_LIMIT = 16
+
+# Формат файла цикла:
+# - заголовок: сигнатура CYCLE_MAGIC, версия формата (1 байт), размер
+#   поля в ячейках (по 2 байта на ширину и высоту), число ячеек цикла
+#   и его первая ячейка (по 4 байта);
+# - направления ходов по циклу от первой ячейки, по 2 бита на ход
+#   (номер направления в DIRECTIONS), по четыре хода в байте.
+CYCLE_MAGIC = b'SNKC'
+CYCLE_VERSION = 1
+HEADER = struct.Struct('<4sBHHII')
+
+# Пока змейка занимает меньше этой доли цикла, она срезает путь
+# к яблоку; длинная змейка идет строго по циклу:
+SHORTCUT_LIMIT = 0.5
+
+# Сколько ячеек цикла оставляется между срезом и хвостом про запас,
+# чтобы растущей змейке было куда двигаться:
+SHORTCUT_MARGIN = 4
+
+# Время, которое бот может потратить на один ход, перестраивая цикл
+# под новые преграды, в секундах:
+CYCLE_BUDGET = 0.001
+
+# Флаги ребер остовного дерева блоков 2x2: ребро к правому и нижнему
+# соседу. Ребра к левому и верхнему соседу хранятся у соседа.
+EDGE_RIGHT = 1
+EDGE_DOWN = 2
+
+
+class CycleFormatError(Exception):
+    """Данные не являются циклом или повреждены."""
+
+
+def block_neighbours(block, blocks_x, blocks_y, wrap_x, wrap_y):
+    """Перебирает соседние блоки: пары (блок, ребро, блок с флагом).
+
+    Флаг ребра хранится у левого или верхнего из двух блоков.
+    """
+    y_pos, x_pos = divmod(block, blocks_x)
+    if x_pos + 1 < blocks_x or wrap_x:
+        right = y_pos * blocks_x + (x_pos + 1) % blocks_x
+        yield right, EDGE_RIGHT, block
+    if x_pos > 0 or wrap_x:
+        left = y_pos * blocks_x + (x_pos - 1) % blocks_x
+        yield left, EDGE_RIGHT, left
+    if y_pos + 1 < blocks_y or wrap_y:
+        down = (y_pos + 1) % blocks_y * blocks_x + x_pos
+        yield down, EDGE_DOWN, block
+    if y_pos > 0 or wrap_y:
+        up = (y_pos - 1) % blocks_y * blocks_x + x_pos
+        yield up, EDGE_DOWN, up
+
+
+def spanning_tree(open_blocks, blocks_x, blocks_y, wrap_x, wrap_y):
+    """Строит остовное дерево самой большой связной области блоков.
+
+    Генератор шагов построения (см. cycle_steps). Возвращает флаги
+    ребер по блокам и список блоков дерева.
+    """
+    seen = bytearray(len(open_blocks))
+    best_edges, best_blocks = bytearray(len(open_blocks)), []
+    for root in range(len(open_blocks)):
+        if not open_blocks[root] or seen[root]:
+            continue
+        edges = bytearray(len(open_blocks))
+        seen[root] = 1
+        stack, blocks = [root], [root]
+        while stack:
+            yield
+            for neighbour, edge, owner in block_neighbours(
+                    stack.pop(), blocks_x, blocks_y, wrap_x, wrap_y):
+                if open_blocks[neighbour] and not seen[neighbour]:
+                    seen[neighbour] = 1
+                    edges[owner] |= edge
+                    stack.append(neighbour)
+                    blocks.append(neighbour)
+        if len(blocks) > len(best_blocks):
+            best_edges, best_blocks = edges, blocks
+    return best_edges, best_blocks
+
+
+def block_directions(edges, block, blocks_x, blocks_y):
+    """Возвращает направления ходов из четырех ячеек блока.
+
+    Вокруг одиночного блока цикл идет по часовой стрелке, а каждое
+    ребро дерева соединяет циклы соседних блоков: порядок ячеек -
+    левая верхняя, правая верхняя, правая нижняя, левая нижняя.
+    """
+    y_pos, x_pos = divmod(block, blocks_x)
+    left = y_pos * blocks_x + (x_pos - 1) % blocks_x
+    up = (y_pos - 1) % blocks_y * blocks_x + x_pos
+    return (UP if edges[up] & EDGE_DOWN else RIGHT,
+            RIGHT if edges[block] & EDGE_RIGHT else DOWN,
+            DOWN if edges[block] & EDGE_DOWN else LEFT,
+            LEFT if edges[left] & EDGE_RIGHT else UP)
+
+
+def build_cycle(free_cells, barrier_cells=None):
+    """Строит гамильтонов цикл по свободным от преград ячейкам поля.
+
+    Поле делится на блоки 2x2, по блокам без преград строится
+    остовное дерево, и цикл обходит его по контуру. Если ширина или
+    высота поля нечетная, последний столбец или строка в цикл
+    не входят; блоки с преградами и блоки, отрезанные преградами
+    от самой большой области, тоже остаются вне цикла.
+
+    Аргументы:
+    - barrier_cells: ячейки преград. По умолчанию - преграды на поле.
+
+    Возвращает ячейки в порядке обхода цикла.
+    """
+    if barrier_cells is None:
+        barrier_cells = [cell for cell, kind in enumerate(free_cells.kinds)
+                         if kind == CELL_BARRIER]
+    cycle, _ = run_steps(cycle_steps(free_cells, barrier_cells), inf)
+    return cycle
+
+
+def cycle_steps(free_cells, barrier_cells):
+    """Строит цикл по шагам: генератор для run_steps.
+
+    Построение цикла на большом поле занимает десятки миллисекунд,
+    поэтому бот выполняет его по частям на нескольких ходах.
+
+    Возвращает цикл и массив номеров ячеек в цикле (-1 для ячеек вне
+    цикла).
+    """
+    width, height = free_cells.width, free_cells.height
+    blocks_x, blocks_y = width // 2, height // 2
+    wrap_x, wrap_y = width % 2 == 0, height % 2 == 0
+    open_blocks = bytearray(b'\1') * (blocks_x * blocks_y)
+    for cell in barrier_cells:
+        y_pos, x_pos = divmod(cell, width)
+        if x_pos // 2 < blocks_x and y_pos // 2 < blocks_y:
+            open_blocks[y_pos // 2 * blocks_x + x_pos // 2] = 0
+    edges, blocks = yield from spanning_tree(open_blocks, blocks_x,
+                                             blocks_y, wrap_x, wrap_y)
+    moves = {}
+    for block in blocks:
+        moves.update(zip(block_cells(block, blocks_x, width),
+                         block_directions(edges, block, blocks_x,
+                                          blocks_y)))
+        yield
+    cycle = yield from walk_cycle(free_cells, moves)
+    order = yield from order_steps(cycle, width * height)
+    return cycle, order
+
+
+def order_steps(cycle, size):
+    """Возвращает номера ячеек в цикле: генератор для run_steps."""
+    order = array('i', [-1]) * size
+    for index, cell in enumerate(cycle):
+        order[cell] = index
+        yield
+    return order
+
+
+def run_steps(steps, deadline):
+    """Выполняет шаги генератора до срока deadline (по perf_counter).
+
+    Возвращает результат генератора или None, если срок истек раньше.
+    """
+    for step in count():
+        if (step % DEADLINE_CHECK_INTERVAL == 0
+                and perf_counter() > deadline):
+            return None
+        try:
+            next(steps)
+        except StopIteration as stop:
+            return stop.value
+
+
+def block_cells(block, blocks_x, width):
+    """Возвращает ячейки блока: по часовой стрелке от левой верхней."""
+    y_pos, x_pos = divmod(block, blocks_x)
+    top_left = 2 * y_pos * width + 2 * x_pos
+    return (top_left, top_left + 1, top_left + width + 1, top_left + width)
+
+
+def walk_cycle(free_cells, moves):
+    """Проходит цикл по ходам moves (ячейка -> направление).
+
+    Генератор шагов построения (см. cycle_steps).
+    """
+    cycle = array('i')
+    if not moves:
+        return cycle
+    start = cell = min(moves)
+    for _ in range(len(moves)):
+        yield
+        cycle.append(cell)
+        cell = free_cells.shift(cell, moves[cell])
+        if cell == start:
+            break
+    if cell != start or len(cycle) != len(moves):
+        raise CycleFormatError('Ходы не образуют гамильтонов цикл.')
+    return cycle
+
+
+def pack_cycle(free_cells, cycle):
+    """Упаковывает цикл: первая ячейка и ходы по 2 бита."""
+    buffer = bytearray(HEADER.pack(
+        CYCLE_MAGIC, CYCLE_VERSION, free_cells.width, free_cells.height,
+        len(cycle), cycle[0] if cycle else 0))
+    codes = step_codes(free_cells)
+    byte = 0
+    for index, cell in enumerate(cycle):
+        following = cycle[(index + 1) % len(cycle)]
+        byte |= codes[following - cell] << (2 * (index % 4))
+        if index % 4 == 3:
+            buffer.append(byte)
+            byte = 0
+    if len(cycle) % 4:
+        buffer.append(byte)
+    return bytes(buffer)
+
+
+def unpack_cycle(free_cells, data):
+    """Распаковывает цикл, сохраненный pack_cycle."""
+    if len(data) < HEADER.size:
+        raise CycleFormatError('Цикл слишком короткий.')
+    magic, version, width, height, length, cell = HEADER.unpack_from(data)
+    if magic != CYCLE_MAGIC or version != CYCLE_VERSION:
+        raise CycleFormatError('Неизвестный формат цикла.')
+    if (width, height) != (free_cells.width, free_cells.height):
+        raise CycleFormatError('Цикл построен для другого размера поля.')
+    if len(data) != HEADER.size + (length + 3) // 4:
+        raise CycleFormatError('Цикл поврежден.')
+    cycle = array('i')
+    for index in range(length):
+        cycle.append(cell)
+        code = data[HEADER.size + index // 4] >> (2 * (index % 4)) & 3
+        cell = free_cells.shift(cell, DIRECTIONS[code])
+    if length and cell != cycle[0]:
+        raise CycleFormatError('Цикл не замыкается.')
+    return cycle
+
+
+def load_cycle(free_cells, cache_dir=CYCLE_CACHE_DIR):
+    """Загружает цикл поля без преград из кэша или строит и сохраняет его.
+
+    Цикл зависит только от размера поля, поэтому на каждый размер
+    в кэше один файл. Преграды змейка обходит по ходу игры
+    (см. HamiltonSolver.next_cell).
+    """
+    path = Path(cache_dir) / f'{free_cells.width}x{free_cells.height}.cycle'
+    try:
+        cycle = unpack_cycle(free_cells, path.read_bytes())
+        # Время изменения файла - время последней загрузки для вытеснения.
+        os.utime(path)
+        return cycle
+    except (OSError, CycleFormatError):
+        pass
+    cycle = build_cycle(free_cells, ())
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Файл пишется под временным именем и переименовывается, чтобы
+        # параллельные запуски не прочитали его наполовину записанным.
+        temporary = path.with_suffix(f'.{os.getpid()}.tmp')
+        temporary.write_bytes(pack_cycle(free_cells, cycle))
+        os.replace(temporary, path)
+        evict_cycles(path.parent)
+    except OSError:
+        pass
+    return cycle
+
+
+def evict_cycles(cache_dir, limit=CYCLE_CACHE_LIMIT):
+    """Удаляет из кэша циклы сверх limit, которые дольше всех не нужны."""
+    paths = sorted(Path(cache_dir).glob('*.cycle'),
+                   key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in paths[limit:]:
+        try:
+            path.unlink()
+        except OSError:
+            # Файл уже удалил параллельный запуск.
+            pass
+
+
+class HamiltonSolver:
+    """Бот, который ведет змейку по гамильтонову циклу поля.
+
+    Змейка, идущая по циклу, никогда не врезается в себя и может
+    заполнить все поле. Цикл поля без преград строится один раз
+    на размер поля и хранится на диске (см. load_cycle), поэтому
+    следующие запуски начинаются сразу. Цикл загружается в prepare()
+    до начала игры, а не на первом ходу.
+
+    Когда появляется преграда, цикл перестраивается в памяти по частям
+    (см. cycle_steps): на каждом ходу не дольше budget. Пока новый цикл
+    не готов, змейка идет по прежнему и обходит преграды на нем:
+    переходит на ближайшую по циклу соседнюю ячейку за преградой.
+    Пропущенные ячейки цикла остаются впереди хвоста, поэтому тело
+    по-прежнему уложено по циклу.
+
+    Пока змейка короче SHORTCUT_LIMIT длины цикла, она срезает путь
+    к яблоку: переходит на соседнюю ячейку, лежащую дальше по циклу,
+    но не дальше яблока и не ближе SHORTCUT_MARGIN к хвосту. Тело при
+    этом остается уложенным по циклу от хвоста к голове.
+
+    Если голова или яблоко оказались вне цикла или обойти преграду
+    нельзя, ходом управляет запасной бот, пока тело змейки снова
+    не уложится по циклу.
+
+    Аргументы:
+    - cache_dir: каталог кэша циклов.
+    - fallback: запасной бот, по умолчанию Autopilot.
+    - budget: время на перестройку цикла за один ход в секундах.
+    """
+
+    def __init__(self, cache_dir=CYCLE_CACHE_DIR, fallback=None,
+                 budget=CYCLE_BUDGET):
+        self.cache_dir = cache_dir
+        self.fallback = Autopilot() if fallback is None else fallback
+        self.budget = budget
+        self.board = None
+        # Цикл поля без преград и номера его ячеек.
+        self.base = (array('i'), array('i'))
+        # Ячейки преград, под которые построен или строится цикл,
+        # и незаконченное построение.
+        self.layout = None
+        self.steps = None
+        self.cycle = array('i')
+        # Номер ячейки в цикле или -1 для ячеек вне цикла.
+        self.order = array('i')
+        # Уложено ли тело змейки по циклу от хвоста к голове.
+        self.aligned = False
+
+    def __call__(self, game, snake):
+        """Возвращает новое направление змейки или None."""
+        self.prepare(game, perf_counter() + self.budget)
+        free_cells = game.free_cells
+        head = snake.get_head_position()
+        target = None
+        if self.order[game.apple.position] >= 0 and self.is_aligned(snake):
+            target = self.next_cell(free_cells, snake, game.apple.position)
+        if target is None:
+            self.aligned = False
+            return self.fallback(game, snake)
+        for direction in DIRECTIONS:
+            if free_cells.shift(head, direction) == target:
+                return direction
+        return None
+
+    def prepare(self, game, deadline=inf):
+        """Загружает цикл поля и перестраивает его под преграды.
+
+        До начала игры вызывается без срока: цикл загружается
+        и строится целиком, а не на первом ходу. На ходах построение
+        под новые преграды продолжается до срока deadline
+        (по perf_counter).
+        """
+        free_cells = game.free_cells
+        board = (free_cells.width, free_cells.height)
+        if board != self.board:
+            self.board = board
+            cycle = load_cycle(free_cells, self.cache_dir)
+            self.base = cycle, run_steps(
+                order_steps(cycle, board[0] * board[1]), inf)
+            self.use(self.base)
+            self.layout, self.steps = [], None
+        layout = [cell for figure in game.barriers.positions
+                  for cell in figure]
+        if layout != self.layout:
+            self.layout = layout
+            self.steps = cycle_steps(free_cells, layout) if layout else None
+            if not layout:
+                self.use(self.base)
+        if self.steps is not None:
+            built = run_steps(self.steps, deadline)
+            if built is not None:
+                self.steps = None
+                self.use(built)
+
+    def use(self, built):
+        """Переводит змейку на цикл built: пару (цикл, номера ячеек)."""
+        self.cycle, self.order = built
+        self.aligned = False
+
+    def is_aligned(self, snake):
+        """Проверяет, что тело змейки уложено по циклу.
+
+        Сегменты от головы к хвосту должны идти по циклу назад без
+        пропусков по кругу. Тело проверяется целиком только после
+        ходов запасного бота, пока порядок не восстановится.
+        """
+        if self.aligned:
+            return True
+        order, length = self.order, len(self.cycle)
+        head_order = order[snake.get_head_position()]
+        previous = -1
+        for cell in snake.positions:
+            distance = (head_order - order[cell]) % length
+            if order[cell] < 0 or distance <= previous:
+                return False
+            previous = distance
+        self.aligned = True
+        return True
+
+    def next_cell(self, free_cells, snake, apple):
+        """Выбирает следующую ячейку головы: по циклу, срезом или в обход
+        преграды.
+
+        Возвращает None, если следующая ячейка цикла занята, а обойти
+        преграду нельзя.
+        """
+        order, length = self.order, len(self.cycle)
+        head = snake.get_head_position()
+        head_order = order[head]
+
+        def ahead(cell):
+            return (order[cell] - head_order) % length or length
+
+        tail = snake.positions[-1]
+        tail_distance = ahead(tail) if order[tail] >= 0 else 0
+        # Запас на рост: хвост стоит на месте, пока змейка растет.
+        limit = (tail_distance - SHORTCUT_MARGIN
+                 - (snake.length - len(snake.positions)))
+        target = self.cycle[(head_order + 1) % length]
+        # Дальше яблока не прыгаем, чтобы не пропустить его.
+        limit = min(ahead(apple), limit)
+        if free_cells.kinds[target] == CELL_BARRIER:
+            return self.jump(free_cells, head, ahead, limit, nearest=True)
+        if snake.length < length * SHORTCUT_LIMIT:
+            target = self.jump(free_cells, head, ahead, limit) or target
+        if free_cells.snake_segments(target) and target != tail:
+            return None
+        return target
+
+    def jump(self, free_cells, head, ahead, limit, nearest=False):
+        """Выбирает соседнюю ячейку головы дальше по циклу, чем следующая.
+
+        Ячейка должна быть проходимой и не дальше limit по циклу.
+
+        Аргументы:
+        - ahead: функция, возвращающая расстояние до ячейки по циклу.
+        - nearest: выбрать ближайшую такую ячейку, а не самую дальнюю.
+
+        Возвращает ячейку или None, если подходящей нет.
+        """
+        choice = None
+        for direction in DIRECTIONS:
+            cell = free_cells.shift(head, direction)
+            if (self.order[cell] >= 0 and 1 < ahead(cell) <= limit
+                    and Autopilot.is_passable(free_cells, cell)
+                    and (choice is None
+                         or (ahead(cell) < ahead(choice)) == nearest)):
+                choice = cell
+        return choice
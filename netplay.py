@@ -0,0 +1,679 @@
+import argparse
+import asyncio
+import struct
+from collections import deque
+from itertools import count, islice
+
+from snake_engine import (
+    CELL_BARRIER, DIRECTIONS, GRID_HEIGHT, GRID_WIDTH, SPEED, GameState,
+    Snake, board_size, step_codes
+)
+
+
+# Адрес сервера по умолчанию:
+DEFAULT_HOST = 'localhost'
+DEFAULT_PORT = 7373
+
+# Раз во сколько тиков сервер рассылает полное состояние игры, даже если
+# игра не начиналась заново:
+KEYFRAME_INTERVAL = 64
+
+# Сколько поворотов игрока сервер хранит наперед, до следующих тиков:
+TURN_QUEUE_SIZE = 3
+
+# Если у клиента в буфере отправки накопилось больше этого числа байт,
+# он не успевает за игрой: изменения тиков ему не отправляются, а когда
+# буфер освободится, клиент получит полное состояние.
+MAX_CLIENT_BUFFER = 1 << 18
+
+# Протокол: каждое сообщение - заголовок FRAME (длина данных и тип
+# сообщения) и данные. Все числа - little-endian, ячейки - номера
+# y * width + x по 4 байта.
+# - MSG_JOIN (клиент): 1 байт - 1, если клиент играет, 0 - зритель.
+# - MSG_TURN (клиент): 1 байт - номер направления в DIRECTIONS.
+# - MSG_WELCOME (сервер): WELCOME - размер поля, число яблок, мусора
+#   и змеек, номер змейки игрока (NO_SNAKE у зрителя), тиков в секунду.
+# - MSG_KEYFRAME (сервер): номер тика; по каждой змейке SNAKE -
+#   длина, голова, число сегментов и направление, затем тело: ходы
+#   от головы к хвосту по 2 бита (номер направления в DIRECTIONS),
+#   по четыре хода в байте; ячейки яблок и мусора; преграды.
+# - MSG_TICK (сервер): номер тика; по 4 бита на змейку, две змейки
+#   в байте: направление хода (2 бита) и изменение длины (2 бита,
+#   LENGTH_* или RESPAWNED); новые ячейки появившихся заново змеек;
+#   число переставленных предметов и ITEM_MOVE - номер предмета
+#   (яблоки, затем мусор) и новая ячейка; новые преграды.
+# Преграды записываются как число фигур (4 байта), а для каждой
+# фигуры - число ячеек (1 байт) и ячейки.
+MSG_JOIN = 0
+MSG_TURN = 1
+MSG_WELCOME = 2
+MSG_KEYFRAME = 3
+MSG_TICK = 4
+
+FRAME = struct.Struct('<IB')
+WELCOME = struct.Struct('<HHHHHHH')
+TICK = struct.Struct('<I')
+SNAKE = struct.Struct('<IIIB')
+ITEM_MOVE = struct.Struct('<HI')
+COUNT = struct.Struct('<I')
+
+NO_SNAKE = 0xFFFF
+
+# Наибольший размер данных сообщений клиента по типам. Длина из FRAME
+# проверяется до чтения данных, поэтому неверный заголовок не заставит
+# сервер ждать и копить гигабайты.
+CLIENT_PAYLOAD_LIMITS = {MSG_JOIN: 1, MSG_TURN: 1}
+
+DIRECTION_CODES = {direction: code
+                   for code, direction in enumerate(DIRECTIONS)}
+
+# Изменение длины змейки за тик. Змейка съедает за тик не больше одного
+# предмета, поэтому длина меняется не больше чем на единицу:
+LENGTH_SAME = 0
+LENGTH_GREW = 1
+LENGTH_SHRANK = 2
+RESPAWNED = 3
+LENGTH_CHANGES = {0: LENGTH_SAME, 1: LENGTH_GREW, -1: LENGTH_SHRANK}
+
+
+class ProtocolError(Exception):
+    """Сообщение не соответствует протоколу сетевой игры."""
+
+
+def frame(message_type, payload=b''):
+    """Возвращает сообщение с заголовком FRAME."""
+    return FRAME.pack(len(payload), message_type) + payload
+
+
+async def read_message(reader, limits):
+    """Читает сообщение из потока и возвращает его тип и данные.
+
+    Аргументы:
+    - limits: словарь тип сообщения -> наибольший размер данных.
+    Сообщения других типов и сообщения длиннее вызывают ProtocolError.
+    """
+    length, message_type = FRAME.unpack(
+        await reader.readexactly(FRAME.size))
+    limit = limits.get(message_type)
+    if limit is None:
+        raise ProtocolError(f'Неизвестный тип сообщения: {message_type}.')
+    if length > limit:
+        raise ProtocolError(f'Сообщение типа {message_type} длиннее '
+                            f'{limit} байт.')
+    return message_type, await reader.readexactly(length)
+
+
+def server_payload_limits(game):
+    """Возвращает наибольшие размеры данных сообщений сервера для игры.
+
+    Сегменты всех змеек и все преграды вместе занимают не больше ячеек
+    поля: ход тела - 2 бита, ячейка преграды - 4 байта и не больше
+    байта на размер ее фигуры.
+    """
+    size = game.free_cells.width * game.free_cells.height
+    snakes = len(game.snakes)
+    items = len(game.apples) + len(game.garbage_items)
+    figures = COUNT.size + 5 * size
+    return {
+        MSG_KEYFRAME: (TICK.size + snakes * (SNAKE.size + 1) + size // 4
+                       + 4 * items + figures),
+        MSG_TICK: (TICK.size + snakes + 4 * snakes + COUNT.size
+                   + ITEM_MOVE.size * items + figures)}
+
+
+def pack_cells(cells):
+    """Упаковывает номера ячеек по 4 байта."""
+    return struct.pack(f'<{len(cells)}I', *cells)
+
+
+def unpack_cells(data, offset, number):
+    """Читает number ячеек и возвращает их и смещение за ними."""
+    cells = struct.unpack_from(f'<{number}I', data, offset)
+    return cells, offset + 4 * number
+
+
+def pack_figures(figures):
+    """Упаковывает фигуры преград: число фигур, затем их ячейки."""
+    data = bytearray(COUNT.pack(len(figures)))
+    for figure in figures:
+        data.append(len(figure))
+        data += pack_cells(figure)
+    return data
+
+
+def unpack_figures(data, offset):
+    """Читает фигуры преград и возвращает их и смещение за ними."""
+    (number,), offset = COUNT.unpack_from(data, offset), offset + COUNT.size
+    figures = []
+    for _ in range(number):
+        cells, offset = unpack_cells(data, offset + 1, data[offset])
+        figures.append(list(cells))
+    return figures, offset
+
+
+def pack_body(positions, codes):
+    """Упаковывает тело змейки: ходы от головы к хвосту по 2 бита."""
+    chain = bytearray((len(positions) + 2) // 4)
+    for index, (cell, following) in enumerate(
+            zip(positions, islice(positions, 1, None))):
+        chain[index >> 2] |= codes[following - cell] << (2 * (index & 3))
+    return chain
+
+
+def unpack_body(free_cells, head, segments, data, offset):
+    """Распаковывает тело змейки, упакованное pack_body.
+
+    Возвращает ячейки тела от головы к хвосту и смещение за ними.
+    """
+    cells = [head]
+    cell = head
+    for index in range(segments - 1):
+        code = data[offset + (index >> 2)] >> (2 * (index & 3)) & 3
+        cell = free_cells.shift(cell, DIRECTIONS[code])
+        cells.append(cell)
+    return cells, offset + (segments + 2) // 4
+
+
+class NetSnake(Snake):
+    """Змейка сервера, которая отмечает, что появилась заново."""
+
+    __slots__ = ('respawned', 'sent_length')
+
+    def reset(self, direction=None):
+        """Сбрасывает змейку и отмечает это для рассылки тика."""
+        super().reset(direction)
+        self.respawned = True
+
+
+class ServerGame(GameState):
+    """Игра сервера: змейками управляют игроки и боты.
+
+    Змейкой с номером из словаря players управляет игрок - его повороты
+    копятся в очереди и применяются по одному за тик, остальными
+    змейками управляет бот. Игра помнит, какое состояние уже разослано
+    клиентам, и упаковывает только изменения тика.
+    """
+
+    snake_class = NetSnake
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.players = {}
+        self.items = self.apples + self.garbage_items
+        self.codes = step_codes(self.free_cells)
+        self.sync()
+
+    def move_snakes(self):
+        """Поворачивает змеек игроков и ботов и двигает все змейки."""
+        for index, snake in enumerate(self.snakes):
+            turns = self.players.get(index)
+            if turns is None:
+                direction = self.bot(self, snake)
+            else:
+                direction = turns.popleft() if turns else None
+            if direction is not None:
+                self.turn(direction, snake)
+        for snake in self.snakes:
+            snake.update_direction()
+            snake.move()
+
+    def start_over(self):
+        """Начинает игру заново: клиентам нужно полное состояние."""
+        super().start_over()
+        self.restarted = True
+
+    def sync(self):
+        """Запоминает текущее состояние как разосланное клиентам."""
+        for snake in self.snakes:
+            snake.respawned = False
+            snake.sent_length = snake.length
+        self.sent_items = [item.position for item in self.items]
+        self.sent_figures = len(self.barriers.positions)
+        self.restarted = False
+
+    def encode_keyframe(self):
+        """Упаковывает полное состояние игры для MSG_KEYFRAME."""
+        data = bytearray(TICK.pack(self.ticks))
+        for snake in self.snakes:
+            positions = snake.positions
+            data += SNAKE.pack(snake.length, positions[0], len(positions),
+                               DIRECTION_CODES[snake.direction])
+            data += pack_body(positions, self.codes)
+        data += pack_cells([item.position for item in self.items])
+        data += pack_figures(self.barriers.positions)
+        return bytes(data)
+
+    def encode_tick(self):
+        """Упаковывает изменения за тик для MSG_TICK.
+
+        Изменения считаются от состояния, разосланного в прошлый раз,
+        которое затем обновляется.
+        """
+        snakes = self.snakes
+        changes = bytearray((len(snakes) + 1) // 2)
+        respawns = []
+        for index, snake in enumerate(snakes):
+            if snake.respawned:
+                change = RESPAWNED
+                snake.respawned = False
+                respawns.append(snake.positions[0])
+            else:
+                change = LENGTH_CHANGES[snake.length - snake.sent_length]
+            snake.sent_length = snake.length
+            changes[index >> 1] |= (
+                DIRECTION_CODES[snake.direction] | change << 2
+            ) << (4 * (index & 1))
+        data = bytearray(TICK.pack(self.ticks))
+        data += changes
+        data += pack_cells(respawns)
+        moved = [(index, item.position)
+                 for index, item in enumerate(self.items)
+                 if item.position != self.sent_items[index]]
+        data += COUNT.pack(len(moved))
+        for index, cell in moved:
+            data += ITEM_MOVE.pack(index, cell)
+            self.sent_items[index] = cell
+        data += pack_figures(self.barriers.positions[self.sent_figures:])
+        self.sent_figures = len(self.barriers.positions)
+        return bytes(data)
+
+
+def apply_keyframe(game, data):
+    """Заменяет состояние игры-копии полным состоянием с сервера."""
+    free_cells = game.free_cells
+    (game.ticks,) = TICK.unpack_from(data)
+    offset = TICK.size
+    items = game.apples + game.garbage_items
+    for entity in game.snakes + items:
+        entity.remove()
+    game.barriers.reset()
+    for snake in game.snakes:
+        length, head, segments, code = SNAKE.unpack_from(data, offset)
+        cells, offset = unpack_body(free_cells, head, segments, data,
+                                    offset + SNAKE.size)
+        snake.positions.extend(cells)
+        for cell in cells:
+            free_cells.occupy(cell)
+        snake.length = length
+        snake.direction = DIRECTIONS[code]
+        snake.next_direction = None
+    cells, offset = unpack_cells(data, offset, len(items))
+    for item, cell in zip(items, cells):
+        item.place(cell)
+    figures, offset = unpack_figures(data, offset)
+    add_figures(game, figures)
+    # Таймеры копии не работают: предметы и преграды переставляет
+    # сервер, поэтому очередь планировщика не копится.
+    game.scheduler.queue.clear()
+
+
+def apply_tick(game, data):
+    """Применяет к игре-копии изменения тика с сервера.
+
+    Изменения применяются в том же порядке, что и на сервере: ход
+    змеек, перестановка предметов, новые преграды, появление заново
+    разбившихся змеек.
+    """
+    (tick,) = TICK.unpack_from(data)
+    if tick != game.ticks + 1:
+        raise ProtocolError(f'Ожидался тик {game.ticks + 1}, '
+                            f'получен тик {tick}.')
+    game.ticks = tick
+    offset = TICK.size
+    respawned = []
+    for index, snake in enumerate(game.snakes):
+        nibble = data[offset + (index >> 1)] >> (4 * (index & 1))
+        snake.direction = DIRECTIONS[nibble & 3]
+        change = nibble >> 2 & 3
+        if change == RESPAWNED:
+            respawned.append(snake)
+            continue
+        snake.move()
+        if change == LENGTH_GREW:
+            snake.length += 1
+        elif change == LENGTH_SHRANK:
+            snake.length -= 1
+    offset += (len(game.snakes) + 1) // 2
+    cells, offset = unpack_cells(data, offset, len(respawned))
+    offset = move_items(game, data, offset)
+    figures, offset = unpack_figures(data, offset)
+    add_figures(game, figures)
+    for snake in respawned:
+        snake.remove()
+    for snake, cell in zip(respawned, cells):
+        snake.positions.append(cell)
+        game.free_cells.occupy(cell)
+        snake.length = 1
+    game.scheduler.queue.clear()
+
+
+def move_items(game, data, offset):
+    """Переставляет предметы по записям ITEM_MOVE.
+
+    Сначала все переставленные предметы убираются с поля: предмет
+    может занять ячейку, которую на этом тике освободил другой.
+
+    Возвращает смещение за записями.
+    """
+    items = game.apples + game.garbage_items
+    (number,) = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    moves = [ITEM_MOVE.unpack_from(data, offset + ITEM_MOVE.size * i)
+             for i in range(number)]
+    for index, _ in moves:
+        items[index].remove()
+    for index, cell in moves:
+        items[index].place(cell)
+    return offset + ITEM_MOVE.size * number
+
+
+def add_figures(game, figures):
+    """Ставит на поле игры-копии фигуры преград."""
+    for figure in figures:
+        for cell in figure:
+            game.free_cells.occupy(cell, CELL_BARRIER)
+        game.barriers.positions.append(figure)
+
+
+class Connection:
+    """Подключенный к серверу клиент.
+
+    Аргументы:
+    - writer: поток записи asyncio.
+    - snake_index: номер змейки игрока или None у зрителя.
+    """
+
+    def __init__(self, writer, snake_index=None):
+        self.writer = writer
+        self.snake_index = snake_index
+        # Клиент пропустил тики и ждет полное состояние.
+        self.stale = False
+
+    def buffer_size(self):
+        """Возвращает число байт, ожидающих отправки клиенту."""
+        return self.writer.transport.get_write_buffer_size()
+
+
+class GameServer:
+    """Сервер сетевой игры на asyncio.
+
+    Сервер выполняет тики игры и рассылает всем клиентам только
+    изменения тика - несколько байт на тик и по полбайта на змейку.
+    Полное состояние отправляется при подключении, после начала игры
+    заново, раз в keyframe_interval тиков и клиентам, которые
+    не успевали принимать тики. Сообщение тика упаковывается один раз
+    для всех клиентов.
+
+    Каждый игрок получает свободную змейку арены, остальными змейками
+    управляет бот. Если свободных змеек нет, клиент становится зрителем.
+
+    Аргументы:
+    - tick_rate: тиков игры в секунду.
+    - keyframe_interval: раз во сколько тиков рассылается полное
+    состояние.
+    - game_options: настройки игры, как у GameState.
+    """
+
+    def __init__(self, tick_rate=SPEED, keyframe_interval=KEYFRAME_INTERVAL,
+                 **game_options):
+        self.game = ServerGame(**game_options)
+        self.tick_rate = tick_rate
+        self.keyframe_interval = keyframe_interval
+        self.connections = []
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Начинает принимать подключения и возвращает asyncio.Server."""
+        return await asyncio.start_server(self.handle_client, host, port)
+
+    async def run(self, ticks=None):
+        """Выполняет тики игры с частотой tick_rate.
+
+        Аргументы:
+        - ticks: сколько тиков выполнить. None - без ограничения.
+        """
+        loop = asyncio.get_running_loop()
+        interval = 1 / self.tick_rate
+        deadline = loop.time()
+        for _ in (count() if ticks is None else range(ticks)):
+            deadline += interval
+            await asyncio.sleep(deadline - loop.time())
+            # Не успеваем за частотой тиков - отбрасываем отставание,
+            # чтобы не выполнять потом тики пачкой.
+            deadline = max(deadline, loop.time() - interval)
+            self.tick()
+
+    def tick(self):
+        """Выполняет тик игры и рассылает его клиентам."""
+        game = self.game
+        game.step()
+        if game.restarted or game.ticks % self.keyframe_interval == 0:
+            message = keyframe = frame(MSG_KEYFRAME, game.encode_keyframe())
+            game.sync()
+        else:
+            message = frame(MSG_TICK, game.encode_tick())
+            keyframe = None
+        for connection in self.connections:
+            if connection.buffer_size() > MAX_CLIENT_BUFFER:
+                connection.stale = True
+            elif connection.stale:
+                if keyframe is None:
+                    keyframe = frame(MSG_KEYFRAME, game.encode_keyframe())
+                connection.writer.write(keyframe)
+                connection.stale = False
+            else:
+                connection.writer.write(message)
+
+    async def handle_client(self, reader, writer):
+        """Обслуживает клиента: подключение, повороты и отключение."""
+        connection = None
+        try:
+            message_type, payload = await read_message(
+                reader, CLIENT_PAYLOAD_LIMITS)
+            if message_type != MSG_JOIN:
+                raise ProtocolError('Клиент должен начать с MSG_JOIN.')
+            connection = self.join(writer, payload[:1] == b'\x01')
+            while True:
+                message_type, payload = await read_message(
+                    reader, CLIENT_PAYLOAD_LIMITS)
+                if message_type == MSG_TURN:
+                    self.queue_turn(connection, payload)
+        except (asyncio.IncompleteReadError, ConnectionError, ProtocolError):
+            pass
+        finally:
+            if connection is not None:
+                self.leave(connection)
+            writer.close()
+
+    def join(self, writer, play):
+        """Подключает клиента и отправляет ему полное состояние игры."""
+        game = self.game
+        snake_index = None
+        if play:
+            snake_index = next((index for index in range(len(game.snakes))
+                                if index not in game.players), None)
+        if snake_index is not None:
+            game.players[snake_index] = deque()
+        connection = Connection(writer, snake_index)
+        writer.write(frame(MSG_WELCOME, WELCOME.pack(
+            game.free_cells.width, game.free_cells.height, len(game.apples),
+            len(game.garbage_items), len(game.snakes),
+            NO_SNAKE if snake_index is None else snake_index,
+            self.tick_rate)))
+        writer.write(frame(MSG_KEYFRAME, game.encode_keyframe()))
+        self.connections.append(connection)
+        return connection
+
+    def queue_turn(self, connection, payload):
+        """Добавляет поворот игрока в очередь его змейки."""
+        turns = self.game.players.get(connection.snake_index)
+        if (turns is not None and len(payload) == 1
+                and payload[0] < len(DIRECTIONS)
+                and len(turns) < TURN_QUEUE_SIZE):
+            turns.append(DIRECTIONS[payload[0]])
+
+    def leave(self, connection):
+        """Отключает клиента: его змейкой снова управляет бот."""
+        self.connections.remove(connection)
+        self.game.players.pop(connection.snake_index, None)
+
+
+class GameClient:
+    """Клиент сетевой игры: копия игры, которую обновляет сервер.
+
+    Копия - объект game_class, например SnakeGame с отрисовкой. Сама она
+    тиков не выполняет: состояние меняется только сообщениями сервера.
+
+    Атрибуты:
+    - game: копия игры. Змейка snake копии - змейка игрока.
+    - snake_index: номер змейки игрока или None у зрителя.
+    - tick_rate: тиков игры сервера в секунду.
+    - restarted: пришло полное состояние игры. Сбрасывает тот,
+    кто его проверяет.
+    """
+
+    def __init__(self, reader, writer, game, snake_index, tick_rate):
+        self.reader = reader
+        self.writer = writer
+        self.game = game
+        self.snake_index = snake_index
+        self.tick_rate = tick_rate
+        self.restarted = False
+        self.limits = server_payload_limits(game)
+
+    @classmethod
+    async def connect(cls, host=DEFAULT_HOST, port=DEFAULT_PORT, play=True,
+                      game_class=GameState):
+        """Подключается к серверу и получает полное состояние игры.
+
+        Аргументы:
+        - play: управлять змейкой, а не только смотреть.
+        - game_class: класс копии игры.
+        """
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(frame(MSG_JOIN, bytes((int(play),))))
+        try:
+            message_type, payload = await read_message(
+                reader, {MSG_WELCOME: WELCOME.size})
+        except ProtocolError:
+            writer.close()
+            raise
+        if len(payload) != WELCOME.size:
+            writer.close()
+            raise ProtocolError('Сервер не прислал MSG_WELCOME.')
+        (width, height, apple_count, garbage_count, snake_count, snake_index,
+         tick_rate) = WELCOME.unpack(payload)
+        game = game_class(0, width, height, apple_count, garbage_count,
+                          snake_count=snake_count)
+        if snake_index == NO_SNAKE:
+            snake_index = None
+        else:
+            game.snake = game.snakes[snake_index]
+        client = cls(reader, writer, game, snake_index, tick_rate)
+        await client.receive()
+        return client
+
+    async def receive(self):
+        """Получает сообщение сервера, применяет его и возвращает тип.
+
+        Оборванные или неверные данные вызывают ProtocolError.
+        """
+        message_type, payload = await read_message(self.reader, self.limits)
+        try:
+            if message_type == MSG_TICK:
+                apply_tick(self.game, payload)
+            else:
+                apply_keyframe(self.game, payload)
+                self.restarted = True
+        except (struct.error, IndexError, KeyError, ValueError) as error:
+            raise ProtocolError(f'Сообщение сервера повреждено: '
+                                f'{error}.') from error
+        return message_type
+
+    async def receive_forever(self):
+        """Получает сообщения, пока сервер не закроет соединение.
+
+        Если сервер прислал неверное сообщение, копия игры уже не
+        совпадает с сервером: соединение закрывается, а ошибка
+        возвращается вызывающему. Иначе возвращает None.
+        """
+        try:
+            while True:
+                await self.receive()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None
+        except ProtocolError as error:
+            self.writer.close()
+            return error
+
+    def send_turn(self, direction):
+        """Отправляет серверу поворот змейки игрока."""
+        self.writer.write(frame(MSG_TURN,
+                                bytes((DIRECTION_CODES[direction],))))
+
+    async def close(self):
+        """Закрывает соединение с сервером."""
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+def address(text):
+    """Разбирает адрес сервера в формате ХОСТ:ПОРТ или ХОСТ."""
+    host, _, port = text.rpartition(':')
+    if not host:
+        return text, DEFAULT_PORT
+    try:
+        return host, int(port)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            'адрес задается как ХОСТ:ПОРТ, например localhost:7373')
+
+
+def create_parser():
+    """Создает разбор аргументов командной строки сервера."""
+    parser = argparse.ArgumentParser(
+        description='Сервер сетевой игры "Змейка".')
+    parser.add_argument('--host', default=DEFAULT_HOST,
+                        help='адрес, на котором сервер принимает клиентов')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--board', type=board_size,
+                        default=(GRID_WIDTH, GRID_HEIGHT), metavar='WxH',
+                        help='размер поля в ячейках')
+    parser.add_argument('--apples', type=int, default=1,
+                        help='сколько яблок одновременно лежит на поле')
+    parser.add_argument('--garbage', type=int, default=1,
+                        help='сколько мусора одновременно лежит на поле')
+    parser.add_argument('--barriers', type=int, default=0,
+                        help='сколько преград стоит на поле с начала игры')
+    parser.add_argument('--snakes', type=int, default=8,
+                        help='сколько змеек на поле: игроки и боты')
+    parser.add_argument('--speed', type=int, default=SPEED,
+                        help='тиков игры в секунду')
+    return parser
+
+
+async def serve(server, host, port):
+    """Принимает клиентов и выполняет тики игры, пока не прервут."""
+    listener = await server.start(host, port)
+    async with listener:
+        await server.run()
+
+
+def main(argv=None):
+    """Запускает сервер из командной строки."""
+    args = create_parser().parse_args(argv)
+    width, height = args.board
+    server = GameServer(args.speed, width=width, height=height,
+                        apple_count=args.apples, garbage_count=args.garbage,
+                        barrier_count=args.barriers,
+                        snake_count=args.snakes)
+    try:
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
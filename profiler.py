@@ -0,0 +1,132 @@
+import json
+from array import array
+from collections import deque
+from time import perf_counter
+
+
+# Сколько последних кадров хранится для расчета процентилей:
+PROFILE_FRAMES = 600
+
+# Раз во сколько кадров пересчитываются процентили для панели:
+SUMMARY_INTERVAL = 30
+
+# Сколько последних замеров хранится для выгрузки трассы:
+TRACE_EVENTS = 100000
+
+
+class NullProfiler:
+    """Выключенный профилировщик: все методы ничего не делают."""
+
+    def start_frame(self):
+        """Ничего не делает."""
+
+    def lap(self, phase):
+        """Ничего не делает."""
+
+    def end_frame(self):
+        """Ничего не делает."""
+
+    def overlay_stats(self):
+        """Возвращает пустой набор показателей."""
+        return {}
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class FrameProfiler:
+    """Профилировщик кадров игрового цикла.
+
+    Цикл размечается вызовами lap(phase): время от предыдущей отметки
+    записывается на фазу phase. Время каждой фазы за кадр хранится в
+    кольцевом буфере на PROFILE_FRAMES кадров, по которому считаются
+    скользящие процентили. Если включена трасса, каждая отметка
+    дополнительно сохраняется для выгрузки в формате Chrome trace.
+    """
+
+    def __init__(self, frames=PROFILE_FRAMES, trace=False):
+        self.frames = frames
+        self.buffers = {}
+        self.current = {}
+        self.frame_count = 0
+        self.last_time = perf_counter()
+        self.summary_cache = {}
+        self.trace = deque(maxlen=TRACE_EVENTS) if trace else None
+
+    def start_frame(self):
+        """Отмечает начало кадра."""
+        self.last_time = perf_counter()
+
+    def lap(self, phase):
+        """Записывает на фазу время, прошедшее с предыдущей отметки."""
+        now = perf_counter()
+        duration = now - self.last_time
+        self.current[phase] = self.current.get(phase, 0.0) + duration
+        if self.trace is not None:
+            self.trace.append((phase, self.last_time, duration))
+        self.last_time = now
+
+    def end_frame(self):
+        """Сохраняет время фаз кадра в кольцевые буферы."""
+        index = self.frame_count % self.frames
+        for phase in self.current.keys() - self.buffers.keys():
+            self.buffers[phase] = array('d', bytes(8 * self.frames))
+        for phase, buffer in self.buffers.items():
+            buffer[index] = self.current.get(phase, 0.0)
+        self.current.clear()
+        self.frame_count += 1
+
+    def percentiles(self, phase):
+        """Возвращает p50 и p99 времени фазы за кадр, в секундах."""
+        buffer = self.buffers[phase]
+        values = sorted(buffer[:min(self.frame_count, self.frames)])
+        if not values:
+            return 0.0, 0.0
+        return (values[len(values) // 2],
+                values[min(len(values) - 1, len(values) * 99 // 100)])
+
+    def summary(self):
+        """Возвращает процентили всех фаз: фаза -> (p50, p99).
+
+        Результат пересчитывается раз в SUMMARY_INTERVAL кадров.
+        """
+        if self.frame_count % SUMMARY_INTERVAL == 0 or not self.summary_cache:
+            self.summary_cache = {phase: self.percentiles(phase)
+                                  for phase in self.buffers}
+            if self.buffers:
+                frame_times = [sum(values) for values in
+                               zip(*self.buffers.values())]
+                frame_times = sorted(
+                    frame_times[:min(self.frame_count, self.frames)])
+                self.summary_cache['frame'] = (
+                    frame_times[len(frame_times) // 2],
+                    frame_times[len(frame_times) * 99 // 100])
+        return self.summary_cache
+
+    def overlay_stats(self):
+        """Возвращает показатели для информационной панели.
+
+        Показываются p50/p99 всего кадра и фаза с наибольшим p99,
+        в миллисекундах.
+        """
+        summary = self.summary()
+        if 'frame' not in summary:
+            return {}
+        frame_p50, frame_p99 = summary['frame']
+        worst = max((phase for phase in summary if phase != 'frame'),
+                    key=lambda phase: summary[phase][1])
+        return {
+            'Frame p50/p99': f'{frame_p50 * 1000:.2f}/{frame_p99 * 1000:.2f}',
+            'Worst p99': f'{worst} {summary[worst][1] * 1000:.2f}',
+        }
+
+    def dump_trace(self, path):
+        """Сохраняет трассу в формате Chrome trace (JSON).
+
+        Файл открывается в chrome://tracing или в Perfetto.
+        """
+        events = [{'name': phase, 'ph': 'X', 'pid': 1, 'tid': 1,
+                   'ts': start * 1e6, 'dur': duration * 1e6}
+                  for phase, start, duration in self.trace or ()]
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'traceEvents': events}, file)
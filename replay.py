@@ -0,0 +1,181 @@
+import struct
+
+from snake_engine import DIRECTIONS, GRID_HEIGHT, GRID_WIDTH, GameState
+
+
+# Формат файла повтора:
+# - заголовок: сигнатура REPLAY_MAGIC, версия формата (1 байт),
+#   зерно генератора случайных чисел (8 байт), размер поля в ячейках
+#   (по 2 байта на ширину и высоту), число яблок, мусора, преград
+#   в начале игры и змеек (по 4 байта);
+# - записи: разница в тиках с предыдущей записью (varint) и код записи
+#   (1 байт). После кода SPEED_CODE идет новая скорость (varint);
+# - последняя запись с кодом END_CODE отмечает тик, на котором
+#   закончилась запись.
+REPLAY_MAGIC = b'SNKR'
+REPLAY_VERSION = 4
+HEADER = struct.Struct('<4sBQHHIIII')
+
+# Коды записей: номер направления в DIRECTIONS - поворот змейки.
+SPEED_CODE = len(DIRECTIONS)
+END_CODE = 0xFF
+
+
+class ReplayFormatError(Exception):
+    """Данные не являются повтором игры или повреждены."""
+
+
+def write_varint(buffer, value):
+    """Дописывает неотрицательное число в буфер в формате varint."""
+    while value > 0x7F:
+        buffer.append(value & 0x7F | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def read_varint(data, offset):
+    """Читает число в формате varint.
+
+    Возвращает число и смещение следующего за ним байта.
+    """
+    value = shift = 0
+    while True:
+        if offset >= len(data):
+            raise ReplayFormatError('Повтор обрывается посреди записи.')
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+class Replay:
+    """Повтор игры: зерно генератора и действия игрока по тикам.
+
+    Сохраняются только тики, на которых игрок повернул змейку или
+    изменил скорость, поэтому повтор занимает несколько байт
+    на действие независимо от длины игры.
+
+    Чтобы записать игру, объект передается в GameState.recorder.
+    Остальные аргументы - настройки игры, как у GameState.
+    """
+
+    def __init__(self, seed, width=GRID_WIDTH, height=GRID_HEIGHT,
+                 apple_count=1, garbage_count=1, barrier_count=0,
+                 snake_count=1):
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.apple_count = apple_count
+        self.garbage_count = garbage_count
+        self.barrier_count = barrier_count
+        self.snake_count = snake_count
+        self.ticks = 0
+        self.turns = {}
+        self.speeds = {}
+        self.last_speed = None
+
+    def record(self, tick, action, speed):
+        """Запоминает действия игрока на тике tick."""
+        if speed != self.last_speed:
+            self.speeds[tick] = speed
+            self.last_speed = speed
+        if action is not None:
+            self.turns[tick] = action
+        self.ticks = tick + 1
+
+    def game_options(self):
+        """Возвращает настройки записанной игры для GameState."""
+        return {'width': self.width, 'height': self.height,
+                'apple_count': self.apple_count,
+                'garbage_count': self.garbage_count,
+                'barrier_count': self.barrier_count,
+                'snake_count': self.snake_count}
+
+    def inputs(self):
+        """Перебирает действия по тикам: пары (поворот, скорость).
+
+        Если на тике не было поворота или изменения скорости,
+        соответствующее значение равно None.
+        """
+        for tick in range(self.ticks):
+            yield self.turns.get(tick), self.speeds.get(tick)
+
+    def to_bytes(self):
+        """Упаковывает повтор в компактный двоичный формат."""
+        buffer = bytearray(HEADER.pack(
+            REPLAY_MAGIC, REPLAY_VERSION, self.seed, self.width, self.height,
+            self.apple_count, self.garbage_count, self.barrier_count,
+            self.snake_count))
+        records = sorted(
+            [(tick, DIRECTIONS.index(turn), None)
+             for tick, turn in self.turns.items()]
+            + [(tick, SPEED_CODE, speed)
+               for tick, speed in self.speeds.items()])
+        records.append((self.ticks, END_CODE, None))
+        last_tick = 0
+        for tick, code, speed in records:
+            write_varint(buffer, tick - last_tick)
+            buffer.append(code)
+            if code == SPEED_CODE:
+                write_varint(buffer, speed)
+            last_tick = tick
+        return bytes(buffer)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Распаковывает повтор из двоичного формата."""
+        if len(data) < HEADER.size:
+            raise ReplayFormatError('Повтор слишком короткий.')
+        magic, version, seed, *options = HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ReplayFormatError('Неизвестный формат повтора.')
+        replay = cls(seed, *options)
+        offset = HEADER.size
+        tick = 0
+        while True:
+            delta, offset = read_varint(data, offset)
+            tick += delta
+            if offset >= len(data):
+                raise ReplayFormatError('Повтор обрывается посреди записи.')
+            code = data[offset]
+            offset += 1
+            if code == END_CODE:
+                replay.ticks = tick
+                return replay
+            if code == SPEED_CODE:
+                replay.speeds[tick], offset = read_varint(data, offset)
+            elif code < len(DIRECTIONS):
+                replay.turns[tick] = DIRECTIONS[code]
+            else:
+                raise ReplayFormatError(f'Неизвестный код записи: {code}.')
+
+    def save(self, path):
+        """Сохраняет повтор в файл."""
+        with open(path, 'wb') as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        """Загружает повтор из файла."""
+        with open(path, 'rb') as file:
+            return cls.from_bytes(file.read())
+
+
+def apply_inputs(game, turn, speed):
+    """Выполняет тик игры с действиями игрока из повтора."""
+    if speed is not None:
+        game.snake.speed = speed
+    return game.step(turn)
+
+
+def simulate(replay, game_class=GameState):
+    """Проигрывает повтор без отрисовки с максимальной скоростью.
+
+    Возвращает состояние игры после последнего тика.
+    """
+    game = game_class(replay.seed, **replay.game_options())
+    for turn, speed in replay.inputs():
+        apply_inputs(game, turn, speed)
+    return game
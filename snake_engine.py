@@ -0,0 +1,841 @@
+from array import array
+from collections import deque
+from heapq import heappop, heappush
+from itertools import count
+from random import Random, getrandbits
+
+from profiler import NULL_PROFILER
+
+
+# Константы для размеров экрана, информационной панели, игрового поля и сетки:
+SCREEN_WIDTH, SCREEN_HEIGHT = 640, 500
+PANEL_WIDTH, PANEL_HIGHT = SCREEN_WIDTH, 20
+GAME_WINDOW_WIDTH, GAME_WINDOW_HIGHT = SCREEN_WIDTH, (
+    SCREEN_HEIGHT - PANEL_HIGHT)
+PANEL_POSITION = (0, GAME_WINDOW_HIGHT)
+SCREEN_CENTER = (SCREEN_WIDTH // 2, GAME_WINDOW_HIGHT // 2)
+GRID_SIZE = 20
+GRID_WIDTH = SCREEN_WIDTH // GRID_SIZE
+GRID_HEIGHT = GAME_WINDOW_HIGHT // GRID_SIZE
+
+# Направления движения:
+UP = (0, -1)
+DOWN = (0, 1)
+LEFT = (-1, 0)
+RIGHT = (1, 0)
+
+# Направления по номерам: номер направления в DIRECTIONS занимает 2 бита
+# в форматах, где тело змейки хранится цепочкой ходов.
+DIRECTIONS = (UP, DOWN, LEFT, RIGHT)
+
+# Наибольший размер поля в ячейках для режима большого поля:
+MAX_BOARD_SIZE = 2000
+
+# Скорость движения змейки:
+SPEED = 13
+
+# Наибольшая скорость змейки, тиков в секунду:
+MAX_SPEED = 1000
+
+# События, которыми может закончиться шаг игры:
+APPLE_EATEN = 'apple'
+GARBAGE_EATEN = 'garbage'
+
+# Причины, по которым игра начинается заново:
+HIT_ITSELF = 'itself'
+HIT_SNAKE = 'snake'
+HIT_BARRIER = 'barrier'
+STARVED = 'starved'
+BOARD_FULL = 'board_full'
+GAME_OVER_EVENTS = frozenset(
+    (HIT_ITSELF, HIT_SNAKE, HIT_BARRIER, STARVED, BOARD_FULL))
+
+# С какой вероятностью бот арены поворачивает без причины на каждом тике:
+WANDER_TURN_CHANCE = 0.1
+
+# Что, кроме змейки, лежит в ячейке поля. Яблоко, мусор и преграды
+# появляются только в свободных ячейках, поэтому в одной ячейке
+# не бывает двух таких объектов:
+CELL_EMPTY = 0
+CELL_APPLE = 1
+CELL_GARBAGE = 2
+CELL_BARRIER = 3
+
+# Фигуры преград: сдвиги ячеек фигуры относительно ее опорной ячейки.
+BARRIER_FIGURES = (
+    ((0, 0),),
+    ((0, 0), (1, 0)),
+    ((0, 0), (0, 1)),
+    ((0, 0), (1, 0), (2, 0)),
+    ((0, 0), (0, 1), (0, 2)),
+    ((0, 0), (1, 0), (0, 1)),
+    ((0, 0), (1, 0), (1, 1)),
+    ((0, 0), (0, 1), (1, 1)),
+    ((0, 1), (1, 0), (1, 1)),
+)
+
+# Через сколько тиков мусор меняет положение и появляется новая
+# преграда: случайное число от и до, включительно:
+GARBAGE_DELAY = (50, 200)
+BARRIER_DELAY = (300, 500)
+
+# Сколько случайных мест пробуется для фигуры преграды:
+BARRIER_ATTEMPTS = 16
+
+# Если случайные попытки не удались, а свободных ячеек не больше этого
+# числа, место выбирается из списка всех подходящих мест, собранного
+# перебором свободных ячеек. Если свободных ячеек больше, поле заполнено
+# слабо и неудача попыток означает, что фигуре почти негде поместиться:
+BARRIER_SCAN_LIMIT = 4096
+
+
+class BoardFullError(Exception):
+    """На игровом поле не осталось свободных ячеек."""
+
+
+class FreeCells:
+    """Сетка занятости игрового поля и индекс свободных ячеек.
+
+    Ячейка поля задается одним числом - номером y * width + x в сетке
+    поля, в пикселях координаты считаются только при отрисовке. Номера
+    свободных ячеек хранятся в массиве cells, а место каждой ячейки
+    в этом массиве - в массиве index, поэтому занятие и освобождение
+    ячейки (удаление обменом с последним элементом) и выбор случайной
+    свободной ячейки выполняются за O(1) при любой заполненности поля.
+    Для каждой ячейки в bytearray counts ведется счетчик занявших ее
+    объектов, поэтому объекты могут временно перекрываться, например
+    голова змейки и только что съеденное яблоко.
+
+    В bytearray kinds для каждой ячейки хранится, какой объект, кроме
+    змейки, ее занимает (CELL_APPLE, CELL_GARBAGE, CELL_BARRIER или
+    CELL_EMPTY). Остальные занявшие ячейку объекты - сегменты змейки.
+    Сетку обновляют сами объекты, когда занимают и освобождают ячейки,
+    а все проверки столкновений - обращение к ней за O(1). Яблоки и мусор
+    передают при занятии ячейки себя, и словарь owners хранит, какой
+    именно предмет лежит в ячейке, сколько бы предметов ни было на поле.
+
+    Все структуры - плоские массивы чисел, так что поле 2000x2000 ячеек
+    занимает около 40 Мбайт.
+
+    Аргументы:
+    - width, height: размер поля в ячейках.
+    """
+
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT):
+        if not (0 < width <= MAX_BOARD_SIZE and 0 < height <= MAX_BOARD_SIZE):
+            raise ValueError(f'Размер поля должен быть от 1 до '
+                             f'{MAX_BOARD_SIZE} ячеек.')
+        self.width = width
+        self.height = height
+        self.center = height // 2 * width + width // 2
+        self.cells = array('i', range(width * height))
+        self.index = array('i', range(width * height))
+        self.counts = bytearray(width * height)
+        self.kinds = bytearray(width * height)
+        self.owners = {}
+
+    def __len__(self):
+        """Возвращает количество свободных ячеек."""
+        return len(self.cells)
+
+    def coordinates(self, cell):
+        """Возвращает координаты ячейки в сетке поля: (x, y)."""
+        y_pos, x_pos = divmod(cell, self.width)
+        return x_pos, y_pos
+
+    def shift(self, cell, offset):
+        """Возвращает ячейку, сдвинутую на offset = (dx, dy) ячеек.
+
+        Поле замкнуто: за краем поля продолжается его другая сторона.
+        """
+        y_pos, x_pos = divmod(cell, self.width)
+        return ((y_pos + offset[1]) % self.height * self.width
+                + (x_pos + offset[0]) % self.width)
+
+    def is_free(self, cell):
+        """Проверяет, свободна ли ячейка."""
+        return not self.counts[cell]
+
+    def snake_segments(self, cell):
+        """Возвращает число сегментов змейки в ячейке."""
+        return self.counts[cell] - (self.kinds[cell] != CELL_EMPTY)
+
+    def occupy(self, cell, kind=CELL_EMPTY, owner=None):
+        """Отмечает, что ячейку занял еще один объект.
+
+        Аргументы:
+        - kind: вид объекта для сетки kinds. Сегменты змейки занимают
+        ячейки с видом по умолчанию.
+        - owner: объект, который нужно найти по ячейке через owners.
+        """
+        count = self.counts[cell]
+        self.counts[cell] = count + 1
+        if kind:
+            self.kinds[cell] = kind
+        if owner is not None:
+            self.owners[cell] = owner
+        if count == 0:
+            # Удаляем ячейку из списка свободных, переставляя
+            # на ее место последний элемент.
+            i = self.index[cell]
+            last_cell = self.cells.pop()
+            if last_cell != cell:
+                self.cells[i] = last_cell
+                self.index[last_cell] = i
+
+    def release(self, cell, kind=CELL_EMPTY):
+        """Отмечает, что один из объектов освободил ячейку.
+
+        Аргументы:
+        - kind: вид объекта, с которым ячейка была занята.
+        """
+        count = self.counts[cell] - 1
+        self.counts[cell] = count
+        if kind:
+            self.kinds[cell] = CELL_EMPTY
+            self.owners.pop(cell, None)
+        if not count:
+            self.index[cell] = len(self.cells)
+            self.cells.append(cell)
+
+    def random_cell(self, rng):
+        """Возвращает случайную свободную ячейку.
+
+        Аргументы:
+        - rng: генератор случайных чисел (random.Random).
+
+        Если свободных ячеек нет, выбрасывает BoardFullError.
+        """
+        if not self.cells:
+            raise BoardFullError('На игровом поле не осталось '
+                                 'свободных ячеек.')
+        return rng.choice(self.cells)
+
+
+def step_codes(free_cells):
+    """Возвращает словарь: разность номеров соседних ячеек -> направление.
+
+    Соседние ячейки змейки отличаются на 1 или на ширину поля, а на краю
+    поля, где змейка переходит на другую сторону, - на ширину или высоту
+    поля без одной ячейки. Разности для всех случаев получаются из двух
+    угловых ячеек, поэтому направление хода находится одним обращением
+    к словарю, без перебора направлений.
+    """
+    codes = {}
+    for cell in (0, free_cells.width * free_cells.height - 1):
+        for code, direction in enumerate(DIRECTIONS):
+            codes.setdefault(free_cells.shift(cell, direction) - cell, code)
+    return codes
+
+
+class Scheduler:
+    """Планировщик событий по тикам игры.
+
+    Объекты с таймерами (мусор, преграды) ставят в планировщик действие
+    на нужный тик, а игра на каждом тике выполняет только наступившие
+    события. События хранятся в двоичной куче по тику срабатывания,
+    поэтому тик без событий стоит одну проверку вершины кучи при любом
+    числе ожидающих таймеров. Отмененное событие остается в куче и
+    пропускается, когда до него доходит очередь.
+    """
+
+    def __init__(self):
+        self.tick = 0
+        self.queue = []
+        self.counter = count()
+
+    def schedule(self, delay, action):
+        """Планирует вызов action через delay тиков.
+
+        Возвращает событие, которое можно передать в cancel().
+        """
+        event = [self.tick + delay, next(self.counter), action]
+        heappush(self.queue, event)
+        return event
+
+    def cancel(self, event):
+        """Отменяет событие. None и уже выполненные события пропускаются."""
+        if event is not None:
+            event[2] = None
+
+    def advance(self, tick):
+        """Переходит к тику tick и выполняет наступившие события."""
+        self.tick = tick
+        queue = self.queue
+        while queue and queue[0][0] <= tick:
+            action = heappop(queue)[2]
+            if action is not None:
+                action()
+
+
+class Entity:
+    """Базовый класс игровых объектов без привязки к отрисовке.
+
+    Аргументы:
+    - free_cells: общий для всех объектов игры индекс свободных ячеек.
+    Если не передан, объект создает собственный.
+    - rng: генератор случайных чисел (random.Random). Все случайные
+    решения объекта принимаются через него, поэтому игра с тем же
+    зерном генератора повторяется в точности.
+    - scheduler: общий для всех объектов игры планировщик таймеров.
+    Если не передан, объект создает собственный.
+
+    Атрибуты объектов объявлены в __slots__: на большом поле и с длинной
+    змейкой объектов и ячеек много, а слоты занимают меньше памяти, чем
+    словарь атрибутов. Новые слоты при множественном наследовании может
+    добавлять только одна ветка классов, поэтому слот body_color для
+    цвета, который задает графический интерфейс, объявлен здесь.
+    """
+
+    __slots__ = ('position', 'free_cells', 'rng', 'scheduler', 'body_color')
+
+    def __init__(self, free_cells=None, rng=None, scheduler=None):
+        self.free_cells = (FreeCells() if free_cells is None
+                           else free_cells)
+        self.position = self.free_cells.center
+        self.rng = Random() if rng is None else rng
+        self.scheduler = Scheduler() if scheduler is None else scheduler
+
+
+class Item(Entity):
+    """Предмет, который змейка может съесть: яблоко или мусор.
+
+    Предмет занимает одну ячейку и отмечается в сетке занятости видом
+    kind вместе с самим собой, поэтому по ячейке головы змейки он
+    находится за O(1), сколько бы предметов ни лежало на поле.
+    """
+
+    __slots__ = ()
+
+    kind = CELL_EMPTY
+
+    def __init__(self, free_cells=None, rng=None, scheduler=None):
+        super().__init__(free_cells, rng, scheduler)
+        self.position = None
+        self.randomize_position()
+
+    def randomize_position(self):
+        """Устанавливает случайное положение предмета на игровом поле.
+
+        Предмет появляется только в свободной ячейке. Если свободных
+        ячеек нет, выбрасывается BoardFullError.
+        """
+        self.place(self.free_cells.random_cell(self.rng))
+
+    def place(self, cell):
+        """Переставляет предмет в свободную ячейку cell."""
+        self.remove()
+        self.position = cell
+        self.free_cells.occupy(cell, self.kind, self)
+
+    def remove(self):
+        """Убирает предмет с поля, освобождая его ячейку."""
+        if self.position is not None:
+            self.free_cells.release(self.position, self.kind)
+            self.position = None
+
+
+class Apple(Item):
+    """Яблоко: при съедании увеличивает змейку на одну ячейку."""
+
+    __slots__ = ()
+
+    kind = CELL_APPLE
+
+
+class Garbage(Item):
+    """Несъедобный мусор, который время от времени меняет положение."""
+
+    __slots__ = ('time_to_change', 'timer')
+
+    kind = CELL_GARBAGE
+    delay_range = GARBAGE_DELAY
+
+    def __init__(self, free_cells=None, rng=None, scheduler=None):
+        self.timer = None
+        super().__init__(free_cells, rng, scheduler)
+
+    def place(self, cell):
+        """Переставляет мусор в ячейку cell и заводит его таймер."""
+        super().place(cell)
+        # Устанавливаем время, спустя которое нужно сгенерировать
+        # новую позицию.
+        self.set_time_to_change_position()
+
+    def set_time_to_change_position(self):
+        """Задает случайное число для времени, через которое нужно
+        сгенерировать новую позицию.
+
+        Смена позиции ставится в планировщик, прежний таймер отменяется.
+        """
+        self.time_to_change = self.rng.randint(*self.delay_range)
+        self.scheduler.cancel(self.timer)
+        self.timer = self.scheduler.schedule(self.time_to_change,
+                                             self.randomize_position)
+
+
+class Snake(Entity):
+    """Змейка и ее движение по полю.
+
+    Сегменты змейки хранятся в деке positions (голова - первый элемент),
+    а сколько сегментов занимает каждую ячейку, видно по сетке занятости
+    free_cells. Добавление головы, удаление хвоста и проверка
+    столкновения змейки с собой выполняются за O(1) при любой длине
+    змейки.
+    """
+
+    __slots__ = ('positions', 'direction', 'next_direction', 'length',
+                 'speed')
+
+    def __init__(self, free_cells=None, rng=None, scheduler=None):
+        super().__init__(free_cells, rng, scheduler)
+        self.positions = deque()
+        self.reset(RIGHT)
+        self.next_direction = None
+
+    def update_direction(self):
+        """Обновляет направления змейки после нажатия на кнопку."""
+        if self.next_direction:
+            self.direction = self.next_direction
+            self.next_direction = None
+
+    def move(self):
+        """Обновляет позицию змейки (координаты каждого сегмента).
+
+        Возвращает список освободившихся ячеек хвоста.
+        """
+        # Новая голова - соседняя ячейка в направлении движения.
+        new_head_position = self.free_cells.shift(self.get_head_position(),
+                                                  self.direction)
+        self.positions.appendleft(new_head_position)
+        self.free_cells.occupy(new_head_position)
+
+        # Проверяем, съела ли змейка яблоко.
+        tails = []
+        if len(self.positions) > self.length:
+            count_extra_cell = len(self.positions) - self.length
+            for _ in range(count_extra_cell):
+                tail = self.positions.pop()
+                self.free_cells.release(tail)
+                tails.append(tail)
+        return tails
+
+    def get_head_position(self):
+        """Возвращает позицию головы змейки."""
+        return self.positions[0]
+
+    def check_collision_with_itself(self):
+        """Проверяет, врезалась ли голова змейки в ее тело."""
+        return self.free_cells.snake_segments(self.get_head_position()) > 1
+
+    def change_speed(self, selector):
+        """Изменяет скорость движения змейки.
+
+        Скорость остается в пределах от одного до MAX_SPEED тиков
+        в секунду.
+        """
+        if selector == 1:
+            self.speed = max(1, self.speed - 1)
+        else:
+            self.speed = min(MAX_SPEED, self.speed + 1)
+
+    def remove(self):
+        """Убирает змейку с поля, освобождая ее ячейки."""
+        for cell in self.positions:
+            self.free_cells.release(cell)
+        self.positions.clear()
+
+    def reset(self, direction=None):
+        """Сбрасывает змейку в начальное состояние после
+        столкновения с собой.
+
+        Змейка длиной в одну ячейку появляется в ячейке position.
+        """
+        self.remove()
+        self.length = 1
+        self.positions = deque([self.position])
+        self.free_cells.occupy(self.position)
+        self.direction = direction or self.rng.choice([RIGHT, UP, LEFT, DOWN])
+        self.speed = SPEED
+
+
+class Barrier(Entity):
+    """Преграды, которые появляются на поле через случайное время."""
+
+    __slots__ = ('positions', 'time_to_change', 'timer')
+
+    delay_range = BARRIER_DELAY
+
+    def __init__(self, free_cells=None, rng=None, scheduler=None):
+        super().__init__(free_cells, rng, scheduler)
+        self.positions = []
+        self.timer = None
+        self.reset()
+
+    def create_new_barrier(self):
+        """Создает новую случайную фигуру преграды."""
+        return self.rng.choice(BARRIER_FIGURES)
+
+    def randomize_position(self):
+        """Устанавливает случайное положение фигуры на поле.
+
+        Фигура, как и змейка, переходит через границы поля. Если для
+        выбранной фигуры нет места, пробуются остальные фигуры в
+        случайном порядке, а если места нет ни для одной, преграда
+        не появляется до следующего срока.
+
+        Возвращает True, если преграда появилась.
+        """
+        new_figure_positions = self.find_place(self.create_new_barrier())
+        if new_figure_positions is None:
+            figures = list(BARRIER_FIGURES)
+            self.rng.shuffle(figures)
+            new_figure_positions = next(
+                (place for place in map(self.find_place, figures)
+                 if place is not None), None)
+        self.set_time_to_new_barrier()
+        if new_figure_positions is None:
+            return False
+        for cell in new_figure_positions:
+            self.free_cells.occupy(cell, CELL_BARRIER)
+        self.positions.append(new_figure_positions)
+        return True
+
+    def figure_cells(self, anchor, figure):
+        """Возвращает ячейки фигуры с опорной ячейкой anchor."""
+        return [self.free_cells.shift(anchor, offset) for offset in figure]
+
+    def legal_anchors(self, figure):
+        """Возвращает все опорные ячейки, где фигура помещается целиком.
+
+        Первая ячейка фигуры должна быть свободной, поэтому перебираются
+        только свободные ячейки поля.
+        """
+        free_cells = self.free_cells
+        dx, dy = figure[0]
+        anchors = (free_cells.shift(cell, (-dx, -dy))
+                   for cell in free_cells.cells)
+        return [anchor for anchor in anchors
+                if all(map(free_cells.is_free,
+                           self.figure_cells(anchor, figure)))]
+
+    def find_place(self, figure):
+        """Выбирает случайное место для фигуры.
+
+        Сначала пробуется несколько случайных мест, а на заполненном
+        поле место выбирается из всех подходящих, поэтому время поиска
+        ограничено при любой заполненности поля.
+
+        Возвращает ячейки фигуры или None, если места не нашлось.
+        """
+        free_cells = self.free_cells
+        if not len(free_cells):
+            return None
+        dx, dy = figure[0]
+        for _ in range(BARRIER_ATTEMPTS):
+            anchor = free_cells.shift(free_cells.random_cell(self.rng),
+                                      (-dx, -dy))
+            cells = self.figure_cells(anchor, figure)
+            if all(map(free_cells.is_free, cells)):
+                return cells
+        if len(free_cells) > BARRIER_SCAN_LIMIT:
+            return None
+        anchors = self.legal_anchors(figure)
+        if not anchors:
+            return None
+        return self.figure_cells(self.rng.choice(anchors), figure)
+
+    def is_hit(self, cell):
+        """Проверяет, занята ли ячейка одной из преград."""
+        return self.free_cells.kinds[cell] == CELL_BARRIER
+
+    def set_time_to_new_barrier(self):
+        """Задает случайное время до появления следующей фигуры.
+
+        Появление фигуры ставится в планировщик, прежний таймер
+        отменяется.
+        """
+        self.time_to_change = self.rng.randint(*self.delay_range)
+        self.scheduler.cancel(self.timer)
+        self.timer = self.scheduler.schedule(self.time_to_change,
+                                             self.randomize_position)
+
+    def reset(self):
+        """Удаляет все преграды с поля и начинает их генерацию сначала."""
+        for figure in self.positions:
+            for cell in figure:
+                self.free_cells.release(cell, CELL_BARRIER)
+        self.positions = []
+        self.set_time_to_new_barrier()
+
+
+class WanderBot:
+    """Простой бот для змеек арены.
+
+    Бот смотрит только на три соседние ячейки перед головой: съедает
+    яблоко, если оно рядом, иначе выбирает безопасное направление,
+    время от времени поворачивая наугад. Поэтому ход бота стоит O(1)
+    и сотни змеек на поле не замедляют тик.
+
+    Аргументы:
+    - rng: генератор случайных чисел бота.
+    """
+
+    def __init__(self, rng=None):
+        self.rng = Random() if rng is None else rng
+
+    def __call__(self, game, snake):
+        """Возвращает новое направление змейки или None."""
+        free_cells = game.free_cells
+        head = snake.get_head_position()
+        dx, dy = snake.direction
+        turns = [(dy, dx), (-dy, -dx)]
+        self.rng.shuffle(turns)
+        if self.rng.random() < WANDER_TURN_CHANCE:
+            directions = turns + [snake.direction]
+        else:
+            directions = [snake.direction] + turns
+        cells = [free_cells.shift(head, direction)
+                 for direction in directions]
+        for direction, cell in zip(directions, cells):
+            if free_cells.kinds[cell] == CELL_APPLE:
+                return direction
+        for direction, cell in zip(directions, cells):
+            if free_cells.is_free(cell):
+                return direction
+        return None
+
+
+class GameState:
+    """Состояние игры и ее правила без привязки к pygame.
+
+    Один вызов step() - один тик игры: поворот, движение змейки,
+    поедание яблока и мусора, таймеры мусора и преград, столкновения.
+    Классы объектов задаются атрибутами класса, поэтому графический
+    интерфейс может подставить свои классы с методами отрисовки.
+
+    Аргументы:
+    - seed: зерно генератора случайных чисел. Игры с одинаковым зерном
+    и одинаковыми действиями игрока совпадают тик в тик. Если зерно
+    не передано, оно выбирается случайно и сохраняется в атрибуте seed.
+    - width, height: размер поля в ячейках, до MAX_BOARD_SIZE.
+    - apple_count, garbage_count: сколько яблок и мусора одновременно
+    лежит на поле (не меньше одного). Атрибуты apple и garbage - первые
+    предметы из списков apples и garbage_items.
+    - barrier_count: сколько преград ставится на поле в начале игры.
+    - snake_count: число змеек. Если змеек больше одной, игра идет
+    в режиме арены: змейкой snake (первой в списке snakes) управляет
+    игрок, остальными - бот WanderBot. Разбившаяся змейка арены
+    появляется заново в случайной ячейке, а игра продолжается.
+    """
+
+    snake_class = Snake
+    apple_class = Apple
+    garbage_class = Garbage
+    barrier_class = Barrier
+
+    def __init__(self, seed=None, width=GRID_WIDTH, height=GRID_HEIGHT,
+                 apple_count=1, garbage_count=1, barrier_count=0,
+                 snake_count=1):
+        if min(apple_count, garbage_count, snake_count) < 1:
+            raise ValueError('На поле должны быть змейка, яблоко и мусор.')
+        self.seed = getrandbits(64) if seed is None else seed
+        self.rng = Random(self.seed)
+        self.free_cells = FreeCells(width, height)
+        self.scheduler = Scheduler()
+        entity_options = {'free_cells': self.free_cells, 'rng': self.rng,
+                          'scheduler': self.scheduler}
+        self.snake = self.snake_class(**entity_options)
+        self.snakes = [self.snake]
+        for _ in range(snake_count - 1):
+            # Новая змейка появляется в центре поля, поэтому ее сразу
+            # переставляют, чтобы в одной ячейке не копились сегменты.
+            snake = self.snake_class(**entity_options)
+            self.snakes.append(snake)
+            self.respawn_snake(snake)
+        self.bot = WanderBot(self.rng)
+        self.apples = [self.apple_class(**entity_options)
+                       for _ in range(apple_count)]
+        self.garbage_items = [self.garbage_class(**entity_options)
+                              for _ in range(garbage_count)]
+        self.apple = self.apples[0]
+        self.garbage = self.garbage_items[0]
+        self.barriers = self.barrier_class(**entity_options)
+        self.barrier_count = barrier_count
+        self.spawn_barriers()
+        self.ticks = 0
+        # Объект, которому передаются действия игрока на каждом тике,
+        # например replay.Replay для записи повтора.
+        self.recorder = None
+        # Профилировщик фаз тика, например profiler.FrameProfiler.
+        self.profiler = NULL_PROFILER
+
+    def turn(self, direction, snake=None):
+        """Задает новое направление змейки, если это не разворот.
+
+        Аргументы:
+        - snake: змейка, которую нужно повернуть. По умолчанию - змейка
+        игрока.
+        """
+        snake = snake or self.snake
+        current_dx, current_dy = snake.direction
+        if direction != (-current_dx, -current_dy):
+            snake.next_direction = direction
+
+    def step(self, action=None):
+        """Выполняет один тик игры.
+
+        Аргументы:
+        - action: новое направление движения змейки игрока или None.
+
+        Возвращает событие тика для змейки игрока (APPLE_EATEN,
+        GARBAGE_EATEN или одну из причин из GAME_OVER_EVENTS) либо None.
+        """
+        if self.recorder is not None:
+            self.recorder.record(self.ticks, action, self.snake.speed)
+        if action is not None:
+            self.turn(action)
+        self.ticks += 1
+        self.move_snakes()
+        self.profiler.lap('move')
+        try:
+            events = [self.check_items(snake) for snake in self.snakes]
+            # Таймеры мусора и преград.
+            self.scheduler.advance(self.ticks)
+            self.profiler.lap('items')
+            # Разбившейся змейке арены тоже может не хватить места.
+            self.check_collisions(events)
+        except BoardFullError:
+            # Свободных ячеек не осталось - поле заполнено.
+            self.start_over()
+            self.profiler.lap('collisions')
+            return BOARD_FULL
+        self.profiler.lap('collisions')
+        return events[0]
+
+    def move_snakes(self):
+        """Поворачивает змеек ботов и двигает все змейки."""
+        for snake in self.snakes[1:]:
+            direction = self.bot(self, snake)
+            if direction is not None:
+                self.turn(direction, snake)
+        for snake in self.snakes:
+            snake.update_direction()
+            snake.move()
+
+    def check_items(self, snake=None):
+        """Обрабатывает поедание яблока или мусора змейкой.
+
+        Съеденный предмет находится по ячейке головы за O(1) при любом
+        числе предметов на поле.
+        """
+        snake = snake or self.snake
+        head = snake.get_head_position()
+        kind = self.free_cells.kinds[head]
+
+        if kind == CELL_APPLE:
+            snake.length += 1
+            self.free_cells.owners[head].randomize_position()
+            return APPLE_EATEN
+
+        if kind == CELL_GARBAGE:
+            if snake.length == 1:
+                return STARVED
+            snake.length -= 1
+            self.free_cells.owners[head].randomize_position()
+            return GARBAGE_EATEN
+        return None
+
+    def check_collisions(self, events):
+        """Находит разбившиеся змейки и убирает их с поля.
+
+        Столкновения проверяются по сетке занятости после хода всех
+        змеек: если в ячейке головы больше одного сегмента змеек, змейка
+        врезалась в себя или в другую змейку (при встрече голов
+        разбиваются обе). Поэтому тик стоит O(число змеек) при любой
+        длине змеек.
+
+        Аргументы:
+        - events: события тика по змейкам, дополняются причинами
+        столкновений.
+        """
+        hit_snake = HIT_ITSELF if len(self.snakes) == 1 else HIT_SNAKE
+        for i, snake in enumerate(self.snakes):
+            if events[i] in GAME_OVER_EVENTS:
+                continue
+            if snake.check_collision_with_itself():
+                events[i] = hit_snake
+            elif self.barriers.is_hit(snake.get_head_position()):
+                events[i] = HIT_BARRIER
+        dead = [snake for snake, event in zip(self.snakes, events)
+                if event in GAME_OVER_EVENTS]
+        if not dead:
+            return
+        if len(self.snakes) == 1:
+            self.start_over()
+            return
+        for snake in dead:
+            snake.remove()
+        for snake in dead:
+            self.respawn_snake(snake)
+
+    def respawn_snake(self, snake):
+        """Ставит змейку длиной в одну ячейку в случайную свободную ячейку."""
+        snake.remove()
+        snake.position = self.free_cells.random_cell(self.rng)
+        snake.reset()
+
+    def start_over(self):
+        """Начинает игру заново.
+
+        Сначала с поля убирается все, поэтому змейкам арены хватает
+        места, даже если игра закончилась заполненным полем.
+        """
+        for entity in self.snakes + self.apples + self.garbage_items:
+            entity.remove()
+        self.barriers.reset()
+        self.snake.position = self.free_cells.center
+        self.snake.reset()
+        for snake in self.snakes[1:]:
+            self.respawn_snake(snake)
+        self.respawn_items()
+        self.spawn_barriers()
+
+    def respawn_items(self):
+        """Переставляет все яблоки и мусор на случайные места.
+
+        Сначала все предметы убираются с поля, затем новые ячейки для них
+        выбираются одной выборкой без повторов.
+        """
+        items = self.apples + self.garbage_items
+        for item in items:
+            item.remove()
+        if len(self.free_cells) < len(items):
+            raise BoardFullError('На игровом поле не хватает места '
+                                 'для предметов.')
+        new_cells = self.rng.sample(self.free_cells.cells, len(items))
+        for item, cell in zip(items, new_cells):
+            item.place(cell)
+
+    def spawn_barriers(self):
+        """Ставит на поле barrier_count преград начала игры."""
+        for _ in range(self.barrier_count):
+            self.barriers.randomize_position()
+
+
+def board_size(text):
+    """Разбирает размер поля в формате ШИРИНАxВЫСОТА для argparse.
+
+    Разбор общий для игры, сервера и турнира. argparse импортируется
+    только при ошибке, чтобы не замедлять импорт движка.
+    """
+    try:
+        width, height = map(int, text.lower().split('x'))
+    except ValueError:
+        error = 'размер поля задается как ШИРИНАxВЫСОТА, например 200x200'
+    else:
+        if 0 < width <= MAX_BOARD_SIZE and 0 < height <= MAX_BOARD_SIZE:
+            return width, height
+        error = f'размер поля должен быть от 1 до {MAX_BOARD_SIZE}'
+    from argparse import ArgumentTypeError
+    raise ArgumentTypeError(error)
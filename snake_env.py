@@ -0,0 +1,199 @@
+from random import Random, getrandbits
+
+from batch_engine import EVENTS, HIT_ITSELF_CODE, BatchGame
+from snake_engine import (
+    APPLE_EATEN, CELL_APPLE, CELL_BARRIER, CELL_EMPTY, CELL_GARBAGE, DOWN,
+    GAME_OVER_EVENTS, GARBAGE_EATEN, LEFT, RIGHT, UP, GameState
+)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy нужен только этому модулю.
+    np = None
+
+
+# Действия среды - нажатия клавиш со стрелками: номер действия - индекс
+# направления. Как и в OBJECT_DIRECTION_LOGIC игры, нажатие в сторону,
+# противоположную движению, или в сторону движения ничего не меняет.
+ACTIONS = (UP, DOWN, LEFT, RIGHT)
+
+# Каналы наблюдения: что лежит в ячейке поля.
+CHANNEL_SNAKE = 0
+CHANNEL_APPLE = 1
+CHANNEL_GARBAGE = 2
+CHANNEL_BARRIER = 3
+CHANNELS = 4
+
+# Награды за события тика. Конец игры - любое событие из
+# GAME_OVER_EVENTS:
+APPLE_REWARD = 1.0
+GARBAGE_REWARD = -1.0
+GAME_OVER_REWARD = -5.0
+
+
+def event_reward(event):
+    """Возвращает награду за событие тика."""
+    if event == APPLE_EATEN:
+        return APPLE_REWARD
+    if event == GARBAGE_EATEN:
+        return GARBAGE_REWARD
+    if event in GAME_OVER_EVENTS:
+        return GAME_OVER_REWARD
+    return 0.0
+
+
+def fill_item_channels(observation, kinds):
+    """Заполняет каналы яблок, мусора и преград без новых массивов.
+
+    Аргументы:
+    - observation: массив (CHANNELS, ...) для результата.
+    - kinds: вид объекта по ячейкам, формы observation[0].
+    """
+    for channel, kind in ((CHANNEL_APPLE, CELL_APPLE),
+                          (CHANNEL_GARBAGE, CELL_GARBAGE),
+                          (CHANNEL_BARRIER, CELL_BARRIER)):
+        np.equal(kinds, kind, out=observation[channel], casting='unsafe')
+
+
+class EpisodeGame(GameState):
+    """Игра среды: конец игры не начинает ее заново.
+
+    Новую игру начинает SnakeEnv.reset(), поэтому наблюдение, которое
+    step() возвращает вместе с концом игры, показывает последнее
+    состояние игры, а не первый кадр следующей.
+    """
+
+    def start_over(self):
+        """Оставляет игру в последнем состоянии до reset() среды."""
+
+
+class SnakeEnv:
+    """Среда в стиле Gym для обучения с подкреплением.
+
+    reset() начинает игру и возвращает наблюдение, step(action)
+    выполняет один тик и возвращает (наблюдение, награда, конец игры,
+    информация). Наблюдение - массив NumPy (CHANNELS, высота, ширина)
+    типа uint8 с каналами CHANNEL_*: он выделяется один раз и
+    обновляется на месте, а сетки занятости игры читаются напрямую
+    через буферы, без копирования и без отрисовки кадра. После конца
+    игры наблюдение показывает ее последнее состояние, а новую игру
+    начинает reset().
+
+    Аргументы:
+    - seed: зерно, от которого берутся зерна игр.
+    - max_steps: через сколько тиков игра прерывается (конец игры
+    с info['truncated'] = True). None - без ограничения.
+    - observation: готовый массив для наблюдения, например срез
+    общего массива нескольких сред.
+    - game_options: настройки игры, как у GameState.
+    """
+
+    def __init__(self, seed=None, max_steps=None, observation=None,
+                 **game_options):
+        if np is None:
+            raise ImportError('Для среды нужен NumPy.')
+        self.rng = Random(getrandbits(64) if seed is None else seed)
+        self.max_steps = max_steps
+        self.game_options = game_options
+        self.game = None
+        self.counts = self.kinds = None
+        self.observation = observation
+        self.action_count = len(ACTIONS)
+
+    def reset(self, seed=None):
+        """Начинает новую игру и возвращает наблюдение."""
+        if seed is None:
+            seed = self.rng.getrandbits(64)
+        self.game = EpisodeGame(seed, **self.game_options)
+        free_cells = self.game.free_cells
+        shape = (free_cells.height, free_cells.width)
+        if self.observation is None:
+            self.observation = np.zeros((CHANNELS,) + shape, np.uint8)
+        self.counts = np.frombuffer(free_cells.counts,
+                                    np.uint8).reshape(shape)
+        self.kinds = np.frombuffer(free_cells.kinds,
+                                   np.uint8).reshape(shape)
+        self.update_observation()
+        return self.observation
+
+    def update_observation(self):
+        """Обновляет наблюдение по сеткам занятости игры."""
+        fill_item_channels(self.observation, self.kinds)
+        snake = self.observation[CHANNEL_SNAKE]
+        np.not_equal(self.kinds, CELL_EMPTY, out=snake, casting='unsafe')
+        # Сегменты змейки - все объекты ячейки, кроме предмета или
+        # преграды.
+        np.subtract(self.counts, snake, out=snake)
+
+    def step(self, action):
+        """Выполняет тик игры с действием action (индекс в ACTIONS)."""
+        game = self.game
+        event = game.step(ACTIONS[action])
+        self.update_observation()
+        truncated = (self.max_steps is not None
+                     and game.ticks >= self.max_steps)
+        done = event in GAME_OVER_EVENTS or truncated
+        info = {'event': event, 'length': game.snake.length,
+                'ticks': game.ticks, 'truncated': truncated}
+        return self.observation, event_reward(event), done, info
+
+
+class VectorSnakeEnv:
+    """Много сред сразу на пакетном движке batch_engine.BatchGame.
+
+    step(actions) выполняет тик всех игр одной векторной операцией и
+    возвращает массивы наблюдений (игры, CHANNELS, высота, ширина),
+    наград и признаков конца игры. Закончившаяся игра сразу
+    начинается заново, как в векторных средах Gym, поэтому reset()
+    нужен только один раз. Все возвращаемые массивы выделяются один раз
+    и обновляются на месте.
+
+    Аргументы:
+    - count: число сред.
+    - seed: зерно генератора случайных чисел пакетного движка.
+    - batch_options: размер поля и число преград, как у BatchGame.
+    """
+
+    def __init__(self, count, seed=None, **batch_options):
+        if np is None:
+            raise ImportError('Для среды нужен NumPy.')
+        self.count = count
+        self.seed = seed
+        self.batch_options = batch_options
+        self.batch = None
+        self.observation = None
+        self.rewards = np.zeros(count, np.float32)
+        self.dones = np.zeros(count, bool)
+        self.action_count = len(ACTIONS)
+        # Награда по коду события пакетного движка.
+        self.reward_table = np.array([event_reward(event)
+                                      for event in EVENTS], np.float32)
+
+    def reset(self):
+        """Начинает все игры заново и возвращает наблюдения."""
+        self.batch = BatchGame(self.count, seed=self.seed,
+                               **self.batch_options)
+        batch = self.batch
+        if self.observation is None:
+            self.observation = np.zeros(
+                (self.count, CHANNELS, batch.height, batch.width), np.uint8)
+        self.update_observation()
+        return self.observation
+
+    def update_observation(self):
+        """Обновляет наблюдения по сеткам пакетного движка."""
+        fill_item_channels(self.observation.swapaxes(0, 1),
+                           self.batch.kind_grid)
+        np.copyto(self.observation[:, CHANNEL_SNAKE], self.batch.snake_grid)
+
+    def step(self, actions):
+        """Выполняет тик всех игр с действиями actions (индексы ACTIONS).
+
+        Возвращает наблюдения, награды, признаки конца игры и коды
+        событий тика пакетного движка.
+        """
+        events = self.batch.step(actions)
+        self.update_observation()
+        np.take(self.reward_table, events, out=self.rewards)
+        np.greater_equal(events, HIT_ITSELF_CODE, out=self.dones)
+        return self.observation, self.rewards, self.dones, events
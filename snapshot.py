@@ -0,0 +1,613 @@
+import struct
+import sys
+from array import array
+from functools import lru_cache
+from itertools import islice
+
+from snake_engine import (
+    CELL_BARRIER, DIRECTIONS, MAX_SPEED, FreeCells, GameState, step_codes
+)
+
+
+# Формат снимка игры:
+# - заголовок HEADER: сигнатура SNAPSHOT_MAGIC, версия формата (1 байт),
+#   размер поля (по 2 байта на ширину и высоту), число змеек, яблок
+#   и мусора (по 2 байта), число преград в начале игры (4 байта), зерно
+#   игры (8 байт), номер тика игры и тика планировщика (по 4 байта)
+#   и ширина таймеров в битах;
+# - битовый поток без выравнивания, где ячейки занимают
+#   (ячеек поля - 1).bit_length() бит, а длины и количества -
+#   (ячеек поля).bit_length() бит:
+#   - по каждой змейке: голова, число сегментов, длина, скорость
+#     (SPEED_BITS бит) и номер направления (2 бита);
+#   - ячейки яблок; ячейки мусора и время до их перестановки;
+#   - время до появления преграды;
+#   - таймеры мусора и преград в порядке срабатывания: номер объекта
+#     (мусор, затем преграды) и через сколько тиков таймер сработает;
+#   - число фигур преград, размеры фигур (по 2 бита) и их ячейки;
+#   - тела змеек: ходы от головы к хвосту по 2 бита (номер направления
+#     в DIRECTIONS);
+#   - число свободных ячеек и их порядок в индексе свободных ячеек;
+# - состояние генератора случайных чисел RNG_STATE, с границы байта.
+# Порядок свободных ячеек и генератор нужны, чтобы игра после
+# восстановления снимка продолжалась так же, как продолжилась бы
+# без него.
+SNAPSHOT_MAGIC = b'SNKS'
+SNAPSHOT_VERSION = 2
+HEADER = struct.Struct('<4sBHHHHHIQIIB')
+RNG_STATE = struct.Struct('<625I?d')
+
+# Версия состояния random.Random, которое хранится в снимке:
+RNG_VERSION = 3
+
+# Сколько бит отводится на скорость змейки - до MAX_SPEED:
+SPEED_BITS = MAX_SPEED.bit_length()
+
+# Сколько последних снимков хранит Rollback по умолчанию: две секунды
+# игры на обычной скорости змейки.
+ROLLBACK_DEPTH = 26
+
+WORD_BITS = 64
+WORD_MASK = (1 << WORD_BITS) - 1
+
+# Ширина ячейки массива array('i') в битах - полосы упаковки
+# pack_lanes:
+LANE_BITS = 8 * array('i').itemsize
+
+# Сколько чисел упаковывается в одно большое число. Операции с большим
+# числом линейны по его длине, поэтому массив пакуется кусками, и время
+# записи растет линейно с размером поля.
+LANE_CHUNK = 1024
+
+
+class SnapshotFormatError(Exception):
+    """Данные не являются снимком этой игры или повреждены."""
+
+
+@lru_cache(maxsize=64)
+def lane_masks(width, steps):
+    """Возвращает маски слияния полос для pack_lanes и unpack_lanes.
+
+    На шаге k полосы по LANE_BITS << k бит, в младших битах каждой -
+    width << k бит данных, сливаются попарно: данные старшей полосы
+    пары сдвигаются вплотную к данным младшей. Маски покрывают
+    2 ** steps полос.
+
+    Возвращает кортеж (маска младших данных, маска старших данных,
+    сдвиг) для каждого шага.
+    """
+    masks = []
+    for step in range(steps):
+        lane, data = LANE_BITS << step, width << step
+        pairs = 1 << (steps - 1 - step)
+        pattern = ((1 << data) - 1).to_bytes(2 * lane // 8, 'little')
+        low = int.from_bytes(pattern * pairs, 'little')
+        masks.append((low, low << lane, lane - data))
+    return tuple(masks)
+
+
+def pack_lanes(cells, width):
+    """Упаковывает array('i') неотрицательных чисел по width бит в число.
+
+    Массив целиком превращается в одно большое число, где каждое
+    значение занимает полосу LANE_BITS бит, а затем полосы сливаются
+    попарно за log2(len(cells)) шагов. Каждый шаг - несколько операций
+    с большим числом, а не цикл по значениям, поэтому сотни ячеек
+    упаковываются за микросекунды. Массивы длиннее LANE_CHUNK
+    пакуются кусками - см. BitWriter.write_array.
+    """
+    if sys.byteorder == 'big':
+        cells = array('i', cells)
+        cells.byteswap()
+    value = int.from_bytes(cells.tobytes(), 'little')
+    for low, high, shift in lane_masks(width,
+                                       max(0, len(cells) - 1).bit_length()):
+        value = value & low | (value & high) >> shift
+    return value
+
+
+def unpack_lanes(value, number, width):
+    """Распаковывает number чисел, упакованных pack_lanes, в array('i')."""
+    for low, high, shift in reversed(
+            lane_masks(width, max(0, number - 1).bit_length())):
+        value = value & low | value << shift & high
+    cells = array('i')
+    cells.frombytes(value.to_bytes(number * LANE_BITS // 8, 'little'))
+    if sys.byteorder == 'big':
+        cells.byteswap()
+    return cells
+
+
+class BitWriter:
+    """Записывает числа заданной ширины в битах подряд в буфер.
+
+    Биты копятся в числе и выводятся в буфер по 8 байт, поэтому запись
+    числа - несколько операций с целыми без обращения к буферу.
+
+    Аргументы:
+    - view: memoryview буфера.
+    - offset: смещение начала записи в байтах.
+    """
+
+    def __init__(self, view, offset=0):
+        self.view = view
+        self.offset = offset
+        self.value = 0
+        self.bits = 0
+
+    def write(self, value, width):
+        """Записывает число шириной width бит, сколь угодно большой."""
+        value = self.value | value << self.bits
+        bits = self.bits + width
+        if bits >= WORD_BITS:
+            size = bits // 8
+            self.view[self.offset:self.offset + size] = (
+                value & ((1 << 8 * size) - 1)).to_bytes(size, 'little')
+            self.offset += size
+            value >>= 8 * size
+            bits -= 8 * size
+        self.value, self.bits = value, bits
+
+    def write_array(self, cells, width):
+        """Записывает array('i') неотрицательных чисел шириной width бит."""
+        for start in range(0, len(cells), LANE_CHUNK):
+            chunk = cells[start:start + LANE_CHUNK]
+            self.write(pack_lanes(chunk, width), len(chunk) * width)
+
+    def write_values(self, values, width):
+        """Записывает числа шириной width бит."""
+        value, bits = self.value, self.bits
+        view, offset = self.view, self.offset
+        for item in values:
+            value |= item << bits
+            bits += width
+            if bits >= WORD_BITS:
+                view[offset:offset + 8] = (value & WORD_MASK).to_bytes(
+                    8, 'little')
+                value >>= WORD_BITS
+                bits -= WORD_BITS
+                offset += 8
+        self.value, self.bits, self.offset = value, bits, offset
+
+    def flush(self):
+        """Дописывает оставшиеся биты и возвращает смещение за ними."""
+        size = (self.bits + 7) // 8
+        self.view[self.offset:self.offset + size] = self.value.to_bytes(
+            size, 'little')
+        self.offset += size
+        self.value = self.bits = 0
+        return self.offset
+
+
+class BitReader:
+    """Читает числа, записанные BitWriter.
+
+    Аргументы:
+    - view: memoryview данных.
+    - offset: смещение начала чтения в байтах.
+    """
+
+    def __init__(self, view, offset=0):
+        self.view = view
+        self.offset = offset
+        self.value = 0
+        self.bits = 0
+
+    def read(self, width):
+        """Читает число шириной width бит, сколь угодно большое."""
+        value, bits = self.value, self.bits
+        if bits < width:
+            size = (width - bits + 7) // 8
+            chunk = self.view[self.offset:self.offset + size]
+            if len(chunk) < size:
+                raise SnapshotFormatError('Снимок обрывается.')
+            value |= int.from_bytes(chunk, 'little') << bits
+            bits += 8 * size
+            self.offset += size
+        self.value, self.bits = value >> width, bits - width
+        return value & ((1 << width) - 1)
+
+    def read_array(self, number, width):
+        """Читает number чисел шириной width бит в array('i')."""
+        cells = array('i')
+        for start in range(0, number, LANE_CHUNK):
+            size = min(LANE_CHUNK, number - start)
+            cells.extend(unpack_lanes(self.read(size * width), size, width))
+        return cells
+
+    def read_values(self, number, width):
+        """Читает number чисел шириной width бит и возвращает список."""
+        value, bits = self.value, self.bits
+        view, offset = self.view, self.offset
+        mask = (1 << width) - 1
+        values = []
+        for _ in range(number):
+            if bits < width:
+                chunk = view[offset:offset + 8]
+                if not chunk:
+                    raise SnapshotFormatError('Снимок обрывается.')
+                value |= int.from_bytes(chunk, 'little') << bits
+                bits += 8 * len(chunk)
+                offset += len(chunk)
+                if bits < width:
+                    raise SnapshotFormatError('Снимок обрывается.')
+            values.append(value & mask)
+            value >>= width
+            bits -= width
+        self.value, self.bits, self.offset = value, bits, offset
+        return values
+
+    def align(self):
+        """Пропускает биты до границы байта и возвращает смещение."""
+        return self.offset - self.bits // 8
+
+
+class Widths:
+    """Ширины полей снимка в битах для игры game."""
+
+    def __init__(self, game, timer_bits=None):
+        size = game.free_cells.width * game.free_cells.height
+        self.cell = max(1, (size - 1).bit_length())
+        self.count = size.bit_length()
+        self.owner = len(game.garbage_items).bit_length()
+        if timer_bits is None:
+            timer_bits = max(game.garbage_class.delay_range[1],
+                             game.barrier_class.delay_range[1]).bit_length()
+        self.timer = timer_bits
+
+    def fixed_bits(self, game):
+        """Возвращает число бит полей, которые не зависят от состояния."""
+        timers = len(game.garbage_items) + 1
+        return (len(game.snakes) * (self.cell + 2 * self.count
+                                    + SPEED_BITS + 2)
+                + len(game.apples + game.garbage_items) * self.cell
+                + timers * (2 * self.timer + self.owner)
+                + 2 * self.count)
+
+
+def snapshot_size(game, widths=None):
+    """Возвращает размер снимка игры в ее текущем состоянии в байтах."""
+    widths = widths or Widths(game)
+    figures = game.barriers.positions
+    bits = (widths.fixed_bits(game)
+            + 2 * len(figures)
+            + widths.cell * sum(map(len, figures))
+            + 2 * sum(len(snake.positions) - 1 for snake in game.snakes)
+            + widths.cell * len(game.free_cells))
+    return HEADER.size + (bits + 7) // 8 + RNG_STATE.size
+
+
+def max_snapshot_size(game):
+    """Возвращает наибольший размер снимка игры на ее поле в байтах.
+
+    Ячейки преград и свободные ячейки не пересекаются, а на каждую
+    ячейку поля приходится не больше одного сегмента змеек и одной
+    фигуры преград.
+    """
+    widths = Widths(game)
+    size = game.free_cells.width * game.free_cells.height
+    bits = widths.fixed_bits(game) + size * (widths.cell + 4)
+    return HEADER.size + (bits + 7) // 8 + RNG_STATE.size
+
+
+@lru_cache(maxsize=16)
+def board_codes(width, height):
+    """Возвращает словарь step_codes для поля width x height."""
+    return step_codes(FreeCells(width, height))
+
+
+def save_snapshot(game, buffer, offset=0):
+    """Записывает снимок игры в буфер.
+
+    Аргументы:
+    - buffer: изменяемый буфер (bytearray, memoryview) не меньше
+    snapshot_size(game) байт от смещения offset.
+
+    Скорости змеек должны быть в пределах MAX_SPEED, иначе - ValueError.
+    Возвращает размер снимка в байтах.
+    """
+    view = memoryview(buffer)
+    widths = Widths(game)
+    size = snapshot_size(game, widths)
+    if len(view) - offset < size:
+        raise ValueError(f'Для снимка нужно {size} байт.')
+    if not all(1 <= snake.speed <= MAX_SPEED for snake in game.snakes):
+        raise ValueError(f'Скорость змейки в снимке должна быть от 1 '
+                         f'до {MAX_SPEED}.')
+    free_cells = game.free_cells
+    HEADER.pack_into(
+        view, offset, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, free_cells.width,
+        free_cells.height, len(game.snakes), len(game.apples),
+        len(game.garbage_items), game.barrier_count, game.seed, game.ticks,
+        game.scheduler.tick, widths.timer)
+    writer = BitWriter(view, offset + HEADER.size)
+    write_entities(game, writer, widths)
+    codes = board_codes(free_cells.width, free_cells.height)
+    for snake in game.snakes:
+        positions = snake.positions
+        writer.write_values([codes[following - cell] for cell, following
+                             in zip(positions, islice(positions, 1, None))],
+                            2)
+    writer.write(len(free_cells), widths.count)
+    writer.write_array(free_cells.cells, widths.cell)
+    end = writer.flush()
+    _, words, gauss = game.rng.getstate()
+    RNG_STATE.pack_into(view, end, *words, gauss is not None, gauss or 0.0)
+    return end + RNG_STATE.size - offset
+
+
+def write_entities(game, writer, widths):
+    """Записывает змейки, предметы, таймеры и преграды."""
+    direction_codes = {direction: code
+                       for code, direction in enumerate(DIRECTIONS)}
+    for snake in game.snakes:
+        writer.write(snake.positions[0], widths.cell)
+        writer.write_values((len(snake.positions), snake.length),
+                            widths.count)
+        writer.write(snake.speed, SPEED_BITS)
+        writer.write(direction_codes[snake.direction], 2)
+    writer.write_values([apple.position for apple in game.apples],
+                        widths.cell)
+    for garbage in game.garbage_items:
+        writer.write(garbage.position, widths.cell)
+        writer.write(garbage.time_to_change, widths.timer)
+    writer.write(game.barriers.time_to_change, widths.timer)
+    timers = game.garbage_items + [game.barriers]
+    for owner in sorted(range(len(timers)),
+                        key=lambda owner: timers[owner].timer[:2]):
+        writer.write(owner, widths.owner)
+        writer.write(timers[owner].timer[0] - game.scheduler.tick,
+                     widths.timer)
+    figures = game.barriers.positions
+    writer.write(len(figures), widths.count)
+    writer.write_values(map(len, figures), 2)
+    for figure in figures:
+        writer.write_values(figure, widths.cell)
+
+
+def read_header(view, offset=0):
+    """Читает и проверяет заголовок снимка."""
+    if len(view) - offset < HEADER.size:
+        raise SnapshotFormatError('Снимок слишком короткий.')
+    magic, version, *header = HEADER.unpack_from(view, offset)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise SnapshotFormatError('Неизвестный формат снимка.')
+    return header
+
+
+def load_snapshot(game, buffer, offset=0):
+    """Восстанавливает игру из снимка, записанного save_snapshot.
+
+    Снимок должен быть сделан в игре с тем же размером поля и тем же
+    числом змеек, яблок и мусора. Данные сначала читаются целиком
+    и проверяются, поэтому оборванный или поврежденный снимок
+    не меняет игру, а вызывает SnapshotFormatError.
+    """
+    view = memoryview(buffer)
+    (width, height, snake_count, apple_count, garbage_count, barrier_count,
+     seed, ticks, scheduler_tick, timer_bits) = read_header(view, offset)
+    if (width, height, snake_count, apple_count, garbage_count) != (
+            game.free_cells.width, game.free_cells.height, len(game.snakes),
+            len(game.apples), len(game.garbage_items)):
+        raise SnapshotFormatError('Снимок сделан в игре с другими '
+                                  'настройками.')
+    widths = Widths(game, timer_bits)
+    reader = BitReader(view, offset + HEADER.size)
+    state = read_entities(game, reader, widths)
+    bodies = [reader.read_values(segments - 1, 2)
+              for _, segments, _, _, _ in state['snakes']]
+    free = reader.read_array(reader.read(widths.count), widths.cell)
+    end = reader.align()
+    if len(view) - end < RNG_STATE.size:
+        raise SnapshotFormatError('Снимок обрывается.')
+    *words, has_gauss, gauss = RNG_STATE.unpack_from(view, end)
+    snakes = snake_cells(game.free_cells, state['snakes'], bodies)
+    check_state(game, state, snakes, free)
+
+    clear_board(game)
+    restore_snakes(game, state['snakes'], snakes)
+    for item, cell in zip(game.apples + game.garbage_items,
+                          state['apples'] + state['garbage']):
+        item.place(cell)
+    for figure in state['figures']:
+        for cell in figure:
+            game.free_cells.occupy(cell, CELL_BARRIER)
+        game.barriers.positions.append(figure)
+    restore_free_cells(game.free_cells, free)
+    game.seed = seed
+    game.barrier_count = barrier_count
+    game.ticks = ticks
+    restore_timers(game, state, scheduler_tick)
+    game.rng.setstate((RNG_VERSION, tuple(words),
+                       gauss if has_gauss else None))
+
+
+def read_entities(game, reader, widths):
+    """Читает змейки, предметы, таймеры и преграды.
+
+    Возвращает словарь с прочитанными значениями.
+    """
+    snakes = []
+    for _ in game.snakes:
+        head = reader.read(widths.cell)
+        segments, length = reader.read_values(2, widths.count)
+        snakes.append((head, segments, length, reader.read(SPEED_BITS),
+                       reader.read(2)))
+    apples = reader.read_values(len(game.apples), widths.cell)
+    garbage, garbage_delays = [], []
+    for _ in game.garbage_items:
+        garbage.append(reader.read(widths.cell))
+        garbage_delays.append(reader.read(widths.timer))
+    barrier_delay = reader.read(widths.timer)
+    timers = [reader.read_values(1, widths.owner)
+              + reader.read_values(1, widths.timer)
+              for _ in range(len(game.garbage_items) + 1)]
+    sizes = reader.read_values(reader.read(widths.count), 2)
+    figures = [reader.read_values(size, widths.cell) for size in sizes]
+    return {'snakes': snakes, 'apples': apples, 'garbage': garbage,
+            'garbage_delays': garbage_delays, 'barrier_delay': barrier_delay,
+            'timers': timers, 'figures': figures}
+
+
+def snake_cells(free_cells, snakes, bodies):
+    """Возвращает ячейки змеек по прочитанным головам и ходам тел."""
+    size = free_cells.width * free_cells.height
+    shift = free_cells.shift
+    cells = []
+    for (head, segments, length, speed, _), body in zip(snakes, bodies):
+        # После поедания мусора змейка короче на сегмент до хода.
+        if not (head < size and length >= 1
+                and 1 <= segments <= length + 1
+                and 1 <= speed <= MAX_SPEED):
+            raise SnapshotFormatError('Змейка снимка повреждена.')
+        positions = [head]
+        for move in body:
+            positions.append(shift(positions[-1], DIRECTIONS[move]))
+        cells.append(positions)
+    return cells
+
+
+def check_state(game, state, snakes, free):
+    """Проверяет, что прочитанное состояние - целое поле без наложений.
+
+    Предметы и преграды занимают разные ячейки, не занятые змейками,
+    таймеров по одному на объект, а свободные ячейки - ровно те,
+    что остались на поле. Проверки - операции с множествами, без
+    цикла по ячейкам поля.
+    """
+    size = game.free_cells.width * game.free_cells.height
+    taken = {cell for positions in snakes for cell in positions}
+    items = state['apples'] + state['garbage'] + [
+        cell for figure in state['figures'] for cell in figure]
+    if (any(cell >= size for cell in items) or len(set(items)) != len(items)
+            or not taken.isdisjoint(items)
+            or 0 in map(len, state['figures'])):
+        raise SnapshotFormatError('Предметы или преграды снимка '
+                                  'повреждены.')
+    if sorted(owner for owner, _ in state['timers']) != list(
+            range(len(state['timers']))):
+        raise SnapshotFormatError('Таймеры снимка повреждены.')
+    taken.update(items)
+    free_set = set(free)
+    if (len(free_set) != len(free) or len(free) + len(taken) != size
+            or (free and max(free) >= size)
+            or not free_set.isdisjoint(taken)):
+        raise SnapshotFormatError('Свободные ячейки снимка не совпадают '
+                                  'с полем.')
+
+
+def clear_board(game):
+    """Убирает с поля змейки, предметы и преграды."""
+    for entity in game.snakes + game.apples + game.garbage_items:
+        entity.remove()
+    game.barriers.reset()
+
+
+def restore_snakes(game, snakes, cells):
+    """Ставит змейки на поле в ячейки из snake_cells."""
+    free_cells = game.free_cells
+    for snake, (_, _, length, speed, code), positions in zip(
+            game.snakes, snakes, cells):
+        snake.positions.extend(positions)
+        for cell in positions:
+            free_cells.occupy(cell)
+        snake.length = length
+        snake.speed = speed
+        snake.direction = DIRECTIONS[code]
+        snake.next_direction = None
+
+
+def restore_free_cells(free_cells, free):
+    """Восстанавливает порядок ячеек в индексе свободных ячеек.
+
+    От порядка зависит, какую ячейку выберет генератор случайных
+    чисел, поэтому без него игра после снимка пошла бы иначе. Набор
+    ячеек уже проверен check_state.
+    """
+    free_cells.cells[:] = free
+    index = free_cells.index
+    for position, cell in enumerate(free):
+        index[cell] = position
+
+
+def restore_timers(game, state, tick):
+    """Заводит таймеры мусора и преград в сохраненном порядке.
+
+    Таймеры, которые срабатывают на одном тике, выполняются в порядке
+    постановки, поэтому они ставятся заново в порядке срабатывания.
+
+    Аргументы:
+    - tick: тик планировщика в снимке.
+    """
+    scheduler = game.scheduler
+    scheduler.queue.clear()
+    scheduler.tick = tick
+    timers = game.garbage_items + [game.barriers]
+    for garbage, delay in zip(game.garbage_items, state['garbage_delays']):
+        garbage.time_to_change = delay
+    game.barriers.time_to_change = state['barrier_delay']
+    for owner, delay in state['timers']:
+        entity = timers[owner]
+        entity.timer = scheduler.schedule(delay, entity.randomize_position)
+
+
+def save_game(game, path):
+    """Сохраняет снимок игры в файл."""
+    buffer = bytearray(snapshot_size(game))
+    save_snapshot(game, buffer)
+    with open(path, 'wb') as file:
+        file.write(buffer)
+
+
+def load_game(path, game_class=GameState):
+    """Загружает игру из файла со снимком.
+
+    Игра создается с настройками из снимка, а затем ее состояние
+    заменяется снимком.
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+    (width, height, snake_count, apple_count, garbage_count, barrier_count,
+     seed, *_) = read_header(memoryview(data))
+    game = game_class(seed, width, height, apple_count, garbage_count,
+                      barrier_count, snake_count)
+    load_snapshot(game, data)
+    return game
+
+
+class Rollback:
+    """Снимки последних тиков игры для отката назад.
+
+    Буферы снимков выделяются один раз, а снимки пишутся в них по кругу,
+    так что снимок на каждом тике не выделяет память.
+
+    Аргументы:
+    - game: игра, снимки которой сохраняются.
+    - depth: сколько последних снимков хранится.
+    """
+
+    def __init__(self, game, depth=ROLLBACK_DEPTH):
+        self.game = game
+        size = max_snapshot_size(game)
+        self.buffers = [memoryview(bytearray(size)) for _ in range(depth)]
+        self.position = 0
+        self.saved = 0
+
+    def save(self):
+        """Сохраняет снимок текущего состояния игры."""
+        save_snapshot(self.game, self.buffers[self.position])
+        self.position = (self.position + 1) % len(self.buffers)
+        self.saved = min(self.saved + 1, len(self.buffers))
+
+    def rollback(self, steps=1):
+        """Возвращает игру к снимку, сохраненному steps снимков назад.
+
+        rollback(1) восстанавливает последний снимок. Снимки новее
+        восстановленного отбрасываются.
+        """
+        if not 1 <= steps <= self.saved:
+            raise ValueError(f'Сохранено снимков: {self.saved}.')
+        self.position = (self.position - steps) % len(self.buffers)
+        load_snapshot(self.game, self.buffers[self.position])
+        self.position = (self.position + 1) % len(self.buffers)
+        self.saved -= steps - 1
@@ -0,0 +1,79 @@
+import snake_engine as engine
+from autopilot import UNKNOWN_DISTANCE, Autopilot
+
+
+def test_autopilot_grows_snake():
+    game = engine.GameState(seed=1)
+    autopilot = Autopilot(budget=1.0)
+    events = [game.step(autopilot(game, game.snake)) for _ in range(3000)]
+    assert events.count(engine.APPLE_EATEN) > 50, (
+        'Автопилот должен вести змейку к яблокам.'
+    )
+
+
+def test_autopilot_avoids_barriers():
+    game = engine.GameState(seed=2, barrier_count=40)
+    autopilot = Autopilot(budget=1.0)
+    events = [game.step(autopilot(game, game.snake)) for _ in range(2000)]
+    assert engine.HIT_BARRIER not in events, (
+        'Автопилот не должен направлять змейку в преграды.'
+    )
+
+
+def test_autopilot_keeps_search_buffers():
+    game = engine.GameState(seed=3, width=100, height=100)
+    autopilot = Autopilot(budget=1.0)
+    autopilot(game, game.snake)
+    buffers = autopilot.distances, autopilot.queue, autopilot.flood_queue
+    for _ in range(200):
+        game.step(autopilot(game, game.snake))
+    after = autopilot.distances, autopilot.queue, autopilot.flood_queue
+    assert all(before is now for before, now in zip(buffers, after)), (
+        'Буферы поиска должны переиспользоваться между тиками.'
+    )
+
+
+def test_autopilot_moves_without_time_budget():
+    game = engine.GameState(seed=4, width=200, height=200)
+    autopilot = Autopilot(budget=0)
+    direction = autopilot(game, game.snake)
+    assert direction in (engine.UP, engine.DOWN, engine.LEFT, engine.RIGHT)
+    assert autopilot.queue_end < 200 * 200, (
+        'Поиск должен прерываться, когда истекло время на ход.'
+    )
+
+
+def test_autopilot_updates_search_when_apples_move():
+    game = engine.GameState(seed=5, width=30, height=20, apple_count=12,
+                            barrier_count=3)
+    autopilot = Autopilot(budget=1.0)
+    restarts = eaten = 0
+    for _ in range(600):
+        generation = autopilot.generation
+        direction = autopilot(game, game.snake)
+        restarts += autopilot.generation != generation
+        fresh = Autopilot(budget=1.0)
+        fresh(game, game.snake)
+        for cell in range(30 * 20):
+            assert autopilot.distance(game, cell) == fresh.distance(
+                game, cell), (
+                'Обновленное поле расстояний должно совпадать с новым '
+                'поиском.'
+            )
+        eaten += game.step(direction) == engine.APPLE_EATEN
+    assert restarts < eaten, (
+        'Съеденное яблоко не должно начинать поиск заново.'
+    )
+
+
+def test_unsearched_distance_uses_nearest_apple():
+    game = engine.GameState(seed=6, width=40, height=30, apple_count=3)
+    autopilot = Autopilot(budget=0)
+    autopilot.refresh(game)
+    apples = [apple.position for apple in game.apples]
+    cell = next(cell for cell in (
+        game.free_cells.shift(apples[1], direction)
+        for direction in engine.DIRECTIONS) if cell not in apples)
+    assert autopilot.distance(game, cell) == UNKNOWN_DISTANCE + 1, (
+        'Оценка расстояния должна идти до ближайшего яблока.'
+    )
@@ -0,0 +1,56 @@
+from random import Random
+
+import pytest
+
+import snake_engine as engine
+
+np = pytest.importorskip('numpy')
+batch_engine = pytest.importorskip('batch_engine')
+
+
+def snake_cells(batch, index):
+    head_index = batch.head_index[index]
+    return [int(batch.bodies[index, (head_index - i) % batch.capacity])
+            for i in range(batch.sizes[index])]
+
+
+def test_batch_follows_game_rules():
+    game = engine.GameState(seed=1, width=12, height=10, barrier_count=6)
+    batch = batch_engine.BatchGame(1, 12, 10, seed=1)
+    batch.load_game(0, game)
+    player = Random(1)
+    for _ in range(3000):
+        direction = player.choice(engine.DIRECTIONS)
+        event = game.step(direction)
+        codes = batch.step([engine.DIRECTIONS.index(direction)])
+        if event in (None, engine.GARBAGE_EATEN, engine.APPLE_EATEN) or (
+                event in engine.GAME_OVER_EVENTS and event != (
+                    engine.BOARD_FULL)):
+            assert batch_engine.EVENTS[codes[0]] == event, (
+                'События пакетного движка должны совпадать с GameState.'
+            )
+        if event is None:
+            assert snake_cells(batch, 0) == list(game.snake.positions), (
+                'Змейка в пакетном движке должна двигаться как в GameState.'
+            )
+        # Случайные решения у движков разные, поэтому после них
+        # состояние пакета снова берется из игры.
+        batch.load_game(0, game)
+
+
+def test_batch_grids_stay_consistent():
+    batch = batch_engine.BatchGame(200, 16, 12, barrier_count=3, seed=2)
+    rng = np.random.default_rng(2)
+    for _ in range(800):
+        actions = np.where(rng.random(200) < 0.2,
+                           rng.integers(0, 4, 200), batch_engine.NO_TURN)
+        batch.step(actions)
+    assert batch.snake_grid.shape == (200, 12, 16)
+    assert (batch.snake_grid.sum(axis=(1, 2)) == batch.sizes).all(), (
+        'Сетка змеек должна совпадать с телами змеек.'
+    )
+    assert (batch.sizes - batch.lengths <= 1).all()
+    kinds = batch.kind_grid.reshape(200, -1)
+    assert ((kinds == engine.CELL_APPLE).sum(axis=1) == 1).all()
+    assert ((kinds == engine.CELL_GARBAGE).sum(axis=1) == 1).all()
+    assert (kinds[batch.rows, batch.apples] == engine.CELL_APPLE).all()
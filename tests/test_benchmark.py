@@ -0,0 +1,29 @@
+import benchmark
+import snake_engine as engine
+
+
+def test_cycle_visits_every_cell():
+    directions = benchmark.cycle_directions()
+    cell = (0, 0)
+    visited = set()
+    for _ in range(engine.GRID_WIDTH * engine.GRID_HEIGHT):
+        visited.add(cell)
+        dx, dy = directions[cell]
+        cell = ((cell[0] + dx) % engine.GRID_WIDTH,
+                (cell[1] + dy) % engine.GRID_HEIGHT)
+    assert cell == (0, 0)
+    assert len(visited) == engine.GRID_WIDTH * engine.GRID_HEIGHT
+
+
+def test_bench_steps_keeps_snake_length():
+    results = benchmark.bench_steps(ticks=200)
+    assert set(results) == {f'step.ticks_per_s.length_{length}'
+                            for length in benchmark.SNAKE_LENGTHS}
+    directions = benchmark.cycle_directions()
+    for length in benchmark.SNAKE_LENGTHS:
+        game = benchmark.prepare_game(length, directions)
+        for _ in range(1000):
+            assert game.step(benchmark.cycle_action(game, directions)) not in (
+                engine.GAME_OVER_EVENTS)
+            assert len(game.snake.positions) == game.snake.length == length, (
+                'Длина змейки во время замера должна совпадать с подписью.')
@@ -0,0 +1,45 @@
+def test_camera_follows_head_across_board_edge(_the_snake):
+    camera = _the_snake.Camera(2000, 2000)
+    camera.follow(0)
+    assert camera.to_screen(0) is not None, (
+        'После сдвига камеры голова змейки должна быть видна на экране.'
+    )
+    assert camera.to_screen(1999 * 2000 + 1999), (
+        'Камера у края поля должна показывать ячейки с другой стороны поля.'
+    )
+    assert camera.to_screen(1000 * 2000 + 1000) is None, (
+        'Ячейки вне окна просмотра не должны попадать на экран.'
+    )
+
+
+def test_camera_is_fixed_on_standard_board(_the_snake):
+    camera = _the_snake.Camera()
+    assert not camera.follow(0)
+    assert camera.to_screen(3 * _the_snake.GRID_WIDTH + 2) == (40, 60), (
+        'На стандартном поле координаты на экране должны совпадать '
+        'с координатами на поле.'
+    )
+    assert len(camera.visible_cells()) == (
+        _the_snake.GRID_WIDTH * _the_snake.GRID_HEIGHT)
+
+
+def test_redraw_keeps_snake_colors(_the_snake):
+    game = _the_snake.SnakeGame(1, snake_count=3)
+    _the_snake.camera.set_board(game.free_cells.width,
+                                game.free_cells.height)
+    _the_snake.redraw_viewport(game)
+    for snake in game.snakes:
+        x_pos, y_pos = _the_snake.camera.to_screen(snake.positions[0])
+        center = (x_pos + _the_snake.GRID_SIZE // 2,
+                  y_pos + _the_snake.GRID_SIZE // 2)
+        assert _the_snake.screen.get_at(center)[:3] == snake.body_color, (
+            'После перерисовки поля каждая змейка должна быть своего цвета.'
+        )
+
+
+def test_objects_keep_default_colors(_the_snake):
+    assert _the_snake.Barrier().body_color == _the_snake.BARRIER_COLOR, (
+        'Препятствия по умолчанию должны быть серыми.'
+    )
+    assert _the_snake.GameObject().body_color == (
+        _the_snake.OBJECT_COLOR_WHITE)
@@ -0,0 +1,237 @@
+import subprocess
+import sys
+from pathlib import Path
+from random import Random
+
+import pytest
+
+import snake_engine as engine
+
+
+@pytest.fixture
+def game():
+    return engine.GameState()
+
+
+def occupied_cells(game):
+    cells = set(game.snake.positions)
+    cells.add(game.apple.position)
+    cells.add(game.garbage.position)
+    for figure in game.barriers.positions:
+        cells.update(figure)
+    return cells
+
+
+def test_engine_does_not_import_pygame():
+    code = 'import sys, snake_engine; print("pygame" in sys.modules)'
+    result = subprocess.run(
+        [sys.executable, '-c', code], capture_output=True, text=True,
+        cwd=Path(engine.__file__).parent)
+    assert result.stdout.strip() == 'False', (
+        'Модуль `snake_engine` не должен импортировать pygame.'
+    )
+
+
+def test_free_cells_swap_remove():
+    free_cells = engine.FreeCells()
+    total = len(free_cells)
+    cell = free_cells.cells[0]
+    free_cells.occupy(cell)
+    free_cells.occupy(cell)
+    assert len(free_cells) == total - 1
+    free_cells.release(cell)
+    assert not free_cells.is_free(cell)
+    free_cells.release(cell)
+    assert free_cells.is_free(cell) and len(free_cells) == total
+
+
+def test_full_board_is_reported():
+    free_cells = engine.FreeCells()
+    for cell in list(free_cells.cells):
+        free_cells.occupy(cell)
+    with pytest.raises(engine.BoardFullError):
+        free_cells.random_cell(Random())
+
+
+def test_snake_eats_apple(game):
+    game.free_cells.release(game.apple.position, engine.CELL_APPLE)
+    game.apple.position = game.free_cells.shift(
+        game.snake.get_head_position(), engine.RIGHT)
+    game.free_cells.occupy(game.apple.position, engine.CELL_APPLE, game.apple)
+    assert game.step(engine.RIGHT) == engine.APPLE_EATEN
+    assert game.snake.length == 2
+
+
+def test_reverse_turn_is_ignored(game):
+    game.step(engine.LEFT)
+    assert game.snake.direction == engine.RIGHT
+
+
+def test_free_cells_stay_in_sync(game):
+    directions = (engine.UP, engine.LEFT, engine.DOWN, engine.RIGHT)
+    for tick in range(3000):
+        game.step(directions[tick // 7 % 4])
+        if tick % 100 == 0:
+            game.snake.length += 5
+    occupied = occupied_cells(game)
+    assert len(game.free_cells) + len(occupied) == (
+        engine.GRID_WIDTH * engine.GRID_HEIGHT)
+    assert all(not game.free_cells.is_free(cell) for cell in occupied)
+
+
+def test_large_board_wraps_around():
+    game = engine.GameState(seed=1, width=2000, height=2000)
+    assert game.free_cells.coordinates(
+        game.snake.get_head_position()) == (1000, 1000)
+    game.scheduler.cancel(game.barriers.timer)
+    game.step(engine.UP)
+    for _ in range(2000):
+        assert game.step() not in engine.GAME_OVER_EVENTS
+    assert game.free_cells.coordinates(
+        game.snake.get_head_position()) == (1000, 999)
+
+
+def test_board_size_is_limited():
+    with pytest.raises(ValueError):
+        engine.FreeCells(engine.MAX_BOARD_SIZE + 1, 10)
+
+
+def test_cells_are_packed_integers(game):
+    head = game.snake.get_head_position()
+    assert isinstance(head, int)
+    assert game.free_cells.shift(head, engine.UP) == head - engine.GRID_WIDTH
+    assert game.free_cells.shift(0, engine.LEFT) == engine.GRID_WIDTH - 1
+    assert not hasattr(game.snake, '__dict__'), (
+        'Атрибуты змейки должны храниться в __slots__.'
+    )
+
+
+def test_occupancy_grid_tracks_object_kinds(game):
+    game.barriers.randomize_position()
+    kinds = game.free_cells.kinds
+    assert kinds[game.apple.position] == engine.CELL_APPLE
+    assert kinds[game.garbage.position] == engine.CELL_GARBAGE
+    assert all(kinds[cell] == engine.CELL_BARRIER
+               for cell in game.barriers.positions[0])
+    assert game.free_cells.snake_segments(game.snake.get_head_position()) == 1
+    game.start_over()
+    assert kinds.count(engine.CELL_BARRIER) == 0, (
+        'После начала игры заново преграды должны пропасть из сетки.'
+    )
+
+
+def test_barrier_fits_into_last_free_cell(game):
+    free_cells = game.free_cells
+    for cell in list(free_cells.cells)[1:]:
+        free_cells.occupy(cell)
+    last_cell = free_cells.cells[0]
+    assert game.barriers.randomize_position(), (
+        'Если есть свободная ячейка, преграда должна появиться.'
+    )
+    assert game.barriers.positions[-1] == [last_cell]
+    assert not game.barriers.randomize_position(), (
+        'На заполненном поле преграда не должна появляться.'
+    )
+
+
+def test_legal_anchors_fit_whole_figure(game):
+    figure = engine.BARRIER_FIGURES[-1]
+    anchors = game.barriers.legal_anchors(figure)
+    assert anchors
+    assert all(game.free_cells.is_free(cell) for anchor in anchors
+               for cell in game.barriers.figure_cells(anchor, figure))
+
+
+def test_scheduler_runs_only_due_events():
+    scheduler = engine.Scheduler()
+    fired = []
+    scheduler.schedule(3, lambda: fired.append('first'))
+    cancelled = scheduler.schedule(3, lambda: fired.append('cancelled'))
+    scheduler.schedule(5, lambda: fired.append('second'))
+    scheduler.cancel(cancelled)
+    scheduler.advance(2)
+    assert fired == []
+    scheduler.advance(3)
+    assert fired == ['first']
+    scheduler.advance(10)
+    assert fired == ['first', 'second']
+
+
+def test_garbage_moves_on_its_tick(game):
+    garbage = game.garbage
+    position = garbage.position
+    due_tick = garbage.timer[0]
+    game.scheduler.advance(due_tick - 1)
+    assert garbage.position == position
+    game.scheduler.advance(due_tick)
+    assert garbage.timer[0] > due_tick, (
+        'Мусор должен менять положение на тике, заданном таймером.'
+    )
+
+
+def test_feast_mode_keeps_item_counts():
+    game = engine.GameState(seed=5, width=60, height=60, apple_count=300,
+                            garbage_count=300, barrier_count=50)
+    events = [game.step(game.rng.choice((engine.UP, engine.LEFT)))
+              for _ in range(2000)]
+    assert engine.APPLE_EATEN in events
+    kinds = game.free_cells.kinds
+    assert kinds.count(engine.CELL_APPLE) == 300
+    assert kinds.count(engine.CELL_GARBAGE) == 300
+    assert all(game.free_cells.owners[item.position] is item
+               for item in game.apples + game.garbage_items), (
+        'По ячейке предмета должен находиться сам предмет.'
+    )
+
+
+def test_arena_snakes_share_occupancy_grid():
+    game = engine.GameState(seed=6, width=60, height=60, snake_count=50)
+    events = [game.step(game.bot(game, game.snake)) for _ in range(500)]
+    assert len(game.snakes) == 50
+    segments = sum(len(snake.positions) for snake in game.snakes)
+    counts = game.free_cells.counts
+    assert sum(counts) - game.free_cells.kinds.count(engine.CELL_APPLE) - (
+        game.free_cells.kinds.count(engine.CELL_GARBAGE)) - sum(
+        len(figure) for figure in game.barriers.positions) == segments, (
+        'Все сегменты змеек арены должны быть отмечены в сетке занятости.'
+    )
+    assert engine.HIT_ITSELF not in events
+
+
+def test_head_to_head_kills_both_snakes():
+    game = engine.GameState(seed=7, width=20, height=20, snake_count=2)
+    player, bot = game.snakes
+    game.bot = lambda game, snake: None
+    for snake, cell, direction in ((player, 0, engine.RIGHT),
+                                   (bot, 2, engine.LEFT)):
+        snake.remove()
+        snake.position = cell
+        snake.reset(direction)
+    assert game.step() == engine.HIT_SNAKE, (
+        'При встрече голов змейка игрока должна разбиться.'
+    )
+    assert len(bot.positions) == 1 and bot.get_head_position() != 1, (
+        'При встрече голов должна разбиться и вторая змейка.'
+    )
+    assert game.free_cells.snake_segments(1) == 0
+
+
+def test_crowded_arena_starts_over_when_respawn_has_no_room():
+    player = Random(6)
+    directions = (None, engine.UP, engine.DOWN, engine.LEFT, engine.RIGHT)
+    game = engine.GameState(seed=6, width=6, height=2, snake_count=4,
+                            apple_count=2, garbage_count=1)
+    events = [game.step(player.choice(directions)) for _ in range(3000)]
+    assert engine.BOARD_FULL in events, (
+        'Если разбившейся змейке негде появиться, игра начинается заново.'
+    )
+    assert len(game.free_cells) == game.free_cells.counts.count(0)
+
+
+def test_speed_is_capped():
+    snake = engine.GameState().snake
+    snake.speed = engine.MAX_SPEED
+    snake.change_speed(2)
+    assert snake.speed == engine.MAX_SPEED, (
+        'Скорость змейки не должна превышать MAX_SPEED.'
+    )
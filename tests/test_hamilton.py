@@ -0,0 +1,106 @@
+import pytest
+
+import hamilton
+import snake_engine as engine
+from hamilton import HamiltonSolver, build_cycle, load_cycle
+
+
+def assert_cycle(free_cells, cycle):
+    assert len(set(cycle)) == len(cycle), (
+        'Цикл должен проходить через каждую ячейку один раз.'
+    )
+    for index, cell in enumerate(cycle):
+        following = cycle[(index + 1) % len(cycle)]
+        assert any(free_cells.shift(cell, direction) == following
+                   for direction in engine.DIRECTIONS), (
+            'Соседние ячейки цикла должны граничить друг с другом.'
+        )
+
+
+@pytest.mark.parametrize('width, height', [(32, 24), (2, 2), (6, 4)])
+def test_cycle_covers_even_board(width, height):
+    game = engine.GameState(seed=1, width=width, height=height)
+    cycle = build_cycle(game.free_cells)
+    assert len(cycle) == width * height
+    assert_cycle(game.free_cells, cycle)
+
+
+def test_cycle_avoids_barriers():
+    game = engine.GameState(seed=2, barrier_count=10)
+    cycle = build_cycle(game.free_cells)
+    assert_cycle(game.free_cells, cycle)
+    assert not any(game.barriers.is_hit(cell) for cell in cycle), (
+        'Цикл не должен проходить через преграды.'
+    )
+
+
+def test_cycle_is_cached_on_disk(tmp_path, monkeypatch):
+    game = engine.GameState(seed=3)
+    cycle = load_cycle(game.free_cells, tmp_path)
+    files = list(tmp_path.iterdir())
+    assert len(files) == 1
+    assert files[0].stat().st_size < len(cycle) // 4 + 32, (
+        'Цикл должен храниться по 2 бита на ход.'
+    )
+
+    def build_again(free_cells):
+        raise AssertionError('Цикл должен загружаться из кэша.')
+
+    monkeypatch.setattr(hamilton, 'build_cycle', build_again)
+    assert load_cycle(game.free_cells, tmp_path) == cycle
+
+
+def test_solver_nearly_fills_board(tmp_path):
+    game = engine.GameState(seed=4, width=8, height=8)
+    game.scheduler.cancel(game.barriers.timer)
+    solver = HamiltonSolver(cache_dir=tmp_path)
+    longest = 0
+    for _ in range(20000):
+        assert game.step(solver(game, game.snake)) not in (
+            engine.GAME_OVER_EVENTS), (
+            'Змейка, идущая по циклу, не должна разбиваться.'
+        )
+        longest = max(longest, game.snake.length)
+    assert longest > 55
+
+
+def test_cache_keeps_one_cycle_per_board(tmp_path):
+    for width in range(4, 4 + 2 * (hamilton.CYCLE_CACHE_LIMIT + 3), 2):
+        game = engine.GameState(seed=5, width=width, height=4,
+                                barrier_count=3)
+        load_cycle(game.free_cells, tmp_path)
+        load_cycle(game.free_cells, tmp_path)
+    assert len(list(tmp_path.iterdir())) == hamilton.CYCLE_CACHE_LIMIT, (
+        'Кэш должен хранить не больше CYCLE_CACHE_LIMIT циклов.'
+    )
+    assert (tmp_path / f'{width}x4.cycle').exists(), (
+        'Из кэша должны вытесняться циклы, которые дольше всех не нужны.'
+    )
+
+
+def test_solver_goes_around_barriers(tmp_path):
+    game = engine.GameState(seed=6, width=16, height=16, barrier_count=4)
+    solver = HamiltonSolver(cache_dir=tmp_path)
+    longest = 0
+    for _ in range(10000):
+        game.step(solver(game, game.snake))
+        longest = max(longest, game.snake.length)
+    assert longest > 100
+    assert len(list(tmp_path.iterdir())) == 1, (
+        'Циклы под преграды не должны сохраняться на диск.'
+    )
+
+
+def test_cycle_is_rebuilt_across_moves(tmp_path):
+    game = engine.GameState(seed=7, width=64, height=64)
+    solver = HamiltonSolver(cache_dir=tmp_path, budget=0)
+    solver.prepare(game)
+    cycle = solver.cycle
+    game.barriers.randomize_position()
+    solver(game, game.snake)
+    assert solver.cycle is cycle, (
+        'Цикл под новую преграду должен строиться на нескольких ходах.'
+    )
+    solver.prepare(game)
+    assert len(solver.cycle) < len(cycle)
+    assert not any(game.barriers.is_hit(cell) for cell in solver.cycle)
@@ -0,0 +1,27 @@
+import pygame
+
+
+def test_quick_turns_are_queued(_the_snake, snake):
+    snake.direction = _the_snake.RIGHT
+    _the_snake.queue_turn(snake, pygame.K_UP)
+    _the_snake.queue_turn(snake, pygame.K_LEFT)
+    assert list(snake.turns) == [_the_snake.UP, _the_snake.LEFT], (
+        'Повороты, нажатые в течение одного тика, должны сохраняться '
+        'в очереди по порядку.'
+    )
+
+
+def test_reverse_turn_is_not_queued(_the_snake, snake):
+    snake.direction = _the_snake.RIGHT
+    _the_snake.queue_turn(snake, pygame.K_LEFT)
+    assert not snake.turns, (
+        'Разворот в противоположную сторону не должен попадать в очередь.'
+    )
+
+
+def test_input_queue_is_bounded(_the_snake, snake):
+    snake.direction = _the_snake.RIGHT
+    for _ in range(10):
+        _the_snake.queue_turn(snake, pygame.K_UP)
+        _the_snake.queue_turn(snake, pygame.K_RIGHT)
+    assert len(snake.turns) == _the_snake.INPUT_QUEUE_SIZE
@@ -0,0 +1,187 @@
+import asyncio
+
+import pytest
+
+import netplay
+import snake_engine as engine
+
+
+def assert_same_state(copy, game):
+    assert copy.ticks == game.ticks
+    assert copy.free_cells.counts == game.free_cells.counts, (
+        'Сетка занятости копии должна совпадать с сервером.')
+    assert copy.free_cells.kinds == game.free_cells.kinds
+    assert [list(snake.positions) for snake in copy.snakes] == [
+        list(snake.positions) for snake in game.snakes], (
+        'Змейки копии должны совпадать со змейками сервера.')
+    assert [snake.length for snake in copy.snakes] == [
+        snake.length for snake in game.snakes]
+    assert [item.position for item in copy.apples + copy.garbage_items] == [
+        item.position for item in game.items]
+    assert copy.barriers.positions == game.barriers.positions
+
+
+def test_ticks_and_keyframes_rebuild_server_state():
+    for options in ({'width': 12, 'height': 10, 'snake_count': 8,
+                     'apple_count': 3, 'garbage_count': 2,
+                     'barrier_count': 3},
+                    {'width': 8, 'height': 6, 'barrier_count': 2}):
+        game = netplay.ServerGame(5, **options)
+        copy = engine.GameState(0, **dict(options, barrier_count=0))
+        netplay.apply_keyframe(copy, game.encode_keyframe())
+        assert_same_state(copy, game)
+        tick_sizes = []
+        for _ in range(1500):
+            game.step()
+            if game.restarted:
+                netplay.apply_keyframe(copy, game.encode_keyframe())
+                game.sync()
+            else:
+                data = game.encode_tick()
+                tick_sizes.append(len(data))
+                netplay.apply_tick(copy, data)
+            assert_same_state(copy, game)
+        # Номер тика, по полбайта на змейку и счетчики предметов
+        # и преград - если ничего не переставлено.
+        assert min(tick_sizes) == (netplay.TICK.size
+                                   + (len(game.snakes) + 1) // 2
+                                   + 2 * netplay.COUNT.size), (
+            'Тик без событий должен занимать несколько байт.')
+
+
+def test_body_chain_packs_two_bits_per_segment():
+    game = netplay.ServerGame(1, width=5, height=4)
+    free_cells = game.free_cells
+    snake = game.snake
+    snake.remove()
+    # Тело переходит через оба края поля.
+    cells = [0, 4, 19, 18, 13, 14, 10]
+    snake.positions.extend(cells)
+    chain = netplay.pack_body(snake.positions, game.codes)
+    assert len(chain) == 2, 'Шесть ходов тела должны уместиться в 2 байта.'
+    body, offset = netplay.unpack_body(free_cells, cells[0], 7, chain, 0)
+    assert body == cells
+    assert offset == 2
+
+
+async def wait_for(condition):
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError('Сервер не ответил вовремя.')
+
+
+async def play_over_localhost():
+    server = netplay.GameServer(seed=3, width=16, height=12, snake_count=2,
+                                keyframe_interval=10)
+    listener = await server.start('127.0.0.1', 0)
+    port = listener.sockets[0].getsockname()[1]
+    game = server.game
+    players = [await netplay.GameClient.connect('127.0.0.1', port)
+               for _ in range(3)]
+    spectator = await netplay.GameClient.connect('127.0.0.1', port,
+                                                 play=False)
+    assert [client.snake_index for client in players] == [0, 1, None], (
+        'Игроки получают свободные змейки, остальные смотрят игру.')
+    assert spectator.snake_index is None
+    clients = players + [spectator]
+    for client in clients:
+        assert_same_state(client.game, game)
+
+    direction = (engine.DOWN if game.snakes[1].direction in (
+        engine.LEFT, engine.RIGHT) else engine.LEFT)
+    players[1].send_turn(direction)
+    await wait_for(lambda: game.players[1])
+    for tick in range(25):
+        server.tick()
+        for client in clients:
+            await client.receive()
+            assert_same_state(client.game, game)
+        if tick == 0:
+            assert game.snakes[1].direction == direction, (
+                'Змейка игрока должна повернуть по его команде.')
+
+    # Зритель не успевает принимать тики: ему ничего не отправляется,
+    # а когда буфер освобождается, приходит полное состояние.
+    lagging = server.connections[-1]
+    lagging.buffer_size = lambda: netplay.MAX_CLIENT_BUFFER + 1
+    for _ in range(3):
+        server.tick()
+    assert lagging.stale
+    del lagging.buffer_size
+    server.tick()
+    assert await spectator.receive() == netplay.MSG_KEYFRAME, (
+        'Отставший клиент должен получить полное состояние.')
+    assert_same_state(spectator.game, game)
+    for client in players:
+        for _ in range(4):
+            await client.receive()
+
+    await players[1].close()
+    await wait_for(lambda: 1 not in game.players)
+    assert len(server.connections) == len(clients) - 1
+    for client in clients:
+        if client is not players[1]:
+            await client.close()
+    listener.close()
+    await listener.wait_closed()
+
+
+def test_players_and_spectators_over_localhost():
+    asyncio.run(play_over_localhost())
+
+
+async def receive_bad_message(message):
+    game = netplay.ServerGame(1, width=8, height=6)
+
+    async def serve(reader, writer):
+        await netplay.read_message(reader, netplay.CLIENT_PAYLOAD_LIMITS)
+        writer.write(netplay.frame(netplay.MSG_WELCOME, netplay.WELCOME.pack(
+            8, 6, 1, 1, 1, netplay.NO_SNAKE, engine.SPEED)))
+        writer.write(netplay.frame(netplay.MSG_KEYFRAME,
+                                   game.encode_keyframe()))
+        writer.write(message)
+        await writer.drain()
+
+    listener = await asyncio.start_server(serve, '127.0.0.1', 0)
+    port = listener.sockets[0].getsockname()[1]
+    client = await netplay.GameClient.connect('127.0.0.1', port, play=False)
+    error = await asyncio.wait_for(client.receive_forever(), 2)
+    assert isinstance(error, netplay.ProtocolError), (
+        'Ошибка протокола должна возвращаться вызывающему.')
+    assert client.writer.is_closing(), (
+        'После ошибки протокола соединение должно закрываться.')
+    await client.close()
+    listener.close()
+    await listener.wait_closed()
+
+
+@pytest.mark.parametrize('message', [
+    netplay.frame(99),
+    # Тик обрывается сразу после номера тика.
+    netplay.frame(netplay.MSG_TICK, netplay.TICK.pack(1)),
+    netplay.FRAME.pack(1 << 31, netplay.MSG_TICK),
+])
+def test_protocol_error_closes_client(message):
+    asyncio.run(receive_bad_message(message))
+
+
+async def send_huge_frame():
+    server = netplay.GameServer(seed=1, width=8, height=6)
+    listener = await server.start('127.0.0.1', 0)
+    port = listener.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(netplay.frame(netplay.MSG_JOIN, b'\x01'))
+    writer.write(netplay.FRAME.pack(1 << 31, netplay.MSG_TURN))
+    await asyncio.wait_for(reader.read(), 2)
+    assert reader.at_eof(), (
+        'Сервер должен отключать клиента со слишком длинным сообщением.')
+    await wait_for(lambda: not server.connections)
+    writer.close()
+    listener.close()
+    await listener.wait_closed()
+
+
+def test_server_rejects_oversized_frame():
+    asyncio.run(send_huge_frame())
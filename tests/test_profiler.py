@@ -0,0 +1,38 @@
+import json
+
+import snake_engine as engine
+from profiler import FrameProfiler
+
+
+def run_frames(profiler, frames):
+    game = engine.GameState(seed=1)
+    game.profiler = profiler
+    for _ in range(frames):
+        profiler.start_frame()
+        game.step()
+        profiler.lap('render')
+        profiler.end_frame()
+
+
+def test_phases_are_collected():
+    profiler = FrameProfiler(frames=50)
+    run_frames(profiler, 120)
+    assert {'move', 'items', 'collisions', 'render'} <= set(
+        profiler.buffers), (
+        'Профилировщик должен собирать время каждой фазы тика.'
+    )
+    p50, p99 = profiler.percentiles('move')
+    assert 0 <= p50 <= p99
+    stats = profiler.overlay_stats()
+    assert 'Frame p50/p99' in stats and 'Worst p99' in stats
+
+
+def test_trace_dump(tmp_path):
+    profiler = FrameProfiler(trace=True)
+    run_frames(profiler, 10)
+    path = tmp_path / 'trace.json'
+    profiler.dump_trace(path)
+    events = json.loads(path.read_text())['traceEvents']
+    assert len(events) == 40
+    assert all(event['ph'] == 'X' and event['dur'] >= 0
+               for event in events)
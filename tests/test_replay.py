@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+import snake_engine as engine
+from replay import Replay, ReplayFormatError, simulate
+
+
+def play_recorded_game(seed, ticks=5000, **game_options):
+    game = engine.GameState(seed, **game_options)
+    game.recorder = Replay(game.seed, **game_options)
+    player = random.Random(seed)
+    directions = (engine.UP, engine.DOWN, engine.LEFT, engine.RIGHT)
+    for tick in range(ticks):
+        if tick % 300 == 0:
+            game.snake.change_speed(player.choice((1, 2)))
+        game.step(player.choice(directions) if tick % 4 == 0 else None)
+    return game
+
+
+def game_summary(game):
+    return (list(game.snake.positions), game.snake.length,
+            game.snake.speed, game.apple.position, game.garbage.position,
+            game.barriers.positions, game.ticks)
+
+
+def test_same_seed_same_game():
+    assert game_summary(play_recorded_game(7)) == game_summary(
+        play_recorded_game(7)), (
+        'Игры с одинаковым зерном и действиями должны совпадать.'
+    )
+
+
+def test_replay_reproduces_game():
+    game = play_recorded_game(42)
+    data = game.recorder.to_bytes()
+    replayed = simulate(Replay.from_bytes(data))
+    assert game_summary(replayed) == game_summary(game), (
+        'Проигрывание повтора должно давать то же состояние игры.'
+    )
+    assert len(data) < 8 * len(game.recorder.turns) + 64
+
+
+def test_replay_file_roundtrip(tmp_path):
+    replay = play_recorded_game(3, ticks=100).recorder
+    path = tmp_path / 'game.snr'
+    replay.save(path)
+    loaded = Replay.load(path)
+    assert (loaded.seed, loaded.ticks, loaded.turns, loaded.speeds) == (
+        replay.seed, replay.ticks, replay.turns, replay.speeds)
+
+
+def test_corrupted_replay_is_rejected():
+    data = play_recorded_game(3, ticks=100).recorder.to_bytes()
+    with pytest.raises(ReplayFormatError):
+        Replay.from_bytes(data[:-1])
+    with pytest.raises(ReplayFormatError):
+        Replay.from_bytes(b'XXXX' + data[4:])
+
+
+def test_replay_keeps_game_options():
+    options = {'width': 50, 'height': 40, 'apple_count': 20,
+               'garbage_count': 10, 'barrier_count': 5, 'snake_count': 8}
+    game = play_recorded_game(3, 2000, **options)
+    replayed = simulate(Replay.from_bytes(game.recorder.to_bytes()))
+    assert [item.position for item in replayed.apples] == [
+        item.position for item in game.apples], (
+        'Повтор должен восстанавливать размер поля и число предметов.'
+    )
+    assert game_summary(replayed) == game_summary(game)
+    assert [list(snake.positions) for snake in replayed.snakes] == [
+        list(snake.positions) for snake in game.snakes], (
+        'Повтор должен восстанавливать змеек арены.'
+    )
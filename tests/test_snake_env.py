@@ -0,0 +1,94 @@
+import pytest
+
+import snake_engine as engine
+
+np = pytest.importorskip('numpy')
+snake_env = pytest.importorskip('snake_env')
+
+
+def test_observation_is_updated_in_place():
+    env = snake_env.SnakeEnv(seed=1)
+    observation = env.reset()
+    assert observation.shape == (snake_env.CHANNELS, engine.GRID_HEIGHT,
+                                 engine.GRID_WIDTH)
+    for action in [0, 2, 1, 3] * 25:
+        result, reward, done, info = env.step(action)
+        assert result is observation, (
+            'Наблюдение должно обновляться в заранее выделенном массиве.'
+        )
+        if done:
+            observation = env.reset()
+            continue
+        game = env.game
+        assert observation[snake_env.CHANNEL_SNAKE].sum() == len(
+            game.snake.positions)
+        apple_x, apple_y = game.free_cells.coordinates(game.apple.position)
+        assert observation[snake_env.CHANNEL_APPLE, apple_y, apple_x] == 1
+
+
+def place_ahead(env, item):
+    game = env.game
+    head = game.snake.get_head_position()
+    item.place(game.free_cells.shift(head, game.snake.direction))
+    return snake_env.ACTIONS.index(game.snake.direction)
+
+
+def test_step_rewards_apple():
+    env = snake_env.SnakeEnv(seed=2)
+    env.reset()
+    action = place_ahead(env, env.game.apple)
+    _, reward, done, info = env.step(action)
+    assert (reward, done, info['event']) == (
+        snake_env.APPLE_REWARD, False, engine.APPLE_EATEN), (
+        'За яблоко среда должна давать награду.'
+    )
+
+
+def test_step_ends_game_on_starving():
+    env = snake_env.SnakeEnv(seed=2)
+    env.reset()
+    action = place_ahead(env, env.game.garbage)
+    _, reward, done, info = env.step(action)
+    assert (reward, done, info['event']) == (
+        snake_env.GAME_OVER_REWARD, True, engine.STARVED), (
+        'Конец игры должен завершать эпизод со штрафом.'
+    )
+
+
+def test_terminal_observation_shows_last_state():
+    env = snake_env.SnakeEnv(seed=2)
+    env.reset()
+    action = place_ahead(env, env.game.garbage)
+    head = env.game.free_cells.shift(env.game.snake.get_head_position(),
+                                     env.game.snake.direction)
+    observation, _, done, _ = env.step(action)
+    x_pos, y_pos = env.game.free_cells.coordinates(head)
+    assert done
+    assert observation[snake_env.CHANNEL_SNAKE].sum() == 1
+    assert observation[snake_env.CHANNEL_SNAKE, y_pos, x_pos] == 1, (
+        'Наблюдение в конце игры должно показывать ее последнее '
+        'состояние, а не начало новой игры.'
+    )
+    assert observation[snake_env.CHANNEL_GARBAGE, y_pos, x_pos] == 1
+
+
+def test_max_steps_truncates_game():
+    env = snake_env.SnakeEnv(seed=3, max_steps=5)
+    env.reset()
+    results = [env.step(0) for _ in range(5)]
+    assert results[-1][2] and results[-1][3]['truncated']
+
+
+def test_vector_env_steps_all_games():
+    env = snake_env.VectorSnakeEnv(64, seed=4, width=12, height=10)
+    observation = env.reset()
+    assert observation.shape == (64, snake_env.CHANNELS, 10, 12)
+    rng = np.random.default_rng(4)
+    for _ in range(300):
+        result, rewards, dones, events = env.step(rng.integers(0, 4, 64))
+        assert result is observation
+    assert (observation[:, snake_env.CHANNEL_APPLE].sum(axis=(1, 2))
+            == 1).all()
+    assert (observation[:, snake_env.CHANNEL_SNAKE].sum(axis=(1, 2))
+            == env.batch.sizes).all()
+    assert rewards.dtype == np.float32 and dones.dtype == bool
@@ -0,0 +1,202 @@
+import random
+from array import array
+
+import pytest
+
+import snake_engine as engine
+import snapshot
+from conftest import StopInfiniteLoop
+
+DIRECTIONS = (None, None, None, engine.UP, engine.DOWN, engine.LEFT,
+              engine.RIGHT)
+
+
+def game_state(game):
+    free_cells = game.free_cells
+    return (game.ticks, [list(snake.positions) for snake in game.snakes],
+            [(snake.length, snake.speed, snake.direction)
+             for snake in game.snakes],
+            [item.position for item in game.apples + game.garbage_items],
+            [item.time_to_change for item in game.garbage_items],
+            game.barriers.positions, list(free_cells.cells),
+            bytes(free_cells.counts), bytes(free_cells.kinds),
+            game.rng.getstate())
+
+
+def play(game, actions):
+    return [(game.step(action), game_state(game)) for action in actions]
+
+
+def test_restored_game_continues_identically():
+    player = random.Random(1)
+    actions = [player.choice(DIRECTIONS) for _ in range(1500)]
+    for options in ({'width': 12, 'height': 10, 'snake_count': 6,
+                     'barrier_count': 3},
+                    {'width': 6, 'height': 5, 'barrier_count': 2}):
+        game = engine.GameState(5, **options)
+        play(game, actions[:700])
+        buffer = bytearray(snapshot.max_snapshot_size(game))
+        size = snapshot.save_snapshot(game, buffer)
+        assert size == snapshot.snapshot_size(game)
+        copy = engine.GameState(99, **options)
+        snapshot.load_snapshot(copy, buffer)
+        assert game_state(copy) == game_state(game), (
+            'Снимок должен восстанавливать состояние игры.')
+        assert play(copy, actions[700:]) == play(game, actions[700:]), (
+            'Игра после снимка должна продолжаться так же, как без него.')
+
+
+def test_rollback_returns_to_saved_ticks():
+    game = engine.GameState(3, width=12, height=10, barrier_count=2)
+    rollback = snapshot.Rollback(game, depth=4)
+    states = []
+    for _ in range(6):
+        rollback.save()
+        states.append(game_state(game))
+        game.step(None)
+    rollback.rollback(3)
+    assert game_state(game) == states[-3], (
+        'Откат должен вернуть игру к снимку трехтиковой давности.')
+    rollback.rollback()
+    assert game_state(game) == states[-3], (
+        'Снимки новее восстановленного должны отбрасываться.')
+    with pytest.raises(ValueError):
+        rollback.rollback(3)
+    rollback.rollback(2)
+    assert game_state(game) == states[-4], (
+        'Хранятся только depth последних снимков.')
+
+
+def test_damaged_snapshot_is_rejected():
+    game = engine.GameState(3, width=12, height=10, barrier_count=2)
+    for _ in range(300):
+        game.step(None)
+    data = bytearray(snapshot.snapshot_size(game))
+    snapshot.save_snapshot(game, data)
+    copy = engine.GameState(4, width=12, height=10)
+    state = game_state(copy)
+    with pytest.raises(snapshot.SnapshotFormatError):
+        snapshot.load_snapshot(copy, data[:-1])
+    assert game_state(copy) == state, (
+        'Оборванный снимок не должен менять игру.')
+    with pytest.raises(snapshot.SnapshotFormatError):
+        snapshot.load_snapshot(copy, b'XXXX' + data[4:])
+    with pytest.raises(snapshot.SnapshotFormatError):
+        snapshot.load_snapshot(engine.GameState(4, width=10, height=12),
+                               data)
+    with pytest.raises(ValueError):
+        snapshot.save_snapshot(game, data[:-1])
+    game.snake.speed = engine.MAX_SPEED + 1
+    with pytest.raises(ValueError):
+        snapshot.save_snapshot(game, data)
+
+
+def test_corrupted_snapshot_is_rejected_before_restoring():
+    game = engine.GameState(3, width=12, height=10, barrier_count=3,
+                            snake_count=3)
+    for _ in range(400):
+        game.step(None)
+    data = bytearray(snapshot.snapshot_size(game))
+    snapshot.save_snapshot(game, data)
+    bits = 8 * (len(data) - snapshot.RNG_STATE.size - snapshot.HEADER.size)
+    rejected = 0
+    for bit in range(0, bits, 3):
+        damaged = bytearray(data)
+        damaged[snapshot.HEADER.size + bit // 8] ^= 1 << bit % 8
+        copy = engine.GameState(4, width=12, height=10, snake_count=3)
+        state = game_state(copy)
+        try:
+            snapshot.load_snapshot(copy, damaged)
+        except snapshot.SnapshotFormatError:
+            rejected += 1
+            assert game_state(copy) == state, (
+                'Поврежденный снимок не должен менять игру.')
+            continue
+        free_cells = copy.free_cells
+        assert len(free_cells) == free_cells.counts.count(0), (
+            'Принятый снимок должен давать согласованное поле.')
+        for _ in range(50):
+            copy.step(None)
+    assert rejected, 'Поврежденные ячейки и тела должны отвергаться.'
+
+
+def test_cells_and_body_use_minimal_bits():
+    cells = array('i', random.Random(2).sample(range(1000), 137))
+    for number in (0, 1, 2, 3, 137):
+        packed = snapshot.pack_lanes(cells[:number], 10)
+        assert packed.bit_length() <= 10 * number
+        assert snapshot.unpack_lanes(packed, number, 10) == cells[:number]
+    game = engine.GameState(2, width=5, height=4)
+    assert snapshot.Widths(game).cell == 5, (
+        'Ячейка поля 5x4 должна занимать 5 бит.')
+    snake = game.snake
+    snake.remove()
+    snake.length = 7
+    # Тело переходит через оба края поля.
+    body = [0, 4, 19, 18, 13, 14, 10]
+    for cell in body:
+        assert game.free_cells.is_free(cell)
+        snake.positions.append(cell)
+        game.free_cells.occupy(cell)
+    before = snapshot.snapshot_size(game)
+    snake.positions.pop()
+    game.free_cells.release(10)
+    # Сегмент тела занимает 2 бита, а свободная ячейка - 5 бит.
+    assert 8 * (snapshot.snapshot_size(game) - before) in range(0, 9), (
+        'Сегмент тела должен занимать в снимке меньше свободной ячейки.')
+    snake.positions.append(10)
+    game.free_cells.occupy(10)
+    buffer = bytearray(before)
+    snapshot.save_snapshot(game, buffer)
+    copy = engine.GameState(3, width=5, height=4)
+    snapshot.load_snapshot(copy, buffer)
+    assert list(copy.snake.positions) == body
+
+
+def test_save_file_resumes_game(_the_snake, tmp_path):
+    path = tmp_path / 'game.sns'
+    game = engine.GameState(3, width=12, height=10, barrier_count=2)
+    for _ in range(300):
+        game.step(None)
+    snapshot.save_game(game, path)
+    loaded = snapshot.load_game(path, _the_snake.SnakeGame)
+    assert game_state(loaded) == game_state(game)
+    assert (loaded.free_cells.width, loaded.barrier_count) == (12, 2), (
+        'Игра из файла должна создаваться с настройками снимка.')
+
+
+@pytest.mark.timeout(1, method='thread')
+@pytest.mark.usefixtures('modified_clock')
+def test_main_saves_game_on_exit(_the_snake, tmp_path):
+    path = tmp_path / 'game.sns'
+    for _ in range(2):
+        with pytest.raises(StopInfiniteLoop):
+            _the_snake.main(save_path=path, width=12, height=10)
+        assert path.exists(), 'При выходе игра должна сохраняться.'
+    data = path.read_bytes()
+    assert snapshot.load_game(path).free_cells.width == 12
+    assert len(data) == snapshot.snapshot_size(snapshot.load_game(path))
+
+
+@pytest.mark.timeout(1, method='thread')
+@pytest.mark.usefixtures('modified_clock')
+def test_main_starts_new_game_from_damaged_save(_the_snake, tmp_path):
+    path = tmp_path / 'game.sns'
+    path.write_bytes(b'SNKS' + bytes(100))
+    with pytest.raises(StopInfiniteLoop):
+        _the_snake.main(save_path=path, width=12, height=10)
+    assert snapshot.load_game(path).free_cells.width == 12, (
+        'Вместо поврежденного снимка должна начаться новая игра.')
+
+
+@pytest.mark.timeout(10, method='thread')
+def test_large_board_snapshot_is_fast():
+    game = engine.GameState(1, width=400, height=400, barrier_count=5)
+    for _ in range(10):
+        game.step(None)
+    data = bytearray(snapshot.snapshot_size(game))
+    snapshot.save_snapshot(game, data)
+    copy = engine.GameState(2, width=400, height=400, barrier_count=5)
+    snapshot.load_snapshot(copy, data)
+    assert game_state(copy) == game_state(game), (
+        'Снимок большого поля должен сохраняться и загружаться целиком.')
@@ -0,0 +1,57 @@
+import subprocess
+import sys
+
+from conftest import BASE_DIR
+
+# Верхняя граница времени импорта, в секундах. Основная часть этого
+# времени - импорт самого pygame.
+MAX_IMPORT_TIME = 1.0
+
+IMPORT_CHECK = '''
+import time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+import sys
+pygame = sys.modules.get('pygame')
+display_open = bool(pygame and pygame.display.get_init())
+print(elapsed, display_open)
+'''
+
+
+def measure_import(module):
+    result = subprocess.run(
+        [sys.executable, '-c', IMPORT_CHECK.format(module=module)],
+        capture_output=True, text=True, cwd=BASE_DIR, check=True)
+    elapsed, display_open = result.stdout.split()[-2:]
+    return float(elapsed), display_open == 'True'
+
+
+def test_import_does_not_open_display():
+    elapsed, display_open = measure_import('the_snake')
+    assert not display_open, (
+        'Импорт модуля `the_snake` не должен инициализировать pygame '
+        'и открывать окно.'
+    )
+    assert elapsed < MAX_IMPORT_TIME, (
+        f'Импорт модуля `the_snake` занял {elapsed:.3f} с.'
+    )
+
+
+def test_engine_import_is_fast():
+    elapsed, _ = measure_import('snake_engine')
+    assert elapsed < 0.1, (
+        f'Импорт модуля `snake_engine` занял {elapsed:.3f} с.'
+    )
+
+
+def test_offline_start_skips_network_and_snapshot_modules():
+    code = ('import sys, the_snake; print(sorted({"asyncio", "netplay", '
+            '"snapshot"} & set(sys.modules)))')
+    result = subprocess.run(
+        [sys.executable, '-c', code], capture_output=True, text=True,
+        cwd=BASE_DIR, check=True)
+    assert result.stdout.split('\n')[-2] == '[]', (
+        'Сетевая игра и снимки должны импортироваться только по флагам '
+        '`--connect` и `--save`.'
+    )
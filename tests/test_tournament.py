@@ -0,0 +1,63 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import snake_engine as engine
+import tournament
+
+
+CONFIGS = [tournament.Config('wander', 12, 10, engine.SPEED, delay, (5, 10))
+           for delay in ((50, 200), (2, 4))]
+
+
+def test_game_class_uses_config_delays():
+    game = tournament.game_class(CONFIGS[1])(1, 12, 10)
+    garbage = game.garbage_items[0]
+    assert garbage.delay_range == (2, 4), (
+        'Мусор должен брать таймер из конфигурации.')
+    for _ in range(4):
+        game.step(None)
+    assert garbage.time_to_change <= 4, (
+        'Мусор должен переставляться по таймеру конфигурации.')
+    assert engine.Garbage.delay_range == engine.GARBAGE_DELAY, (
+        'Конфигурация не должна менять классы движка.')
+
+
+def test_tasks_split_games_with_distinct_seeds():
+    tasks = tournament.make_tasks(CONFIGS, 25, seed=7, games_per_task=10)
+    assert [task[2] for task in tasks] == [10, 10, 5] * 2, (
+        'Партии конфигурации должны делиться на задания.')
+    assert len({task[1] for task in tasks}) == len(tasks), (
+        'У каждого задания должно быть свое зерно.')
+
+
+def test_tournament_aggregates_results_deterministically():
+    tasks = tournament.make_tasks(CONFIGS, 6, seed=3, games_per_task=4,
+                                  max_ticks=300)
+    seen = []
+    standings = tournament.run_tournament(
+        tasks, workers=2, on_result=lambda standings: seen.append(1))
+    assert len(seen) == len(tasks), (
+        'Итоги должны обновляться после каждого задания.')
+    report = standings.report()
+    assert {row['garbage_delay'] for row in report} == {(50, 200), (2, 4)}
+    for row in report:
+        assert row['games'] == 6, 'Должны учитываться все партии.'
+        assert sum(row['causes'].values()) == 6
+        assert row['mean_ticks'] <= 300
+        assert row['mean_seconds'] == row['mean_ticks'] / engine.SPEED
+    expected = [tournament.play_task(task) for task in tasks]
+    again = tournament.Standings()
+    for config, results in expected:
+        again.add(config, results)
+    assert sorted(again.report(), key=str) == sorted(report, key=str), (
+        'Результаты не должны зависеть от процесса-исполнителя.')
+
+
+def test_tournament_does_not_import_pygame():
+    code = 'import sys, tournament; print("pygame" in sys.modules)'
+    result = subprocess.run(
+        [sys.executable, '-c', code], capture_output=True, text=True,
+        cwd=Path(tournament.__file__).parent)
+    assert result.stdout.strip() == 'False', (
+        'Процессы турнира не должны импортировать pygame.')
@@ -1,26 +1,23 @@
-from random import choice, randint
+import argparse
+import os
+import sys
+from collections import deque
+from functools import lru_cache
+from itertools import islice
 
 import pygame as pg
 
+import snake_engine as engine
+from snake_engine import (  # noqa: F401
+    DOWN, GAME_OVER_EVENTS, GAME_WINDOW_HIGHT, GAME_WINDOW_WIDTH,
+    GRID_HEIGHT, GRID_SIZE, GRID_WIDTH, LEFT, PANEL_HIGHT, PANEL_POSITION,
+    PANEL_WIDTH, RIGHT, SCREEN_CENTER, SCREEN_HEIGHT, SCREEN_WIDTH, SPEED,
+    UP, GameState, board_size
+)
+from bots import BOTS
+from profiler import NULL_PROFILER, FrameProfiler
+from replay import Replay, apply_inputs
 
-pg.init()
-
-# Константы для размеров экрана, информационной панели, игрового поля и сетки:
-SCREEN_WIDTH, SCREEN_HEIGHT = 640, 500
-PANEL_WIDTH, PANEL_HIGHT = SCREEN_WIDTH, 20
-GAME_WINDOW_WIDTH, GAME_WINDOW_HIGHT = SCREEN_WIDTH, (
-    SCREEN_HEIGHT - PANEL_HIGHT)
-PANEL_POSITION = (0, GAME_WINDOW_HIGHT)
-SCREEN_CENTER = (SCREEN_WIDTH // 2, GAME_WINDOW_HIGHT // 2)
-GRID_SIZE = 20
-GRID_WIDTH = SCREEN_WIDTH // GRID_SIZE
-GRID_HEIGHT = GAME_WINDOW_HIGHT // GRID_SIZE
-
-# Направления движения:
-UP = (0, -1)
-DOWN = (0, 1)
-LEFT = (-1, 0)
-RIGHT = (1, 0)
 
 # Цвет фона - черный:
 BOARD_BACKGROUND_COLOR = (0, 0, 0)
@@ -46,14 +43,14 @@ GARBAGE_COLOR = (189, 183, 107)
 # Цвет змейки:
 SNAKE_COLOR = (71, 167, 106)
 
+# Цвет змеек, которыми управляют боты:
+BOT_SNAKE_COLOR = (65, 105, 225)
+
 # Цвет преград:
 BARRIER_COLOR = (128, 128, 128)
 
-# Шрифт для информационной панели:
-INFO_FONT = pg.font.Font(None, 16)
-
-# Шрифт для информационной панели:
-INFO_FONT = pg.font.Font(None, 16)
+# Шрифт для информационной панели, создается в init_display():
+INFO_FONT = None
 
 # В словаре реализована логика, какое новое направление должен
 # принять игровой объект в зависимости от его текущего направления
@@ -69,246 +66,397 @@ OBJECT_DIRECTION_LOGIC = {
     (DOWN, pg.K_RIGHT): RIGHT
 }
 
-# Скорость движения змейки:
-SPEED = 13
+# Частота кадров: отрисовка и опрос клавиатуры. Тики игры выполняются
+# независимо от нее, с частотой, равной скорости змейки.
+RENDER_FPS = 60
+
+# Сколько тиков игры можно выполнить за один кадр, догоняя отставание:
+MAX_TICKS_PER_FRAME = 5
+
+# Сколько поворотов можно нажать наперед, до следующих тиков игры:
+INPUT_QUEUE_SIZE = 3
+
+# Обновлять на экране только области, которые изменились за кадр.
+# Если False, каждый кадр на экран выводится вся поверхность.
+DIRTY_RECTS = True
 
-# Настройка игрового окна:
-screen = pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), 0, 32)
+# Игровое окно создается в init_display() при запуске игры, а до этого
+# объекты рисуются на поверхности в памяти. Так импорт модуля
+# не инициализирует pygame и не открывает окно.
+screen = pg.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
 
-# Заголовок окна игрового поля:
-pg.display.set_caption('Змейка')
+# Фоновый слой игрового поля: фон и преграды. Преграды рисуются на нем
+# один раз при появлении, а затирание ячеек копирует участок этого слоя.
+background = pg.Surface((GAME_WINDOW_WIDTH, GAME_WINDOW_HIGHT))
+background.fill(BOARD_BACKGROUND_COLOR)
+
+# Размер одной ячейки на экране:
+CELL_SIZE = (GRID_SIZE, GRID_SIZE)
+
+# На большом поле камера сдвигается, когда голова змейки подходит
+# к краю окна ближе, чем на столько ячеек:
+CAMERA_MARGIN = 5
+
+# Кэш заранее отрисованных ячеек: (цвет ячейки, цвет границы) -> Surface.
+TILES = {}
 
 # Настройка времени:
 clock = pg.time.Clock()
 
 
-class GameObject:
-    """Базовый класс, от которого наследуются другие игровые объекты."""
+def init_display():
+    """Инициализирует pygame, создает игровое окно и шрифт.
+
+    Повторный вызов при уже открытом окне ничего не делает.
+    """
+    global screen, background, INFO_FONT
+    if pg.display.get_surface() is not None and INFO_FONT is not None:
+        return
+    pg.init()
+    screen = pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), 0, 32)
+    # Приводим поверхности к формату экрана, чтобы копирование было
+    # быстрым, а ячейки в кэше создаем заново уже в этом формате.
+    background = background.convert()
+    TILES.clear()
+    # Заголовок окна игрового поля:
+    pg.display.set_caption('Змейка')
+    INFO_FONT = pg.font.Font(None, 16)
+    render_text.cache_clear()
+
+
+@lru_cache(maxsize=256)
+def render_text(text):
+    """Возвращает надпись для информационной панели.
+
+    Надписи кэшируются, поэтому каждое значение счета или скорости
+    отрисовывается шрифтом только один раз.
+    """
+    return INFO_FONT.render(text, True, OBJECT_COLOR_WHITE)
+
+
+class Camera:
+    """Окно просмотра игрового поля.
+
+    Если поле больше игрового окна, на экране показывается участок
+    поля размером GRID_WIDTH x GRID_HEIGHT ячеек, который сдвигается
+    вслед за головой змейки. Поле замкнуто, поэтому участок может
+    переходить через его край. Если поле помещается в окно, камера
+    неподвижна.
+
+    Объекты игры хранят ячейки как номера в сетке поля, а в координаты
+    экрана в пикселях их переводит только камера при отрисовке.
+
+    Аргументы:
+    - width, height: размер поля в ячейках.
+    """
+
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT):
+        self.set_board(width, height)
+
+    def set_board(self, width, height):
+        """Задает размер поля и возвращает камеру в левый верхний угол."""
+        self.width = width
+        self.height = height
+        self.x_pos = self.y_pos = 0
+        self.scrolling = width > GRID_WIDTH or height > GRID_HEIGHT
+
+    def follow(self, head):
+        """Сдвигает камеру вслед за головой змейки.
+
+        Возвращает True, если камера сдвинулась.
+        """
+        if not self.scrolling:
+            return False
+        old_position = (self.x_pos, self.y_pos)
+        head_y, head_x = divmod(head, self.width)
+        self.x_pos = self.follow_axis(head_x, self.x_pos, self.width,
+                                      GRID_WIDTH)
+        self.y_pos = self.follow_axis(head_y, self.y_pos, self.height,
+                                      GRID_HEIGHT)
+        return (self.x_pos, self.y_pos) != old_position
+
+    @staticmethod
+    def follow_axis(head, start, size, view_size):
+        """Возвращает новое начало окна по одной оси.
+
+        Голова держится не ближе CAMERA_MARGIN ячеек от края окна. Если
+        голова оказалась далеко за окном (например, после начала игры
+        заново), окно ставится так, чтобы голова была в середине.
+        """
+        if size <= view_size:
+            return 0
+        offset = (head - start) % size
+        if CAMERA_MARGIN <= offset < view_size - CAMERA_MARGIN:
+            return start
+        if offset < view_size + CAMERA_MARGIN:
+            # Голова у края окна или только что вышла за него.
+            shift = (offset - view_size + CAMERA_MARGIN + 1
+                     if offset >= CAMERA_MARGIN else offset - CAMERA_MARGIN)
+            return (start + shift) % size
+        if offset > size - CAMERA_MARGIN:
+            return (head - CAMERA_MARGIN) % size
+        return (head - view_size // 2) % size
+
+    def to_screen(self, cell):
+        """Возвращает координаты ячейки на экране в пикселях или None.
+
+        None означает, что ячейка поля сейчас не видна.
+        """
+        y_offset, x_offset = divmod(cell, self.width)
+        if self.scrolling:
+            x_offset = (x_offset - self.x_pos) % self.width
+            y_offset = (y_offset - self.y_pos) % self.height
+            if x_offset >= GRID_WIDTH or y_offset >= GRID_HEIGHT:
+                return None
+        return (x_offset * GRID_SIZE, y_offset * GRID_SIZE)
+
+    def visible_cells(self):
+        """Возвращает номера всех видимых ячеек поля."""
+        return [(self.y_pos + y_offset) % self.height * self.width
+                + (self.x_pos + x_offset) % self.width
+                for y_offset in range(min(self.height, GRID_HEIGHT))
+                for x_offset in range(min(self.width, GRID_WIDTH))]
+
+
+# Камера игрового поля, размер поля задается при запуске игры:
+camera = Camera()
+
+
+def screen_rects(cells):
+    """Возвращает прямоугольники на экране для видимых ячеек поля."""
+    return [pg.Rect(position, CELL_SIZE)
+            for position in map(camera.to_screen, cells)
+            if position is not None]
+
+
+def get_tile(body_color, border_color=BORDER_COLOR):
+    """Возвращает заранее отрисованную ячейку с заданными цветами."""
+    tile = TILES.get((body_color, border_color))
+    if tile is None:
+        tile = pg.Surface(CELL_SIZE)
+        tile.fill(border_color)
+        tile.fill(body_color, (1, 1, GRID_SIZE - 2, GRID_SIZE - 2))
+        if pg.display.get_surface() is not None:
+            tile = tile.convert()
+        TILES[(body_color, border_color)] = tile
+    return tile
+
 
-    def __init__(self, object_color=OBJECT_COLOR_WHITE):
-        self.position = SCREEN_CENTER
-        self.body_color = object_color
+class GameObject(engine.Entity):
+    """Базовый класс, от которого наследуются другие игровые объекты.
+
+    Логика объектов описана в модуле snake_engine, здесь к ней
+    добавляется только отрисовка.
+    """
+
+    __slots__ = ()
+
+    # Цвет объекта, если он не передан в конструктор:
+    default_color = OBJECT_COLOR_WHITE
+
+    def __init__(self, object_color=None, free_cells=None, rng=None,
+                 scheduler=None):
+        super().__init__(free_cells, rng, scheduler)
+        self.body_color = object_color or self.default_color
+
+    def draw_cell(self, cell, body_color=None, border_color=BORDER_COLOR):
+        """Метод отрисовывает один сегмент игрового объекта.
+
+        Возвращает прямоугольник, занятый сегментом. Если ячейка
+        не видна на экране, возвращает пустой прямоугольник.
+        """
+        position = camera.to_screen(cell)
+        if position is None:
+            return pg.Rect(0, 0, 0, 0)
+        tile = get_tile(body_color or self.body_color, border_color)
+        return screen.blit(tile, position)
 
-    def draw_cell(self, position, body_color=None, border_color=BORDER_COLOR):
-        """Метод отрисовывает один сегмент игрового объекта."""
-        body_color = body_color or self.body_color
-        rect = pg.Rect(position, (GRID_SIZE, GRID_SIZE))
-        pg.draw.rect(screen, body_color, rect)
-        pg.draw.rect(screen, border_color, rect, 1)
+    def draw_cells(self, cells, surface=None):
+        """Отрисовывает сегменты объекта одним пакетом.
+
+        Сегменты, которые не видны на экране, пропускаются. Возвращает
+        список прямоугольников, занятых видимыми сегментами.
+        """
+        tile = get_tile(self.body_color)
+        rects = screen_rects(cells)
+        (surface or screen).blits([(tile, rect) for rect in rects], False)
+        return rects
+
+    def erase_cells(self, cells):
+        """Затирает ячейки, восстанавливая их из фонового слоя.
+
+        Возвращает список затертых прямоугольников.
+        """
+        rects = screen_rects(cells)
+        screen.blits([(background, rect, rect) for rect in rects], False)
+        return rects
 
     def draw(self):
-        """Метод определяет, как объект будет отрисовываться на экране."""
+        """Метод определяет, как объект будет отрисовываться на экране.
+
+        Возвращает список прямоугольников, которые изменились на экране.
+        """
         raise NotImplementedError('Метод draw должен быть реализован'
                                   'в дочерних классах.')
 
 
-class Apple(GameObject):
+def draw_items(items):
+    """Отрисовывает группу одинаковых предметов (яблок или мусора).
+
+    Перерисовываются только предметы, сменившие положение с прошлого
+    кадра: старые ячейки затираются, а новые рисуются, каждые одним
+    пакетом на всю группу.
+
+    Возвращает список изменившихся прямоугольников экрана.
+    """
+    moved = [item for item in items if item.drawn_position != item.position]
+    if not moved:
+        return []
+    first = moved[0]
+    is_free = first.free_cells.is_free
+    # Затираем позиции, где предметы были нарисованы раньше, если их
+    # не занял другой объект (например, змейка, которая съела предмет).
+    rects = first.erase_cells(
+        [item.drawn_position for item in moved
+         if item.drawn_position is not None and is_free(item.drawn_position)])
+    rects += first.draw_cells([item.position for item in moved])
+    for item in moved:
+        item.drawn_position = item.position
+    return rects
+
+
+class Apple(GameObject, engine.Apple):
     """Дочерний класс, описывающий яблоко и действия с ним."""
 
-    def __init__(self, object_color=APPLE_COLOR):
-        super().__init__(object_color)
-        self.randomize_position()
+    __slots__ = ('drawn_position',)
 
-    def randomize_position(self,
-                           list_exception_pos=[SCREEN_CENTER]):
-        """Устанавливает случайное положение яблока на игровом поле.
-
-        Аргументы:
-        - list_exception_pos: список с координатами каждого сегмента змейки.
-        """
-        # Задаем случайные координаты, но так, чтобы
-        # яблоко не появилось под телом змейки.
-        while True:
-            x_pos = randint(0, GRID_WIDTH - 1) * GRID_SIZE
-            y_pos = randint(0, GRID_HEIGHT - 1) * GRID_SIZE
-            self.position = (x_pos, y_pos)
-            if self.position not in list_exception_pos:
-                break
+    def __init__(self, object_color=APPLE_COLOR, free_cells=None, rng=None,
+                 scheduler=None):
+        self.drawn_position = None
+        super().__init__(object_color, free_cells, rng, scheduler)
 
     def draw(self):
         """Отрисовывает яблоко на игровой поверхности."""
-        self.draw_cell(self.position)
+        return draw_items([self])
 
 
-class Garbage(GameObject):
+class Garbage(GameObject, engine.Garbage):
     """Дочерний класс, описывающий несъедобный мусор и действия с ним"""
 
-    def __init__(self, list_exception_pos, object_color=GARBAGE_COLOR):
-        super().__init__(object_color)
-        self.randomize_position(list_exception_pos)
-        self.set_time_to_change_position()
-        self.last = None
+    __slots__ = ('drawn_position',)
 
-    def randomize_position(self, list_exception_pos, is_eaten=False):
-        """Устанавливает случайное положение мусора на игровом поле.
-
-        Аргументы:
-        - list_exception_pos: список с координатами, которые нужно исключить
-        из возможных координат появления.
-        """
-        # Если мусор не был съеден, то сохраняем предыдущую координату
-        # для затирания
-        if not is_eaten:
-            self.last = self.position
-        # Задаем случайные координаты, но так, чтобы
-        # мусор не появилось под телом змейки или под яблоком.
-        while True:
-            x_pos = randint(0, GRID_WIDTH - 1) * GRID_SIZE
-            y_pos = randint(0, GRID_HEIGHT - 1) * GRID_SIZE
-            self.position = (x_pos, y_pos)
-            if self.position not in list_exception_pos:
-                break
-        # Устанавливаем время, спустя которое нужно сгенерировать
-        # новую позицию.
-        self.set_time_to_change_position()
-
-    def set_time_to_change_position(self):
-        """Задает случайное число для времени, через которое нужно
-        сгенерировать новую позицию.
-        """
-        self.time_to_change = randint(50, 200)
+    def __init__(self, object_color=GARBAGE_COLOR, free_cells=None, rng=None,
+                 scheduler=None):
+        self.drawn_position = None
+        super().__init__(object_color, free_cells, rng, scheduler)
 
     def draw(self):
         """Отрисовывает мусор на игровой поверхности."""
-        self.draw_cell(self.position)
-        # Уменьшаем время до генерации новой позиции.
-        self.time_to_change -= 1
-        # Если нужно, затираем предыдущую позицию.
-        if self.last is not None:
-            self.draw_cell(self.last, BOARD_BACKGROUND_COLOR,
-                           BOARD_BACKGROUND_COLOR)
-            self.last = None
-
-
-class Snake(GameObject):
-    """Дочерний класс, описывающий змейку и ее поведение."""
-
-    def __init__(self, object_color=SNAKE_COLOR):
-        super().__init__(object_color)
-        self.reset(RIGHT)
-        self.next_direction = None
+        return draw_items([self])
+
+
+class Snake(GameObject, engine.Snake):
+    """Дочерний класс, описывающий змейку и ее поведение.
+
+    Нажатые игроком повороты копятся в очереди turns и применяются
+    по одному за тик, поэтому быстрые последовательности нажатий
+    не теряются.
+    """
+
+    __slots__ = ('turns', 'last', 'moves_since_draw')
+
+    def __init__(self, object_color=SNAKE_COLOR, free_cells=None, rng=None,
+                 scheduler=None):
+        self.turns = deque(maxlen=INPUT_QUEUE_SIZE)
+        # Освободившиеся ячейки хвоста и число ходов с прошлого кадра.
         self.last = []
+        self.moves_since_draw = 0
+        super().__init__(object_color, free_cells, rng, scheduler)
+
+    def move(self):
+        """Двигает змейку и запоминает, что нужно перерисовать."""
+        tails = super().move()
+        self.last += tails
+        self.moves_since_draw += 1
+        return tails
+
+    def remove(self):
+        """Убирает змейку с поля и запоминает, что ее нужно затереть."""
+        self.last += self.positions
+        self.turns.clear()
+        super().remove()
 
     def draw(self):
         """Отрисовывает змейку на экране, затирая след."""
-        # Затирание последнего сегмента.
-        if len(self.last) > 0:
-            for cell in self.last:
-                self.draw_cell(cell, BOARD_BACKGROUND_COLOR,
-                               BOARD_BACKGROUND_COLOR)
-            self.last.clear()
-
-        # Отрисовка новой головы змейки.
-        self.draw_cell(self.get_head_position())
-
-    def update_direction(self):
-        """Обновляет направления змейки после нажатия на кнопку."""
-        if self.next_direction:
-            self.direction = self.next_direction
-            self.next_direction = None
+        return draw_snakes([self])
 
-    def move(self):
-        """Обновляет позицию змейки (координаты каждого сегмента)
-        и проверяем, не столкнулась ли она с собой.
-        """
-        current_head_x_pos, current_head_y_pos = self.get_head_position()
-
-        # В зависимости от направления движения, задаем изменение координат.
-        dx, dy = {
-            RIGHT: (GRID_SIZE, 0),
-            UP: (0, -GRID_SIZE),
-            LEFT: (-GRID_SIZE, 0),
-            DOWN: (0, GRID_SIZE)
-        }[self.direction]
-
-        # Задаем новые координаты для головы змейки.
-        new_head_x_pos = (current_head_x_pos + dx) % GAME_WINDOW_WIDTH
-        new_head_y_pos = (current_head_y_pos + dy) % GAME_WINDOW_HIGHT
-        new_head_position = (new_head_x_pos, new_head_y_pos)
-        self.positions.insert(0, (new_head_position))
-
-        # Проверяем, съела ли змейка яблоко.
-        if len(self.positions) > self.length:
-            count_extra_cell = len(self.positions) - self.length
-            for _ in range(count_extra_cell):
-                self.last.append(self.positions.pop(-1))
-
-    def get_head_position(self):
-        """Возвращает позицию головы змейки."""
-        return self.positions[0]
-
-    def change_speed(self, selector):
-        """Изменяет скорость движения змейки."""
-        if selector == 1:
-            self.speed -= 1
-        else:
-            self.speed += 1
 
-    def reset(self, direction=None):
-        """Сбрасывает змейку в начальное состояние после
-        столкновения с собой.
-        """
-        self.length = 1
-        self.positions = [self.position]
-        self.direction = direction or choice([RIGHT, UP, LEFT, DOWN])
-        self.speed = SPEED
-
-
-class Barrier(GameObject):
-    """Дочерний класс, описывающий преграды."""
-
-    def __init__(self, object_color=BARRIER_COLOR):
-        super().__init__(object_color)
-        self.reset()
-
-    def create_new_barrier(self):
-        """Создает новую случайную фигуру преграды."""
-        list_of_figures = [
-            [(0, 0)],
-            [(0, 0), (1, 0)],
-            [(0, 0), (0, 1)],
-            [(0, 0), (1, 0), (2, 0)],
-            [(0, 0), (0, 1), (0, 2)],
-            [(0, 0), (1, 0), (0, 1)],
-            [(0, 0), (1, 0), (1, 1)],
-            [(0, 0), (0, 1), (1, 1)],
-            [(0, 1), (1, 0), (1, 1)],
-        ]
-        return choice(list_of_figures)
-
-    def randomize_position(self, list_exception_pos):
-        """Устанавливает случайное положение фигуры на поле."""
-        figure = self.create_new_barrier()
-        while True:
-            x_pos = randint(0, GRID_WIDTH - 1)
-            y_pos = randint(0, GRID_HEIGHT - 1)
-            new_figure_positions = [(
-                (x_pos + cell[0]) * GRID_SIZE,
-                (y_pos + cell[1]) * GRID_SIZE) for cell in figure]
+def draw_snakes(snakes):
+    """Отрисовывает змейки на экране, затирая их след.
 
-            common_positions = set(new_figure_positions).intersection(
-                list_exception_pos)
+    Сначала одним пакетом затираются освободившиеся ячейки всех змеек,
+    затем рисуются новые головы, одним пакетом на каждый цвет змеек.
 
-            if len(common_positions) == 0:
-                self.positions.append(new_figure_positions)
-                self.set_time_to_new_barrier()
-                break
+    Возвращает список изменившихся прямоугольников экрана.
+    """
+    # Затирание последних сегментов.
+    rects = snakes[0].erase_cells(
+        [cell for snake in snakes for cell in snake.last])
+    heads = {}
+    for snake in snakes:
+        snake.last.clear()
+        # Новая голова змейки - или несколько, если за кадр прошло
+        # несколько тиков.
+        new_cells = min(max(snake.moves_since_draw, 1), len(snake.positions))
+        heads.setdefault(snake.body_color, (snake, []))[1].extend(
+            islice(snake.positions, new_cells))
+        snake.moves_since_draw = 0
+    for snake, cells in heads.values():
+        rects += snake.draw_cells(cells)
+    return rects
 
-    def draw(self):
-        """Отрисовывает преграды на поле."""
-        for figure in self.positions:
-            for cell in figure:
-                self.draw_cell(cell)
-        self.time_to_change -= 1
 
-    def set_time_to_new_barrier(self):
-        """Задает случайное время ло появления следующей фигуры."""
-        self.time_to_change = randint(300, 500)
+class Barrier(GameObject, engine.Barrier):
+    """Дочерний класс, описывающий преграды.
+
+    Преграды не двигаются, поэтому рисуются один раз - когда появляются:
+    на фоновом слое и на экране. Когда сдвигается камера, фоновый слой
+    заполняется заново в redraw_viewport().
+    """
+
+    __slots__ = ('drawn_figures',)
+
+    default_color = BARRIER_COLOR
+
+    def draw(self):
+        """Отрисовывает на поле новые преграды."""
+        cells = [cell for figure in self.positions[self.drawn_figures:]
+                 for cell in figure]
+        self.drawn_figures = len(self.positions)
+        if not cells:
+            return []
+        self.draw_cells(cells, background)
+        return self.draw_cells(cells)
 
     def reset(self):
         """Удаляет все преграды с поля и начинает их генерацию сначала."""
-        self.positions = []
-        self.set_time_to_new_barrier()
+        super().reset()
+        self.drawn_figures = 0
+        background.fill(BOARD_BACKGROUND_COLOR)
+
+
+class SnakeGame(GameState):
+    """Состояние игры с объектами, которые умеют себя отрисовывать."""
+
+    snake_class = Snake
+    apple_class = Apple
+    garbage_class = Garbage
+    barrier_class = Barrier
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for snake in self.snakes[1:]:
+            snake.body_color = BOT_SNAKE_COLOR
 
 
 def handle_keys(game_object):
@@ -326,108 +474,458 @@ def handle_keys(game_object):
             elif event.key == pg.K_2:
                 game_object.change_speed(2)
             else:
-                game_object.next_direction = OBJECT_DIRECTION_LOGIC.get(
-                    (game_object.direction, event.key),
-                    game_object.direction)
+                queue_turn(game_object, event.key)
+
+
+def queue_turn(game_object, key):
+    """Добавляет поворот в очередь змейки, если он допустим.
+
+    Поворот проверяется относительно последнего поворота в очереди,
+    а если очередь пуста - относительно текущего направления.
+    Нажатия сверх размера очереди отбрасываются.
+    """
+    turns = game_object.turns
+    direction = turns[-1] if turns else game_object.direction
+    new_direction = OBJECT_DIRECTION_LOGIC.get((direction, key))
+    if new_direction and len(turns) < turns.maxlen:
+        turns.append(new_direction)
 
 
 class InfoPanel():
-    """Информационная панель на игровом поле"""
+    """Информационная панель на игровом поле.
+
+    Панель перерисовывается, только когда меняется одно из показанных
+    значений.
+    """
 
     def __init__(self):
         """Инициализация панели"""
         self.position = PANEL_POSITION
         self.color = PANEL_COLOR
+        self.shown_values = None
 
     def draw_panel(self):
         """Отрисовывает информационную панель снизу экрана"""
         rect = pg.Rect(self.position, (PANEL_WIDTH, PANEL_HIGHT))
         pg.draw.rect(screen, self.color, rect)
+        return rect
+
+    def draw_text(self, text, x_offset):
+        """Выводит надпись на панель и возвращает ее ширину."""
+        text_surface = render_text(text)
+        screen.blit(text_surface, (self.position[0] + x_offset,
+                                   self.position[1] + 5))
+        return text_surface.get_width()
 
     def draw_score(self, score):
         """Отображает счет"""
-        score_text = INFO_FONT.render(f'Length: {score}',
-                                      True,
-                                      OBJECT_COLOR_WHITE)
-        screen.blit(score_text, (self.position[0] + 5, self.position[1] + 5))
+        self.draw_text(f'Length: {score}', 5)
 
     def draw_speed(self, speed):
         """Отображает скорость змейки"""
-        speed_text = INFO_FONT.render(f'Speed: {speed}',
-                                      True,
-                                      OBJECT_COLOR_WHITE)
-        screen.blit(speed_text, (self.position[0] + 100, self.position[1] + 5))
-
-    def update_panel(self, score, speed):
-        """Обновляем информационную панель"""
-        self.draw_panel()
-        self.draw_score(score)
-        self.draw_speed(speed)
-
-
-def main():
-    """Запускает основной цикл игры."""
-    the_apple = Apple()
-    my_snake = Snake()
-    some_garbage = Garbage(my_snake.positions + [the_apple.position])
-    barriers = Barrier()
-    info_panel = InfoPanel()
-
-    def start_over():
-        my_snake.reset()
-        barriers.reset()
-        the_apple.randomize_position(
-            my_snake.positions + [some_garbage.position])
-        some_garbage.randomize_position(
-            my_snake.positions + [the_apple.position])
-        screen.fill(BOARD_BACKGROUND_COLOR)
-
-    def get_cells_ocupited():
-        by_barriers = []
-        for barrier in barriers.positions:
-            by_barriers += barrier
-        cells_ocupited = my_snake.positions + [the_apple.position] + [
-            some_garbage.position] + by_barriers
-        return cells_ocupited
-
-    while True:
-        clock.tick(my_snake.speed)
-
-        handle_keys(my_snake)
-        my_snake.update_direction()
-        my_snake.move()
-
-        if the_apple.position == my_snake.get_head_position():
-            my_snake.length += 1
-            the_apple.randomize_position(get_cells_ocupited())
+        self.draw_text(f'Speed: {speed}', 100)
 
-        if some_garbage.position == my_snake.get_head_position():
-            if my_snake.length > 1:
-                my_snake.length -= 1
-                some_garbage.randomize_position(get_cells_ocupited(), True)
-            else:
-                start_over()
+    def draw_stats(self, stats):
+        """Отображает дополнительные показатели правее скорости."""
+        x_offset = 200
+        for name, value in stats:
+            x_offset += self.draw_text(f'{name}: {value}', x_offset) + 15
 
-        if some_garbage.time_to_change == 0:
-            some_garbage.randomize_position(get_cells_ocupited())
+    def update_panel(self, score, speed, **stats):
+        """Обновляем информационную панель.
 
-        if barriers.time_to_change == 0:
-            barriers.randomize_position(get_cells_ocupited())
+        Аргументы:
+        - stats: дополнительные показатели в виде название=значение.
 
-        if my_snake.get_head_position() in my_snake.positions[2:]:
-            start_over()
+        Возвращает список изменившихся прямоугольников экрана.
+        """
+        values = (score, speed, tuple(stats.items()))
+        if values == self.shown_values:
+            return []
+        self.shown_values = values
+        rect = self.draw_panel()
+        self.draw_score(score)
+        self.draw_speed(speed)
+        self.draw_stats(values[2])
+        return [rect]
+
+
+def redraw_viewport(game):
+    """Перерисовывает все игровое поле, видимое через камеру.
+
+    Вызывается после сдвига камеры и после начала игры заново. Время
+    перерисовки зависит от размера окна и длины змеек, а не от размера
+    поля. Каждая змейка рисуется своим цветом.
+    """
+    background.fill(BOARD_BACKGROUND_COLOR)
+    free_cells = game.free_cells
+    occupied = [cell for cell in camera.visible_cells()
+                if free_cells.counts[cell]]
+    game.barriers.draw_cells(
+        [cell for cell in occupied
+         if free_cells.kinds[cell] == engine.CELL_BARRIER],
+        background)
+    screen.blit(background, (0, 0))
+    snake_cells = {cell for cell in occupied
+                   if free_cells.snake_segments(cell)}
+    for snake in game.snakes:
+        snake.draw_cells(snake_cells.intersection(snake.positions))
+    for item, kind in ((game.apple, engine.CELL_APPLE),
+                       (game.garbage, engine.CELL_GARBAGE)):
+        item.draw_cells(
+            [cell for cell in occupied if free_cells.kinds[cell] == kind])
+
+
+def advance(game, lag, bot=None):
+    """Выполняет тики игры, накопившиеся за lag миллисекунд.
+
+    Если задан бот, змейкой игрока на каждом тике управляет он, а не
+    нажатые клавиши.
+
+    Возвращает оставшееся время и признак того, что игра началась заново.
+    """
+    tick_time = 1000 / game.snake.speed
+    turns = game.snake.turns
+    restarted = False
+    for _ in range(MAX_TICKS_PER_FRAME):
+        if lag < tick_time:
+            break
+        lag -= tick_time
+        if bot is not None:
+            action = bot(game, game.snake)
+        else:
+            action = turns.popleft() if turns else None
+        if game.step(action) in GAME_OVER_EVENTS:
+            restarted = True
+    else:
+        # Не успеваем за скоростью змейки - отбрасываем отставание,
+        # чтобы не копить его бесконечно.
+        lag = min(lag, tick_time)
+    return lag, restarted
+
+
+def draw_frame(game, info_panel, profiler=NULL_PROFILER):
+    """Рисует кадр и возвращает список изменившихся областей экрана."""
+    dirty_rects = []
+    dirty_rects += draw_snakes(game.snakes)
+    profiler.lap('draw_snake')
+    dirty_rects += game.barriers.draw()
+    profiler.lap('draw_barriers')
+    for name, items in (('apple', game.apples),
+                        ('garbage', game.garbage_items)):
+        dirty_rects += draw_items(items)
+        profiler.lap(f'draw_{name}')
+    dirty_rects += info_panel.update_panel(game.snake.length,
+                                           game.snake.speed,
+                                           **profiler.overlay_stats())
+    profiler.lap('draw_panel')
+    return dirty_rects
+
+
+def present_frame(game, info_panel, full_update, profiler=NULL_PROFILER):
+    """Рисует кадр и выводит его на экран.
+
+    Аргументы:
+    - full_update: вывести на экран всю поверхность, а не только
+    изменившиеся области.
+    - profiler: профилировщик, по которому размечаются фазы кадра.
+    """
+    dirty_rects = draw_frame(game, info_panel, profiler)
+    if DIRTY_RECTS and not full_update:
+        pg.display.update(dirty_rects)
+    else:
+        pg.display.update()
+    profiler.lap('display_update')
+    profiler.end_frame()
+
+
+def follow_snake(game, restarted):
+    """Сдвигает камеру за змейкой и при необходимости перерисовывает поле.
+
+    Возвращает True, если поле перерисовано и на экран нужно вывести
+    весь кадр.
+    """
+    moved = camera.follow(game.snake.get_head_position())
+    if not (moved or restarted):
+        return False
+    redraw_viewport(game)
+    return True
+
+
+def clear_trails(game):
+    """Забывает освободившиеся ячейки змеек перед перерисовкой поля.
+
+    Поле перерисовывается целиком, а старые ячейки змеек затирать уже
+    нельзя: их могли занять новые сегменты.
+    """
+    for snake in game.snakes:
+        snake.last.clear()
+
+
+def resume_game(save_path):
+    """Загружает игру из файла снимка save_path.
+
+    Возвращает None, если файла нет или снимок поврежден, - тогда
+    начинается новая игра.
+    """
+    if save_path is None or not os.path.exists(save_path):
+        return None
+    import snapshot
+
+    try:
+        return snapshot.load_game(save_path, SnakeGame)
+    except snapshot.SnapshotFormatError as error:
+        print(f'Снимок {save_path} не загружен: {error} '
+              f'Начинается новая игра.', file=sys.stderr)
+        return None
+
+
+def main(record_path=None, profiler=NULL_PROFILER, bot=None,
+         save_path=None, **game_options):
+    """Запускает основной цикл игры.
+
+    Аргументы:
+    - record_path: файл, в который при выходе из игры сохраняется
+    ее повтор.
+    - profiler: профилировщик фаз кадра (profiler.FrameProfiler).
+    Его показатели выводятся на информационную панель.
+    - bot: бот, который управляет змейкой игрока, - вызываемый объект
+    bot(game, snake), возвращающий новое направление или None.
+    - game_options: настройки игры, как у GameState: размер поля,
+    число яблок, мусора, преград и змеек. Если поле больше окна,
+    на экране показывается его участок вокруг головы змейки.
+    - save_path: файл снимка игры (snapshot.py). Если он есть, игра
+    продолжается с него, а не по game_options, и при выходе снимок
+    сохраняется в него снова. Если снимок поврежден, начинается новая
+    игра.
+    """
+    init_display()
+    if save_path is not None:
+        # Снимки нужны только с --save: модуль импортируется здесь,
+        # чтобы не замедлять запуск обычной игры.
+        import snapshot
+    game = resume_game(save_path)
+    resumed = game is not None
+    if resumed:
+        clear_trails(game)
+    else:
+        game = SnakeGame(**game_options)
+    camera.set_board(game.free_cells.width, game.free_cells.height)
+    if resumed:
+        follow_snake(game, True)
+    game.profiler = profiler
+    if hasattr(bot, 'prepare'):
+        # Бот готовится до первого тика, а не во время хода.
+        bot.prepare(game)
+    if record_path is not None:
+        game.recorder = Replay(game.seed, **game_options)
+    info_panel = InfoPanel()
+    # Первый кадр и кадр после очистки экрана выводятся целиком.
+    full_update = True
+    # Время, накопленное для следующих тиков игры, в миллисекундах.
+    lag = 0
 
-        for barrier in barriers.positions:
-            if my_snake.get_head_position() in barrier:
-                start_over()
+    try:
+        while True:
+            lag += clock.tick(RENDER_FPS)
+            profiler.start_frame()
+
+            handle_keys(game.snake)
+            profiler.lap('handle_keys')
+            lag, restarted = advance(game, lag, bot)
+            if follow_snake(game, restarted):
+                full_update = True
+
+            present_frame(game, info_panel, full_update, profiler)
+            full_update = False
+    finally:
+        if game.recorder is not None:
+            game.recorder.save(record_path)
+        if save_path is not None:
+            snapshot.save_game(game, save_path)
+
+
+def play_replay(replay, frame_skip=1):
+    """Показывает повтор игры.
+
+    Аргументы:
+    - frame_skip: сколько тиков игры выполняется за один кадр. Кадры
+    выводятся с записанной скоростью змейки, поэтому повтор
+    проигрывается в frame_skip раз быстрее.
+
+    Возвращает состояние игры после последнего тика повтора.
+    """
+    init_display()
+    game = SnakeGame(replay.seed, **replay.game_options())
+    camera.set_board(replay.width, replay.height)
+    info_panel = InfoPanel()
+    inputs = replay.inputs()
+    full_update = True
 
-        my_snake.draw()
-        barriers.draw()
-        the_apple.draw()
-        some_garbage.draw()
-        info_panel.update_panel(my_snake.length, my_snake.speed)
-        pg.display.update()
+    while True:
+        clock.tick(game.snake.speed)
+        handle_keys(game.snake)
+
+        played_ticks = 0
+        restarted = False
+        for turn, speed in islice(inputs, frame_skip):
+            played_ticks += 1
+            if apply_inputs(game, turn, speed) in GAME_OVER_EVENTS:
+                restarted = True
+        if played_ticks == 0:
+            return game
+        if follow_snake(game, restarted):
+            full_update = True
+
+        present_frame(game, info_panel, full_update)
+        full_update = False
+
+
+async def play_online(host=None, port=None, spectate=False):
+    """Показывает сетевую игру с сервера netplay.GameServer.
+
+    Тики выполняет сервер, а окно показывает копию игры, которую
+    обновляют его сообщения. Нажатые повороты, как и в обычной игре,
+    копятся в очереди змейки: они сразу отправляются серверу, а из
+    очереди убираются по одному за пришедший тик, как их применяет
+    сервер. Если сервер прислал неверное сообщение, игра заканчивается
+    с его ошибкой netplay.ProtocolError.
+
+    Аргументы:
+    - host, port: адрес сервера, по умолчанию - netplay.DEFAULT_HOST
+    и netplay.DEFAULT_PORT.
+    - spectate: только смотреть игру, не управляя змейкой.
+    """
+    # Сетевая игра импортирует asyncio и netplay только при подключении,
+    # чтобы не замедлять запуск обычной игры.
+    import asyncio
+
+    from netplay import DEFAULT_HOST, DEFAULT_PORT, GameClient
+
+    init_display()
+    client = await GameClient.connect(host or DEFAULT_HOST,
+                                      port or DEFAULT_PORT, not spectate,
+                                      SnakeGame)
+    game = client.game
+    for snake in game.snakes:
+        snake.body_color = (SNAKE_COLOR if snake is game.snake
+                            else BOT_SNAKE_COLOR)
+    camera.set_board(game.free_cells.width, game.free_cells.height)
+    info_panel = InfoPanel()
+    receiver = asyncio.ensure_future(client.receive_forever())
+    turns = game.snake.turns
+    ticks = game.ticks
+    full_update = True
+    try:
+        while not receiver.done():
+            await asyncio.sleep(1 / RENDER_FPS)
+            for _ in range(min(game.ticks - ticks, len(turns))):
+                turns.popleft()
+            ticks = game.ticks
+            queued = len(turns)
+            handle_keys(game.snake)
+            # Скоростью игры управляет сервер.
+            game.snake.speed = client.tick_rate
+            if client.snake_index is not None:
+                for direction in islice(turns, queued, None):
+                    client.send_turn(direction)
+
+            restarted, client.restarted = client.restarted, False
+            if restarted:
+                clear_trails(game)
+            if follow_snake(game, restarted):
+                full_update = True
+            present_frame(game, info_panel, full_update)
+            full_update = False
+        error = receiver.result()
+        if error is not None:
+            raise error
+    finally:
+        receiver.cancel()
+        await client.close()
+
+
+def server_address(text):
+    """Разбирает адрес сервера для --connect (netplay.address)."""
+    from netplay import address
+
+    return address(text)
+
+
+def create_parser():
+    """Создает разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(description='Игра "Змейка".')
+    parser.add_argument('--board', type=board_size,
+                        default=(GRID_WIDTH, GRID_HEIGHT), metavar='WxH',
+                        help='размер поля в ячейках, до 2000x2000')
+    parser.add_argument('--apples', type=int, default=1,
+                        help='сколько яблок одновременно лежит на поле')
+    parser.add_argument('--garbage', type=int, default=1,
+                        help='сколько мусора одновременно лежит на поле')
+    parser.add_argument('--barriers', type=int, default=0,
+                        help='сколько преград стоит на поле с начала игры')
+    parser.add_argument('--snakes', type=int, default=1,
+                        help='сколько змеек на поле, включая змейку игрока')
+    parser.add_argument('--bot', nargs='?', const='wander', choices=BOTS,
+                        help='змейкой игрока управляет бот: wander - '
+                             'случайные блуждания, autopilot - путь '
+                             'к ближайшему яблоку, hamilton - обход '
+                             'поля по гамильтонову циклу')
+    parser.add_argument('--record', metavar='PATH',
+                        help='сохранить повтор игры в файл')
+    parser.add_argument('--save', metavar='PATH',
+                        help='продолжить игру из снимка в файле, если он '
+                             'есть, и сохранить в него снимок при выходе')
+    parser.add_argument('--replay', metavar='PATH',
+                        help='показать повтор игры из файла')
+    parser.add_argument('--frame-skip', type=int, default=1,
+                        help='сколько тиков повтора показывать за кадр')
+    parser.add_argument('--connect', type=server_address, metavar='HOST:PORT',
+                        help='играть на сервере сетевой игры (netplay.py)')
+    parser.add_argument('--spectate', action='store_true',
+                        help='на сервере только смотреть игру')
+    parser.add_argument('--profile', action='store_true',
+                        help='показывать время фаз кадра на панели')
+    parser.add_argument('--trace', metavar='PATH',
+                        help='сохранить трассу фаз кадра (Chrome trace)')
+    return parser
+
+
+def run_from_command_line(argv=None):
+    """Запускает игру или повтор с аргументами командной строки."""
+    parser = create_parser()
+    args = parser.parse_args(argv)
+    if args.save and args.record:
+        # Повтор воспроизводит игру с начала, а продолженная из снимка
+        # игра началась раньше записи.
+        parser.error('--save нельзя совмещать с --record')
+    if args.replay:
+        play_replay(Replay.load(args.replay), args.frame_skip)
+        return
+    if args.connect:
+        import asyncio
+
+        asyncio.run(play_online(*args.connect, args.spectate))
+        return
+    width, height = args.board
+    game_options = {'width': width, 'height': height,
+                    'apple_count': args.apples,
+                    'garbage_count': args.garbage,
+                    'barrier_count': args.barriers,
+                    'snake_count': args.snakes}
+    # У бота свой генератор, чтобы повтор игры с ботом воспроизводился:
+    # в повтор записываются выбранные ботом повороты.
+    bot = BOTS[args.bot]() if args.bot else None
+    if not (args.profile or args.trace):
+        main(args.record, bot=bot, save_path=args.save, **game_options)
+        return
+    profiler = FrameProfiler(trace=args.trace is not None)
+    try:
+        main(args.record, profiler, bot, args.save, **game_options)
+    finally:
+        if args.trace:
+            profiler.dump_trace(args.trace)
 
 
 if __name__ == '__main__':
-    main()
+    run_from_command_line()
@@ -0,0 +1,254 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+from random import Random
+
+import snake_engine as engine
+from bots import BOTS
+
+
+# Партия, в которой змейка дожила до предела тиков:
+TIMEOUT = 'timeout'
+
+# Предел тиков одной партии по умолчанию:
+MAX_TICKS = 20000
+
+# Сколько партий одной конфигурации играет один процесс за задание:
+GAMES_PER_TASK = 10
+
+# Конфигурация турнира: бот, размер поля, скорость змейки и диапазоны
+# таймеров мусора и преград в тиках.
+Config = namedtuple('Config', ('bot', 'width', 'height', 'speed',
+                               'garbage_delay', 'barrier_delay'))
+
+
+def game_class(config):
+    """Возвращает класс игры с таймерами мусора и преград из config.
+
+    Диапазоны таймеров - атрибуты классов Garbage и Barrier, поэтому
+    для конфигурации создаются их подклассы, как графический интерфейс
+    подставляет свои классы объектов.
+    """
+    garbage_class = type('TournamentGarbage', (engine.Garbage,), {
+        '__slots__': (), 'delay_range': config.garbage_delay})
+    barrier_class = type('TournamentBarrier', (engine.Barrier,), {
+        '__slots__': (), 'delay_range': config.barrier_delay})
+    return type('TournamentGame', (engine.GameState,), {
+        'garbage_class': garbage_class, 'barrier_class': barrier_class})
+
+
+def play_game(game, bot, max_ticks):
+    """Играет партию до первого конца игры или до max_ticks тиков.
+
+    Возвращает наибольшую длину змейки, число тиков и причину конца
+    партии (событие из GAME_OVER_EVENTS или TIMEOUT).
+    """
+    longest = game.snake.length
+    for tick in range(1, max_ticks + 1):
+        event = game.step(bot(game, game.snake))
+        if event in engine.GAME_OVER_EVENTS:
+            return longest, tick, event
+        longest = max(longest, game.snake.length)
+    return longest, max_ticks, TIMEOUT
+
+
+def play_task(task):
+    """Играет партии одного задания в процессе-исполнителе.
+
+    Аргументы:
+    - task: конфигурация, зерно задания, число партий и предел тиков.
+    Зерна партий и случайных ботов берутся из генератора с зерном
+    задания, поэтому результаты не зависят от того, какой процесс
+    выполнил задание. Боты с бюджетом времени на ход, как автопилот,
+    при нехватке времени могут ходить по-разному.
+
+    Возвращает конфигурацию и список результатов play_game.
+    """
+    config, seed, games, max_ticks = task
+    rng = Random(seed)
+    bot = BOTS[config.bot]()
+    game_type = game_class(config)
+    results = []
+    for _ in range(games):
+        game = game_type(rng.getrandbits(64), config.width, config.height)
+        if hasattr(bot, 'rng'):
+            bot.rng = Random(rng.getrandbits(64))
+        if hasattr(bot, 'prepare'):
+            # Подготовка бота, например загрузка цикла поля, не входит
+            # в ходы партии.
+            bot.prepare(game)
+        game.snake.speed = config.speed
+        results.append(play_game(game, bot, max_ticks))
+    return config, results
+
+
+def make_tasks(configs, games, seed, games_per_task=GAMES_PER_TASK,
+               max_ticks=MAX_TICKS):
+    """Делит партии конфигураций на задания для процессов.
+
+    Зерно задания строится из общего зерна и номера задания.
+    """
+    tasks = []
+    for config in configs:
+        for first in range(0, games, games_per_task):
+            count = min(games_per_task, games - first)
+            tasks.append((config, f'{seed}:{len(tasks)}', count, max_ticks))
+    return tasks
+
+
+class Standings:
+    """Итоги турнира по конфигурациям.
+
+    Результаты добавляются по мере завершения заданий, поэтому итоги
+    можно показывать до конца турнира.
+    """
+
+    def __init__(self):
+        self.rows = {}
+
+    def add(self, config, results):
+        """Добавляет результаты партий конфигурации."""
+        row = self.rows.setdefault(config, {
+            'games': 0, 'length_sum': 0, 'best_length': 0, 'ticks_sum': 0,
+            'causes': Counter()})
+        for length, ticks, cause in results:
+            row['games'] += 1
+            row['length_sum'] += length
+            row['best_length'] = max(row['best_length'], length)
+            row['ticks_sum'] += ticks
+            row['causes'][cause] += 1
+
+    def report(self):
+        """Возвращает итоги: по строке на конфигурацию.
+
+        Время жизни в секундах считается по скорости змейки
+        конфигурации: столько тиков игра делает за секунду.
+        """
+        report = []
+        for config, row in self.rows.items():
+            games = row['games']
+            report.append({
+                **config._asdict(),
+                'games': games,
+                'mean_length': row['length_sum'] / games,
+                'best_length': row['best_length'],
+                'mean_ticks': row['ticks_sum'] / games,
+                'mean_seconds': row['ticks_sum'] / games / config.speed,
+                'causes': dict(row['causes']),
+            })
+        return report
+
+
+def run_tournament(tasks, workers=None, on_result=None):
+    """Играет задания на всех ядрах и возвращает итоги турнира.
+
+    Аргументы:
+    - workers: число процессов, по умолчанию - число ядер.
+    - on_result: функция, которая вызывается с итогами после каждого
+    завершенного задания.
+    """
+    standings = Standings()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(play_task, task) for task in tasks]
+        for future in as_completed(futures):
+            standings.add(*future.result())
+            if on_result is not None:
+                on_result(standings)
+    return standings
+
+
+def delay_range(text):
+    """Разбирает диапазон таймера в формате ОТ-ДО."""
+    try:
+        low, high = map(int, text.split('-'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            'диапазон задается как ОТ-ДО, например 50-200')
+    if not 0 < low <= high:
+        raise argparse.ArgumentTypeError(
+            'диапазон должен быть положительным и не пустым')
+    return low, high
+
+
+def create_parser():
+    """Создает разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(
+        description='Турнир ботов "Змейки" без окна на всех ядрах.')
+    parser.add_argument('--bots', nargs='+', choices=BOTS,
+                        default=['wander'], help='боты-участники')
+    parser.add_argument('--boards', nargs='+', type=engine.board_size,
+                        default=[(engine.GRID_WIDTH, engine.GRID_HEIGHT)],
+                        metavar='WxH', help='размеры поля')
+    parser.add_argument('--speeds', nargs='+', type=int,
+                        default=[engine.SPEED], help='скорости змейки')
+    parser.add_argument('--garbage-delays', nargs='+', type=delay_range,
+                        default=[engine.GARBAGE_DELAY], metavar='ОТ-ДО',
+                        help='диапазоны таймера мусора в тиках')
+    parser.add_argument('--barrier-delays', nargs='+', type=delay_range,
+                        default=[engine.BARRIER_DELAY], metavar='ОТ-ДО',
+                        help='диапазоны таймера преград в тиках')
+    parser.add_argument('--games', type=int, default=100,
+                        help='число партий на конфигурацию')
+    parser.add_argument('--max-ticks', type=int, default=MAX_TICKS,
+                        help='предел тиков одной партии')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='зерно турнира')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='число процессов, по умолчанию - число ядер')
+    parser.add_argument('-o', '--output', metavar='PATH',
+                        help='сохранить итоги в JSON')
+    return parser
+
+
+def print_report(report):
+    """Печатает итоги турнира таблицей."""
+    for row in sorted(report, key=lambda row: -row['mean_length']):
+        causes = ', '.join(f'{cause} {count}'
+                           for cause, count in sorted(row['causes'].items()))
+        print(f"{row['bot']:10} {row['width']}x{row['height']:<5} "
+              f"speed {row['speed']:<3} "
+              f"garbage {row['garbage_delay'][0]}-{row['garbage_delay'][1]} "
+              f"barriers {row['barrier_delay'][0]}-"
+              f"{row['barrier_delay'][1]}  "
+              f"games {row['games']:<5} length {row['mean_length']:6.1f} "
+              f"(best {row['best_length']}) "
+              f"ticks {row['mean_ticks']:8.1f}  {causes}")
+
+
+def main(argv=None):
+    """Запускает турнир из командной строки."""
+    args = create_parser().parse_args(argv)
+    configs = [Config(bot, width, height, speed, garbage, barrier)
+               for bot, (width, height), speed, garbage, barrier in product(
+                   args.bots, args.boards, args.speeds, args.garbage_delays,
+                   args.barrier_delays)]
+    tasks = make_tasks(configs, args.games, args.seed,
+                       max_ticks=args.max_ticks)
+    done = 0
+    start = time.perf_counter()
+
+    def show_progress(standings):
+        nonlocal done
+        done += 1
+        print(f'\rЗаданий выполнено: {done}/{len(tasks)}', end='',
+              file=sys.stderr, flush=True)
+
+    standings = run_tournament(tasks, args.workers, show_progress)
+    elapsed = time.perf_counter() - start
+    report = standings.report()
+    ticks = sum(row['mean_ticks'] * row['games'] for row in report)
+    print(f'\nТиков в секунду: {ticks / elapsed:.0f} '
+          f'(процессов: {args.workers or os.cpu_count()})', file=sys.stderr)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()